@@ -1,7 +1,10 @@
+import os
 from flask import Flask
 from dotenv import load_dotenv
 from controllers.search import search_bp
 from controllers.predict_controller import predict_bp
+from controllers.sentiment_controller import sentiment_bp
+from services.sentiment_service import warm_up
 
 load_dotenv()
 
@@ -10,6 +13,10 @@ app = Flask(__name__)
 # Register your controller blueprint
 app.register_blueprint(search_bp)
 app.register_blueprint(predict_bp)
+app.register_blueprint(sentiment_bp)
 
 if __name__ == "__main__":
+    # Only the reloader's child process serves requests, so only it loads FinBERT up front
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        warm_up()
     app.run(debug=True)
\ No newline at end of file
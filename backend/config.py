@@ -1,6 +1,31 @@
 import os
+import sys
 
 
 ELASTIC_HOST = os.getenv("ELASTIC_HOST", "http://localhost:9200")
 ELASTIC_USER = os.getenv("ELASTIC_USER", "")
 ELASTIC_PASS = os.getenv("ELASTIC_PASS", "")
+
+# Online sentiment scoring (/sentiment/score)
+SENTIMENT_MODEL = os.getenv("SENTIMENT_MODEL", "ProsusAI/finbert")
+SENTIMENT_MAX_LENGTH = int(os.getenv("SENTIMENT_MAX_LENGTH", "512"))
+SENTIMENT_MAX_BATCH_SIZE = int(os.getenv("SENTIMENT_MAX_BATCH_SIZE", "32"))
+SENTIMENT_MAX_WAIT_MS = float(os.getenv("SENTIMENT_MAX_WAIT_MS", "5"))
+SENTIMENT_TOKEN_BUDGET = int(os.getenv("SENTIMENT_TOKEN_BUDGET", "4096"))  # max padded tokens per forward pass
+SENTIMENT_MAX_TEXTS = int(os.getenv("SENTIMENT_MAX_TEXTS", "64"))  # per request
+SENTIMENT_TIMEOUT = float(os.getenv("SENTIMENT_TIMEOUT", "30"))  # seconds a request waits for its scores
+SENTIMENT_THREADS = int(os.getenv("SENTIMENT_THREADS", "0")) or None  # torch threads, None uses torch's default
+# The services import the modules they share with stock_data (text_cleaning, batching, market_data, storage)
+# as top-level modules from this directory. Outside Docker it is the stock_data/ directory next to backend/.
+SHARED_CODE_DIR = os.getenv(
+    "SHARED_CODE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "stock_data")
+)
+# Appended once here, before any service imports a shared module, so the backend's own modules
+# (this config in particular) are found first
+if SHARED_CODE_DIR not in sys.path:
+    sys.path.append(SHARED_CODE_DIR)
+
+# Daily bars for /predict, cached as Parquet per ticker (an empty directory setting downloads every time)
+MARKET_DATA_DIR = os.getenv("MARKET_DATA_DIR", os.path.expanduser("~/.cache/stock-sentiment/market-data")) or None
+MARKET_DATA_PROVIDER = os.getenv("MARKET_DATA_PROVIDER", "yfinance")  # or "file:<directory>"
+MARKET_DATA_MAX_AGE = int(os.getenv("MARKET_DATA_MAX_AGE", "900"))  # seconds before the latest bars are refreshed
@@ -0,0 +1,24 @@
+from flask import Blueprint, request, jsonify
+from config import SENTIMENT_MAX_TEXTS
+from services.sentiment_service import ScoringTimeout, score_texts
+
+sentiment_bp = Blueprint("sentiment", __name__)
+
+@sentiment_bp.route("/sentiment/score", methods=["POST"])
+def score():
+    body = request.get_json(silent=True) or {}
+    texts = body.get("texts", body.get("text"))
+    single = isinstance(texts, str)
+    if single:
+        texts = [texts]
+
+    if not texts or not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+        return jsonify({"error": "'text' (a string) or 'texts' (a list of strings) is required"}), 400
+    if len(texts) > SENTIMENT_MAX_TEXTS:
+        return jsonify({"error": f"At most {SENTIMENT_MAX_TEXTS} texts per request"}), 413
+
+    try:
+        results = score_texts(texts)
+    except ScoringTimeout as e:
+        return jsonify({"error": str(e)}), 503
+    return jsonify(results[0] if single else results)
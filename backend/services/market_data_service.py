@@ -0,0 +1,29 @@
+"""
+Daily OHLCV bars for the prediction endpoints, read through the Parquet market data cache shared
+with the market predictor, so repeated requests for a ticker only download bars the cache misses.
+"""
+import threading
+import pandas as pd
+from config import MARKET_DATA_DIR, MARKET_DATA_MAX_AGE, MARKET_DATA_PROVIDER
+from market_data import MarketDataCache, provider_from_spec
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = MarketDataCache(MARKET_DATA_DIR, provider_from_spec(MARKET_DATA_PROVIDER), MARKET_DATA_MAX_AGE)
+        return _cache
+
+
+def get_daily_bars(ticker, start, end):
+    """Daily bars in [start, end) with a tz-naive Date column, like yf.download(...).reset_index(); empty if none"""
+    bars = get_cache().get([ticker], start, end, interval="1d").get(ticker)
+    if bars is None:
+        return pd.DataFrame()
+    bars = bars.copy()
+    bars.index = bars.index.tz_localize(None).rename("Date")
+    return bars.reset_index()
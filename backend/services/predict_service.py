@@ -1,6 +1,6 @@
 import pandas as pd
-import yfinance as yf
 from elastic import scroll_index
+from services.market_data_service import get_daily_bars
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
@@ -39,14 +39,10 @@ def get_stock_data(ticker, start, end):
     if isinstance(ticker, list):
         ticker = ticker[0]
     
-    # Download data with single ticker format
-    stock = yf.download(ticker, start=start, end=end, auto_adjust=False)
-    print(stock)
-    # Flatten MultiIndex columns if they exist
-    if isinstance(stock.columns, pd.MultiIndex):
-        stock.columns = stock.columns.get_level_values(0)
-    
-    stock.reset_index(inplace=True)
+    # Daily bars through the local market data cache
+    stock = get_daily_bars(ticker, start, end)
+    if stock.empty:
+        return pd.DataFrame()
     stock["date"] = pd.to_datetime(stock["Date"]).dt.date
     return stock[["date", "Open", "Close"]]
 
@@ -1,6 +1,6 @@
 import pandas as pd
-import yfinance as yf
 from elastic import scroll_index
+from services.market_data_service import get_daily_bars
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
@@ -31,31 +31,14 @@ def get_stock_data(ticker, start, end):
     if isinstance(ticker, list):
         ticker = ticker[0]
 
-    stock = yf.download(ticker, start=start, end=end, auto_adjust=False)
-
-    # 🔧 Flatten MultiIndex columns if present
-    if isinstance(stock.columns, pd.MultiIndex):
-        stock.columns = ['_'.join([str(c) for c in col]).strip() for col in stock.columns.values]
-
-    stock.reset_index(inplace=True)
-
-    # 🔄 Rename variations of Open/Close if needed
-    possible_open_cols = [col for col in stock.columns if "Open" in col]
-    possible_close_cols = [col for col in stock.columns if "Close" in col and "Adj" not in col]
-
-    if not possible_open_cols or not possible_close_cols:
-        print("Columns available:", stock.columns.tolist())  # Debugging aid
+    # Daily bars through the local market data cache, columns already flat
+    stock = get_daily_bars(ticker, start, end)
+    if stock.empty:
         return pd.DataFrame()  # Trigger error fallback
 
-    # Take first match for Open and Close
-    open_col = possible_open_cols[0]
-    close_col = possible_close_cols[0]
-
     stock["date"] = pd.to_datetime(stock["Date"]).dt.normalize()
 
-    return stock[["date", open_col, close_col]].rename(
-        columns={open_col: "Open", close_col: "Close"}
-    )
+    return stock[["date", "Open", "Close"]]
 
 
 def predict_stock(ticker, start, end):
@@ -0,0 +1,143 @@
+"""
+Online FinBERT scoring. The tokenizer and model are loaded once per process and stay resident;
+concurrent requests are merged into micro-batches by a single scoring thread, which waits at most
+SENTIMENT_MAX_WAIT_MS for a batch to fill before running the model and fanning results back out.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, wait
+import numpy as np
+from config import (
+    SENTIMENT_MAX_BATCH_SIZE,
+    SENTIMENT_MAX_LENGTH,
+    SENTIMENT_MAX_WAIT_MS,
+    SENTIMENT_MODEL,
+    SENTIMENT_THREADS,
+    SENTIMENT_TIMEOUT,
+    SENTIMENT_TOKEN_BUDGET,
+)
+from batching import pad_batch, token_budget_batches
+from text_cleaning import clean_text
+
+
+class ScoringTimeout(Exception):
+    pass
+
+
+class SentimentScorer:
+    def __init__(self, model_name, max_length, token_budget, threads=None):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.torch = torch
+        self.max_length = max_length
+        self.token_budget = token_budget
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        self.model.eval()
+        self.labels = [self.model.config.id2label[i] for i in range(self.model.config.num_labels)]
+
+    def score(self, texts):
+        """Label and confidence for each cleaned text, in the order given"""
+        input_ids = self.tokenizer(texts, truncation=True, max_length=self.max_length,
+                                   return_attention_mask=False, return_token_type_ids=False)["input_ids"]
+        # Sorted by length so one long text does not pad the whole micro-batch to its width
+        lengths = np.fromiter((len(ids) for ids in input_ids), dtype=np.int64, count=len(input_ids))
+        order = np.argsort(lengths, kind='stable')
+        results = [None] * len(texts)
+        with self.torch.no_grad():
+            for start, end in token_budget_batches(lengths[order], self.token_budget, len(texts)):
+                rows = order[start:end]
+                inputs = pad_batch([input_ids[i] for i in rows], self.tokenizer.pad_token_id)
+                probs = self.torch.nn.functional.softmax(self.model(**inputs).logits, dim=1)
+                confidence, labels = self.torch.max(probs, dim=1)
+                for i, label, score in zip(rows, labels.tolist(), confidence.tolist()):
+                    results[i] = {"sentiment": self.labels[label], "confidence": score}
+        return results
+
+
+class MicroBatcher:
+    """Collect texts from concurrent callers into batches of up to max_batch_size, waiting at most max_wait seconds"""
+
+    def __init__(self, score, max_batch_size, max_wait):
+        self.score = score
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.pending = queue.Queue()
+        self.batches = 0
+        self.texts = 0
+        self.thread = threading.Thread(target=self._run, name="sentiment-batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, texts):
+        """Queue texts and return one future per text"""
+        futures = []
+        for text in texts:
+            future = Future()
+            self.pending.put((text, future))
+            futures.append(future)
+        return futures
+
+    def _next_batch(self):
+        batch = [self.pending.get()]
+        # The window opens with the first text, so a lone request waits at most max_wait
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self.pending.get(timeout=remaining) if remaining > 0 else self.pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            # Callers that timed out cancelled their futures, their texts are not scored
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                results = self.score([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.texts += len(batch)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    """The process-wide batcher, loading the model on first use"""
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            scorer = SentimentScorer(SENTIMENT_MODEL, SENTIMENT_MAX_LENGTH, SENTIMENT_TOKEN_BUDGET, SENTIMENT_THREADS)
+            _batcher = MicroBatcher(scorer.score, SENTIMENT_MAX_BATCH_SIZE, SENTIMENT_MAX_WAIT_MS / 1000)
+    return _batcher
+
+
+def warm_up():
+    """Load the model and run one batch so the first request does not pay for it"""
+    score_texts(["warm up"])
+
+
+def score_texts(texts):
+    """Clean texts the way the ingestion pipeline does and score them through the shared batcher"""
+    cleaned = [clean_text(text) for text in texts]
+    futures = get_batcher().submit(cleaned)
+    done, not_done = wait(futures, timeout=SENTIMENT_TIMEOUT)
+    if not_done:
+        for future in not_done:
+            future.cancel()
+        raise ScoringTimeout(f"Scoring did not finish within {SENTIMENT_TIMEOUT}s")
+    return [dict(future.result(), text=text) for text, future in zip(cleaned, futures)]
@@ -0,0 +1,22 @@
+import importlib
+import os
+import sys
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def backend():
+    """
+    Import backend modules by name. The backend has its own top-level config module, so they are imported
+    per test and dropped afterwards, leaving the stock_data modules in place for the tests that use them
+    """
+    stock_data_config = sys.modules.pop("config", None)
+    sys.path.insert(0, BACKEND_DIR)
+    yield importlib.import_module
+    sys.path.remove(BACKEND_DIR)
+    for name in [name for name in sys.modules if name.split(".")[0] in ("config", "services", "controllers")]:
+        del sys.modules[name]
+    if stock_data_config is not None:
+        sys.modules["config"] = stock_data_config
@@ -0,0 +1,135 @@
+"""Micro-batching of concurrent scoring requests and the /sentiment/score responses, with a stub scorer"""
+import threading
+import pytest
+from flask import Flask
+
+
+class StubScorer:
+    """Scores each text by its length, recording the batches it is given; texts starting with "slow" block"""
+
+    def __init__(self):
+        self.batches = []
+        self.blocked = threading.Event()
+        self.release = threading.Event()
+
+    def score(self, texts):
+        self.batches.append(list(texts))
+        if any(text.startswith("slow") for text in texts):
+            self.blocked.set()
+            self.release.wait(5)
+        return [{"sentiment": "neutral", "confidence": len(text)} for text in texts]
+
+
+@pytest.fixture
+def service(backend):
+    return backend("services.sentiment_service")
+
+
+def _use_batcher(service, monkeypatch, scorer, max_batch_size, max_wait):
+    batcher = service.MicroBatcher(scorer.score, max_batch_size, max_wait)
+    monkeypatch.setattr(service, "_batcher", batcher)
+    return batcher
+
+
+def test_concurrent_requests_share_a_batch(service, monkeypatch):
+    scorer = StubScorer()
+    # The batch closes once all five texts are in, well before max_wait
+    batcher = _use_batcher(service, monkeypatch, scorer, max_batch_size=5, max_wait=5)
+    requests = [["aa", "b  c", "d"], ["eeeee"], ["http://x.co ff"]]
+    results = [None] * len(requests)
+
+    def call(i):
+        results[i] = service.score_texts(requests[i])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(requests))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert (batcher.batches, batcher.texts) == (1, 5)
+    assert sorted(scorer.batches[0]) == ["aa", "b c", "d", "eeeee", "ff"]
+    # Each caller gets the scores of its own cleaned texts, in the order it sent them
+    assert results == [
+        [{"sentiment": "neutral", "confidence": 2, "text": "aa"},
+         {"sentiment": "neutral", "confidence": 3, "text": "b c"},
+         {"sentiment": "neutral", "confidence": 1, "text": "d"}],
+        [{"sentiment": "neutral", "confidence": 5, "text": "eeeee"}],
+        [{"sentiment": "neutral", "confidence": 2, "text": "ff"}]
+    ]
+
+
+def test_timed_out_texts_are_not_scored(service, monkeypatch):
+    scorer = StubScorer()
+    batcher = _use_batcher(service, monkeypatch, scorer, max_batch_size=1, max_wait=0)
+    monkeypatch.setattr(service, "SENTIMENT_TIMEOUT", 0.05)
+
+    timeouts = []
+
+    def call(texts):
+        try:
+            service.score_texts(texts)
+        except service.ScoringTimeout as e:
+            timeouts.append(e)
+
+    slow = threading.Thread(target=call, args=(["slow"],))
+    slow.start()
+    scorer.blocked.wait(5)
+    # Queued behind the slow batch, the request gives up and cancels its text
+    call(["queued"])
+    slow.join()
+    scorer.release.set()
+    assert len(timeouts) == 2
+
+    monkeypatch.setattr(service, "SENTIMENT_TIMEOUT", 5)
+    assert service.score_texts(["next"]) == [{"sentiment": "neutral", "confidence": 4, "text": "next"}]
+    assert scorer.batches == [["slow"], ["next"]]
+    assert batcher.texts == 2
+
+
+@pytest.fixture
+def controller(backend, service, monkeypatch):
+    controller = backend("controllers.sentiment_controller")
+    monkeypatch.setattr(controller, "SENTIMENT_MAX_TEXTS", 3)
+    monkeypatch.setattr(controller, "score_texts",
+                        lambda texts: [{"sentiment": "positive", "confidence": 0.9, "text": text} for text in texts])
+    return controller
+
+
+@pytest.fixture
+def client(controller):
+    app = Flask(__name__)
+    app.register_blueprint(controller.sentiment_bp)
+    return app.test_client()
+
+
+def test_single_text_and_lists(client):
+    assert client.post("/sentiment/score", json={"text": "up"}).get_json() == \
+        {"sentiment": "positive", "confidence": 0.9, "text": "up"}
+    assert client.post("/sentiment/score", json={"texts": ["up", "down"]}).get_json() == [
+        {"sentiment": "positive", "confidence": 0.9, "text": "up"},
+        {"sentiment": "positive", "confidence": 0.9, "text": "down"}
+    ]
+
+
+@pytest.mark.parametrize("body", [None, {}, {"text": 1}, {"texts": []}, {"texts": ["a", 1]}, {"texts": {"a": 1}}])
+def test_bad_requests_are_rejected(client, body):
+    response = client.post("/sentiment/score", json=body) if body is not None else \
+        client.post("/sentiment/score", data="not json")
+    assert response.status_code == 400
+
+
+def test_too_many_texts(client):
+    response = client.post("/sentiment/score", json={"texts": ["a", "b", "c", "d"]})
+    assert response.status_code == 413
+    assert response.get_json() == {"error": "At most 3 texts per request"}
+
+
+def test_timeouts_are_unavailable(client, controller, service, monkeypatch):
+    def timeout(texts):
+        raise service.ScoringTimeout("Scoring did not finish within 30s")
+
+    monkeypatch.setattr(controller, "score_texts", timeout)
+    response = client.post("/sentiment/score", json={"text": "up"})
+    assert response.status_code == 503
+    assert response.get_json() == {"error": "Scoring did not finish within 30s"}
@@ -1,98 +1,134 @@
+"""
+Load a tech tweets CSV export into Elasticsearch in constant memory. The file is read in chunks,
+each chunk is cleaned and turned into bulk actions lazily, and streaming_bulk sends them as they
+are produced, so memory does not grow with the size of the file.
+
+    python sentiment_pipeline.py /path/to/tech.csv --index twitter_tech_sentiment
+"""
+import argparse
+import time
 import pandas as pd
-import re
 from elasticsearch import Elasticsearch, helpers
+from stock_data.text_cleaning import clean_series
+
+CRITICAL_COLUMNS = ["created_at", "text", "twitter_id", "polarity"]
+NUMERIC_COLUMNS = ["followers", "friends", "retweet_count", "polarity"]
 
-# Initialize Elasticsearch client
-es = Elasticsearch("http://localhost:9200")  # Replace with your Elasticsearch URL
-
-# Load CSV file
-csv_file_path = "/Users/silemobayo/Documents/PERSONAL-PROJECT/airflow/tech.csv"  # Path to the uploaded file
-data = pd.read_csv(csv_file_path)
-
-# Data Cleaning Function
-def clean_text(text):
-    """
-    Cleans the tweet text by:
-    - Removing hashtags (#)
-    - Removing mentions (@)
-    - Removing URLs
-    - Removing special characters
-    - Stripping extra whitespace
-    """
-    text = re.sub(r"http\S+|www\S+|https\S+", "", text, flags=re.MULTILINE)  # Remove URLs
-    text = re.sub(r"@\w+", "", text)  # Remove mentions
-    text = re.sub(r"#\w+", "", text)  # Remove hashtags
-    text = re.sub(r"[^A-Za-z0-9\s]", "", text)  # Remove special characters
-    text = re.sub(r"\s+", " ", text).strip()  # Remove extra whitespace
-    return text
 
 # Data Cleaning
 def clean_data(df):
     # Drop rows with null values in critical columns
-    critical_columns = ["created_at", "text", "twitter_id", "polarity"]
-    df = df.dropna(subset=critical_columns)
+    df = df.dropna(subset=CRITICAL_COLUMNS)
 
     # Convert numeric columns to proper types
-    numeric_columns = ["followers", "friends", "retweet_count", "polarity"]
-    for col in numeric_columns:
+    for col in NUMERIC_COLUMNS:
         df[col] = pd.to_numeric(df[col], errors="coerce")  # Convert and set invalid values as NaN
-    df = df.dropna(subset=numeric_columns)  # Drop rows with invalid numeric data
+    df = df.dropna(subset=NUMERIC_COLUMNS)  # Drop rows with invalid numeric data
 
     # Apply text cleaning to the 'text' column
     if "text" in df.columns:
-        df["cleaned_text"] = df["text"].apply(clean_text)
+        df["cleaned_text"] = clean_series(df["text"], strip_special=True)
 
     # Remove rows where 'cleaned_text' is empty or null after cleaning
     df = df[df["cleaned_text"].str.strip().astype(bool)]
 
     return df
 
-# Clean the data
-data = clean_data(data)
 
-# Define Elasticsearch index
-index_name = "twitter_tech_sentiment"  # Replace with your desired index name
+class Progress:
+    """Rows read and documents indexed so far, printed every `every` documents"""
+
+    def __init__(self, every):
+        self.every = every
+        self.started = time.perf_counter()
+        self.rows_read = 0
+        self.indexed = 0
+        self.failed = 0
+
+    def report(self, final=False):
+        elapsed = time.perf_counter() - self.started
+        done = self.indexed + self.failed
+        print(f"{'Done: ' if final else ''}{self.rows_read} rows read, {self.indexed} indexed, "
+              f"{self.failed} failed in {elapsed:.1f}s ({done / elapsed:.0f} docs/sec)")
+
+    def add(self, ok):
+        if ok:
+            self.indexed += 1
+        else:
+            self.failed += 1
+        if (self.indexed + self.failed) % self.every == 0:
+            self.report()
+
+
+def generate_actions(csv_file_path, index_name, chunk_size, progress):
+    """Yield one bulk action per cleaned row, reading the CSV a chunk at a time"""
+    for chunk in pd.read_csv(csv_file_path, chunksize=chunk_size):
+        progress.rows_read += len(chunk)
+        chunk = clean_data(chunk)
+        # NaN is not valid JSON, missing values are sent as null
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        for record in chunk.to_dict(orient="records"):
+            yield {
+                "_index": index_name,
+                "_source": {
+                    "created_at": record["created_at"],
+                    "file_name": record.get("file_name", None),
+                    "followers": record["followers"],
+                    "friends": record["friends"],
+                    "group_name": record.get("group_name", None),
+                    "location": record.get("location", None),
+                    "retweet_count": record["retweet_count"],
+                    "screenname": record.get("screenname", None),
+                    "search_query": record.get("search_query", None),
+                    "original_text": record["text"],
+                    "cleaned_text": record["cleaned_text"],
+                    "twitter_id": record["twitter_id"],
+                    "username": record.get("username", None),
+                    "polarity": record["polarity"],
+                    "partition_0": record.get("partition_0", None),
+                    "partition_1": record.get("partition_1", None),
+                },
+            }
 
-# Check if the index exists, if not create it
-if not es.indices.exists(index=index_name):
-    es.indices.create(index=index_name)
 
 # Load data into Elasticsearch
-def load_data_to_es(df, index_name):
-    actions = []
-    for record in df.to_dict(orient="records"):
-        action = {
-            "_index": index_name,
-            "_source": {
-                "created_at": record["created_at"],
-                "file_name": record.get("file_name", None),
-                "followers": record["followers"],
-                "friends": record["friends"],
-                "group_name": record.get("group_name", None),
-                "location": record.get("location", None),
-                "retweet_count": record["retweet_count"],
-                "screenname": record.get("screenname", None),
-                "search_query": record.get("search_query", None),
-                "original_text": record["text"],
-                "cleaned_text": record["cleaned_text"],
-                "twitter_id": record["twitter_id"],
-                "username": record.get("username", None),
-                "polarity": record["polarity"],
-                "partition_0": record.get("partition_0", None),
-                "partition_1": record.get("partition_1", None),
-            },
-        }
-        actions.append(action)
-
-    # Bulk insert all documents
-    if actions:
-        helpers.bulk(es, actions)
-        print(f"{len(actions)} records added to Elasticsearch.")
+def load_data_to_es(es, csv_file_path, index_name, chunk_size=10000, bulk_size=500, progress_every=50000):
+    # Check if the index exists, if not create it
+    if not es.indices.exists(index=index_name):
+        es.indices.create(index=index_name)
+
+    progress = Progress(progress_every)
+    for ok, item in helpers.streaming_bulk(
+        es,
+        generate_actions(csv_file_path, index_name, chunk_size, progress),
+        chunk_size=bulk_size,
+        max_retries=3,
+        raise_on_error=False
+    ):
+        if not ok and progress.failed < 10:
+            print(f"Failed to index document: {item}")
+        progress.add(ok)
+
+    if progress.indexed or progress.failed:
+        progress.report(final=True)
     else:
-        print("No data to add.")
+        print("No valid data to load into Elasticsearch.")
+    return progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load a tech tweets CSV into Elasticsearch")
+    parser.add_argument("csv_file_path")
+    parser.add_argument("--index", default="twitter_tech_sentiment")
+    parser.add_argument("--es-url", default="http://localhost:9200")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="CSV rows read at a time")
+    parser.add_argument("--bulk-size", type=int, default=500, help="documents per bulk request")
+    parser.add_argument("--progress-every", type=int, default=50000, help="documents between progress lines")
+    args = parser.parse_args()
+
+    es = Elasticsearch(args.es_url)
+    load_data_to_es(es, args.csv_file_path, args.index, args.chunk_size, args.bulk_size, args.progress_every)
+
 
-# Load cleaned data into Elasticsearch
-if not data.empty:
-    load_data_to_es(data, index_name)
-else:
-    print("No valid data to load into Elasticsearch.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,6 @@
 from datetime import datetime, timedelta
 from airflow import DAG
 from airflow.operators.python import PythonOperator
-from sentiment_pipeline import SentimentAnalyzer
-from market_predictor import MarketPredictor
 from config import Config
 
 default_args = {
@@ -11,11 +9,16 @@ default_args = {
     'retry_delay': timedelta(minutes=15)
 }
 
+# The scheduler parses this file every few seconds; the pipelines pull in torch, transformers,
+# yfinance and sklearn, so they are imported only when a task actually runs
+
 def run_sentiment():
+    from sentiment_pipeline import SentimentAnalyzer
     analyzer = SentimentAnalyzer()
-    analyzer.process_data()
+    analyzer.process_data(incremental=True)
 
 def run_prediction():
+    from market_predictor import MarketPredictor
     predictor = MarketPredictor()
     predictor.run_pipeline()
 
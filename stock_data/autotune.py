@@ -0,0 +1,180 @@
+"""Per-host calibration of the inference threads, batch size and token budget, saved for later runs"""
+import logging
+import os
+import resource
+import socket
+import time
+from collections import Counter
+import pandas as pd
+import torch
+from config import Config
+from storage import load_or_none, read_json, write_json
+
+logger = logging.getLogger(__name__)
+
+
+def _reset_peak_rss():
+    """Reset the kernel's peak RSS (VmHWM) so every trial is measured on its own; Linux only"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Without /proc the peak never resets, so a trial over the cap also fails every later one
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def memory_cap_mb():
+    """Peak RSS allowed per inference process; the cap covers all workers together"""
+    cap = Config.AUTOTUNE_MEMORY_CAP_MB
+    if not cap:
+        cap = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 2 ** 20 / 2
+    return cap / max(1, Config.NUM_WORKERS)
+
+
+def _thread_candidates(max_threads):
+    return sorted({max(1, max_threads // 4), max(1, max_threads // 2), max_threads})
+
+
+def _host():
+    return {"host": socket.gethostname(), "cpu_count": os.cpu_count(), "torch": torch.__version__}
+
+
+def _profile_key(backend):
+    """Settings that change what the best throughput setting is, besides the host"""
+    return f"{Config.MODEL_NAME}|{backend}|{Config.INFERENCE_MODE}|workers={Config.NUM_WORKERS}|max_length={Config.MAX_LENGTH}"
+
+
+class AutotuneProfile:
+    """Calibrated settings of this host as JSON, one entry per model, backend and inference mode"""
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, f"{socket.gethostname()}.json")
+        self.state = self._load()
+
+    def _load(self):
+        state = load_or_none(self.path, read_json, "autotune profile", (OSError, ValueError))
+        if state is None:
+            return {}
+        # A resized container or a torch upgrade keeps the hostname but not the timings
+        if state.get("host") != _host():
+            logger.info(f"Autotune profile {self.path} was calibrated on {state.get('host')}, recalibrating")
+            return {}
+        return state
+
+    def get(self, backend):
+        """The saved settings for a backend, or None when it has not been calibrated here"""
+        return self.state.get("profiles", {}).get(_profile_key(backend))
+
+    def save(self, backend, settings):
+        """Atomically store the settings for a backend next to the other calibrated ones"""
+        profiles = dict(self.state.get("profiles", {}))
+        profiles[_profile_key(backend)] = dict(settings, calibrated_at=pd.Timestamp.now(tz="UTC").isoformat())
+        self.state = {"host": _host(), "profiles": profiles}
+        write_json(self.path, self.state, indent=2)
+
+
+def _trial(analyzer, encodings, threads, batch_size, token_budget, cap_mb):
+    """Score the encoded sample once with the given settings"""
+    torch.set_num_threads(threads)
+    analyzer.batch_size = batch_size
+    analyzer.token_budget = token_budget
+    stats = Counter()
+    _reset_peak_rss()
+    started = time.perf_counter()
+    analyzer._predict_encoded(encodings, stats)
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "threads": threads,
+        "batch_size": batch_size,
+        "token_budget": token_budget,
+        "rows_per_sec": len(encodings) / elapsed,
+        "peak_rss_mb": _peak_rss_mb(),
+        "padding_waste": 1 - stats["tokens"] / stats["padded_tokens"]
+    }
+    result["within_cap"] = result["peak_rss_mb"] <= cap_mb
+    logger.info(
+        f"Autotune {threads} threads, batch {batch_size}, budget {token_budget}: "
+        f"{result['rows_per_sec']:.1f} rows/sec, peak RSS {result['peak_rss_mb']:.0f} MB"
+        f"{'' if result['within_cap'] else ' (over the cap)'}"
+    )
+    return result
+
+
+def calibrate(analyzer, texts, max_threads):
+    """
+    Sweep threads, then batch size (fixed mode) or token budget and the batch row cap (bucketed mode),
+    scoring texts with each setting. Sizes are tried in ascending order and a sweep stops at the first
+    one over the memory cap, larger ones only need more. Returns the fastest setting within the cap
+    along with every trial.
+    """
+    cap_mb = memory_cap_mb()
+    bucketed = Config.INFERENCE_MODE == "bucketed"
+    batch_sizes = sorted(Config.AUTOTUNE_BATCH_SIZES)
+    token_budgets = sorted(Config.AUTOTUNE_TOKEN_BUDGETS)
+    encodings = analyzer._encode(texts, Counter())
+    trials = []
+
+    def run(settings):
+        trials.append(_trial(analyzer, encodings, cap_mb=cap_mb, **settings))
+        return trials[-1]
+
+    def sweep(settings, name, values):
+        for value in values:
+            if not run(dict(settings, **{name: value}))["within_cap"]:
+                break
+
+    def best():
+        within_cap = [trial for trial in trials if trial["within_cap"]]
+        if not within_cap:
+            return min(trials, key=lambda trial: trial["peak_rss_mb"])
+        return max(within_cap, key=lambda trial: trial["rows_per_sec"])
+
+    # Start from mid-sized batches, which are rarely the ones that hit the cap
+    settings = {
+        "threads": max_threads,
+        "batch_size": batch_sizes[len(batch_sizes) // 2],
+        "token_budget": token_budgets[len(token_budgets) // 2]
+    }
+    torch.set_num_threads(max_threads)
+    analyzer._warm_up(encodings)
+
+    sweep(settings, "threads", _thread_candidates(max_threads))
+    settings["threads"] = best()["threads"]
+    if bucketed:
+        # The row cap stays out of the way while the budget is swept
+        sweep(dict(settings, batch_size=batch_sizes[-1]), "token_budget", token_budgets)
+        settings["token_budget"] = best()["token_budget"]
+        sweep(settings, "batch_size", batch_sizes)
+    else:
+        sweep(settings, "batch_size", batch_sizes)
+
+    chosen = best()
+    if not chosen["within_cap"]:
+        logger.warning(f"No setting stayed under {cap_mb:.0f} MB, using the one with the lowest peak RSS")
+    logger.info(
+        f"Autotune picked {chosen['threads']} threads, batch {chosen['batch_size']}"
+        f"{', budget ' + str(chosen['token_budget']) if bucketed else ''}: "
+        f"{chosen['rows_per_sec']:.1f} rows/sec over {len(trials)} trials, memory cap {cap_mb:.0f} MB"
+    )
+    return {
+        "threads": chosen["threads"],
+        "batch_size": chosen["batch_size"],
+        "token_budget": chosen["token_budget"],
+        "rows_per_sec": chosen["rows_per_sec"],
+        "peak_rss_mb": chosen["peak_rss_mb"],
+        "sample_rows": len(texts),
+        "memory_cap_mb": cap_mb,
+        "trials": trials
+    }
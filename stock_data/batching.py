@@ -0,0 +1,30 @@
+"""Token-budget batching and padding shared by the ingestion pipeline and the online scorer"""
+import numpy as np
+
+
+def token_budget_batches(sorted_lengths, token_budget, max_batch_size):
+    """Split ascending token lengths into (start, end) batches bounded by a padded-token budget"""
+    batches = []
+    start = 0
+    for i, length in enumerate(sorted_lengths):
+        rows = i - start + 1
+        # Lengths are ascending, so the current row sets the padded width of the batch
+        if i > start and (rows * length > token_budget or rows > max_batch_size):
+            batches.append((start, i))
+            start = i
+    if start < len(sorted_lengths):
+        batches.append((start, len(sorted_lengths)))
+    return batches
+
+
+def pad_batch(input_ids, pad_token_id):
+    """Right-pad token id lists into input_ids/attention_mask tensors"""
+    import torch
+
+    width = max(len(ids) for ids in input_ids)
+    padded = np.full((len(input_ids), width), pad_token_id, dtype=np.int64)
+    mask = np.zeros((len(input_ids), width), dtype=np.int64)
+    for row, ids in enumerate(input_ids):
+        padded[row, :len(ids)] = ids
+        mask[row, :len(ids)] = 1
+    return {'input_ids': torch.from_numpy(padded), 'attention_mask': torch.from_numpy(mask)}
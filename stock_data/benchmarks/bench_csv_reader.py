@@ -0,0 +1,93 @@
+"""
+Memory and speed of the CSV chunk readers: all columns with default dtypes and ticker filtering
+after the chunk is built (as before), against column projection with compact dtypes on pandas
+and pyarrow's streaming reader, which filters tickers on the Arrow batch.
+
+Each reader runs in its own process so peak RSS is not shared between them.
+
+    python stock_data/benchmarks/bench_csv_reader.py --rows 500000
+    python stock_data/benchmarks/bench_csv_reader.py --csv /path/to/data.csv
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from config import Config  # noqa: E402
+from chunk_readers import iter_pyarrow_csv_chunks  # noqa: E402
+from synthetic_tweets import write_csv  # noqa: E402
+
+READERS = ["before", "pandas", "pyarrow"]
+
+
+def _chunks(reader, path, chunksize):
+    # Imported here so the parent process does not load torch and transformers
+    from sentiment_pipeline import _csv_dtypes, _input_columns, _read_csv_kwargs
+
+    if reader == "before":
+        return pd.read_csv(path, chunksize=chunksize, parse_dates=[Config.DATE_COL],
+                           dtype={"followers": "Int64", "friends": "Int64", "retweet_count": "Int64"})
+    if reader == "pandas":
+        return pd.read_csv(path, chunksize=chunksize, **_read_csv_kwargs())
+    return iter_pyarrow_csv_chunks(path, chunksize, _input_columns(), _csv_dtypes(), date_columns=[Config.DATE_COL],
+                                   filter_column=Config.GROUP_COL, filter_values=Config.TICKER_MAPPING.keys())
+
+
+def measure(reader, path, chunksize):
+    """Read the whole file, returning rows kept, speed and the memory of each chunk as read"""
+    chunks = _chunks(reader, path, chunksize)
+    # Peak RSS before reading covers the imports, so only the growth is reported
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    chunk_bytes = []
+    rows = 0
+    started = time.perf_counter()
+    for chunk in chunks:
+        chunk_bytes.append(int(chunk.memory_usage(deep=True).sum()))
+        rows += int(chunk[Config.GROUP_COL].isin(Config.TICKER_MAPPING.keys()).sum())
+    elapsed = time.perf_counter() - started
+    return {
+        "reader": reader,
+        "rows_kept": rows,
+        "seconds": elapsed,
+        "chunks": len(chunk_bytes),
+        "mean_chunk_mb": sum(chunk_bytes) / len(chunk_bytes) / 2 ** 20,
+        "max_chunk_mb": max(chunk_bytes) / 2 ** 20,
+        "rss_growth_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss) / 1024,
+        "pandas": pd.__version__
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--csv", help="CSV to read instead of a synthetic one")
+    parser.add_argument("--rows", type=int, default=500000, help="rows of the synthetic CSV")
+    parser.add_argument("--chunk-size", type=int, default=Config.CHUNK_SIZE)
+    parser.add_argument("--reader", choices=READERS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.reader:
+        print(json.dumps(measure(args.reader, args.csv, args.chunk_size)))
+        return
+
+    path = args.csv or write_csv(os.path.join(tempfile.mkdtemp(prefix="csv-bench-"), "tweets.csv"), args.rows)
+    print(f"{path}: {os.path.getsize(path) / 2 ** 20:.0f} MB, chunks of {args.chunk_size} rows")
+    print(f"{'reader':<8} {'rows kept':>10} {'seconds':>8} {'chunk MB (mean/max)':>20} {'RSS growth MB':>14}")
+    for reader in READERS:
+        output = subprocess.run(
+            [sys.executable, __file__, "--csv", path, "--chunk-size", str(args.chunk_size), "--reader", reader],
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{reader:<8} {result['rows_kept']:>10,} {result['seconds']:>8.2f} "
+              f"{result['mean_chunk_mb']:>10.1f} / {result['max_chunk_mb']:<7.1f} {result['rss_growth_mb']:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
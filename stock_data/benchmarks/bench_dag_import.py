@@ -0,0 +1,90 @@
+"""
+Time and memory the Airflow scheduler spends importing airflow_dag.py, for the working tree and
+for the same file at an earlier git revision. Each import runs in a fresh process, like a DAG
+file processor, and the median of the repeats is reported.
+
+    python stock_data/benchmarks/bench_dag_import.py --rev HEAD~1
+"""
+import argparse
+import importlib.util
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+STOCK_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DAG_PATH = os.path.join(STOCK_DATA_DIR, "airflow_dag.py")
+HEAVY_MODULES = ["torch", "transformers", "datasets", "yfinance", "sklearn", "elasticsearch", "pandas", "pyarrow"]
+
+
+def measure(path):
+    """Import the DAG file at path and return import seconds, RSS growth and the heavy modules loaded"""
+    sys.path.insert(0, STOCK_DATA_DIR)
+    # Airflow itself is loaded by the scheduler before any DAG file, so it is not counted
+    import airflow.operators.python  # noqa: F401
+
+    modules_before = len(sys.modules)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    spec = importlib.util.spec_from_file_location("airflow_dag", path)
+    spec.loader.exec_module(importlib.util.module_from_spec(spec))
+    return {
+        "seconds": time.perf_counter() - started,
+        "rss_growth_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024,
+        "modules_loaded": len(sys.modules) - modules_before,
+        "heavy_modules": [name for name in HEAVY_MODULES if name in sys.modules]
+    }
+
+
+def _run(path, repeats):
+    runs = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, __file__, "--measure", path],
+                                capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        "seconds": statistics.median(run["seconds"] for run in runs),
+        "rss_growth_mb": statistics.median(run["rss_growth_mb"] for run in runs),
+        "modules_loaded": runs[-1]["modules_loaded"],
+        "heavy_modules": runs[-1]["heavy_modules"]
+    }
+
+
+def _at_revision(rev, directory):
+    """airflow_dag.py as of rev, written next to nothing else so it imports the current modules"""
+    source = subprocess.run(["git", "show", f"{rev}:./airflow_dag.py"], capture_output=True, text=True,
+                            cwd=STOCK_DATA_DIR, check=True).stdout
+    path = os.path.join(directory, "airflow_dag.py")
+    with open(path, "w") as f:
+        f.write(source)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rev", help="git revision of airflow_dag.py to compare against")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure)))
+        return
+
+    paths = {"working tree": DAG_PATH}
+    if args.rev:
+        paths = {args.rev: _at_revision(args.rev, tempfile.mkdtemp(prefix="dag-import-")), **paths}
+
+    print(f"{'version':<14} {'seconds':>8} {'RSS growth MB':>14} {'modules':>8}  heavy modules")
+    for name, path in paths.items():
+        result = _run(path, args.repeats)
+        print(f"{name:<14} {result['seconds']:>8.3f} {result['rss_growth_mb']:>14.0f} {result['modules_loaded']:>8}  "
+              f"{', '.join(result['heavy_modules']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
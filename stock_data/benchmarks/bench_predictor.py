@@ -0,0 +1,118 @@
+"""
+Wall-clock time of MarketPredictor.run_pipeline for several preparing thread / training worker
+settings. Elasticsearch is the in-process fake answering the hourly aggregation of all tickers,
+and market data comes from synthetic hourly bars served by FileProvider after a simulated download
+latency. Each setting runs twice: cold, and warm with the market data cache, the feature tables
+and the models left by the first run, which the unchanged data lets it reuse.
+
+    python stock_data/benchmarks/bench_predictor.py --tickers 16 --settings 1:1,4:1,8:2
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import market_predictor  # noqa: E402
+from config import Config  # noqa: E402
+from fake_es import FakeElasticsearch  # noqa: E402
+from market_data import FileProvider, MarketDataCache  # noqa: E402
+
+# Trading hours in UTC over the 60 days the predictor downloads
+HOURS = pd.DatetimeIndex([
+    hour for day in pd.bdate_range(end=pd.Timestamp.now(tz="UTC").normalize(), periods=42)
+    for hour in pd.date_range(day + pd.Timedelta(hours=14), periods=7, freq="h")
+])
+
+
+def _seed(ticker):
+    return sum(map(ord, ticker))
+
+
+def _hourly_buckets(ticker, since):
+    rng = np.random.default_rng(_seed(ticker))
+    return [
+        {
+            "key": int(hour.timestamp() * 1000),
+            "avg_sentiment": {"value": float(rng.uniform(0.5, 1))},
+            "sum_retweets": {"value": float(rng.integers(1, 500))},
+            "avg_followers": {"value": float(rng.integers(10, 100000))}
+        }
+        for hour in HOURS if hour >= since
+    ]
+
+
+def hourly_sentiment(index, body):
+    """Response of the multi-ticker aggregation: one bucket per trading hour since the range filter's lookback"""
+    terms, created_at = (clause for clause in body["query"]["bool"]["filter"])
+    days = int(created_at["range"]["created_at"]["gte"].removeprefix("now-").split("d")[0])
+    since = pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=days)
+    return {"aggregations": {"tickers": {"buckets": [
+        {"key": ticker, "hourly": {"buckets": _hourly_buckets(ticker, since)}}
+        for ticker in terms["terms"]["metadata.ticker.keyword"]
+    ]}}}
+
+
+def write_bars(directory, tickers):
+    """Synthetic hourly random walks as <directory>/60m/<ticker>.parquet for FileProvider"""
+    os.makedirs(os.path.join(directory, "60m"), exist_ok=True)
+    for ticker in tickers:
+        rng = np.random.default_rng(_seed(ticker))
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.005, len(HOURS))))
+        pd.DataFrame({"Open": close, "High": close * 1.002, "Low": close * 0.998, "Close": close, "Adj Close": close,
+                      "Volume": rng.integers(10000, 1000000, len(HOURS))},
+                     index=HOURS.rename("Datetime")).to_parquet(os.path.join(directory, "60m", f"{ticker}.parquet"))
+
+
+def _settings(value):
+    return [tuple(int(n) for n in setting.split(":")) for setting in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=16)
+    parser.add_argument("--settings", type=_settings, default=[(1, 1), (4, 1), (8, 1), (8, 2)],
+                        help="comma-separated prepare_threads:training_workers pairs")
+    parser.add_argument("--download-latency", type=float, default=0.5, help="seconds per market data download")
+    parser.add_argument("--workdir", help="where the bars and the cache go, a temporary directory by default")
+    parser.add_argument("--es-latency-ms", type=float, default=20.0)
+    parser.add_argument("--verbose", action="store_true", help="keep the predictor's per-ticker logging")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    # Every ticker appears under two groups, like GOOGL and AMZN in the real mapping
+    tickers = [f"T{i:03d}" for i in range(args.tickers)]
+    Config.TICKER_MAPPING = {f"{group}{ticker}": ticker for ticker in tickers for group in ["A", "B"]}
+    workdir = args.workdir or tempfile.mkdtemp(prefix="predictor-bench-")
+    write_bars(os.path.join(workdir, "bars"), tickers)
+    provider = FileProvider(os.path.join(workdir, "bars"), latency=args.download_latency)
+
+    print(f"{args.tickers} tickers ({len(Config.TICKER_MAPPING)} groups), {args.download_latency}s per download, "
+          f"{args.es_latency_ms} ms per ES request, {os.cpu_count()} CPUs")
+    print(f"{'threads':>7} {'workers':>7} {'cache':>5} {'seconds':>8} {'downloads':>9} {'predicted':>9}")
+    with FakeElasticsearch(latency=args.es_latency_ms / 1000, search=hourly_sentiment) as server:
+        Config.ES_HOSTS = [server.url]
+        for threads, workers in args.settings:
+            Config.PREDICTOR_PREPARE_THREADS = threads
+            # Spawned training workers import an unpatched Config, which is fine: they only train
+            Config.PREDICTOR_WORKERS = workers
+            # The cold run fills the caches and stores the warm run reads
+            cache_dir = tempfile.mkdtemp(dir=workdir, prefix="cache-")
+            for cache in ["cold", "warm"]:
+                predictor = market_predictor.MarketPredictor()
+                predictor.market_data = MarketDataCache(os.path.join(cache_dir, "market-data"), provider)
+                predictor.feature_store.directory = os.path.join(cache_dir, "features")
+                predictor.model_store.directory = os.path.join(cache_dir, "models")
+                server.reset()
+                started = time.perf_counter()
+                predictor.run_pipeline()
+                print(f"{threads:>7} {workers:>7} {cache:>5} {time.perf_counter() - started:>8.2f} "
+                      f"{predictor.market_data.downloads:>9} {server.documents:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Micro-benchmark of tweet cleaning: the per-row Series.apply cleaners the ingestion scripts used
+before text_cleaning, against clean_series in one and several processes.
+
+    python stock_data/benchmarks/bench_text_cleaning.py --rows 1000000 --processes 4
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from text_cleaning import clean_series  # noqa: E402
+
+WORDS = ["stock", "earnings", "beat", "miss", "bullish", "bearish", "buy", "sell", "guidance",
+         "revenue", "growth", "shares", "today", "market", "rally", "dip", "calls", "puts"]
+EXTRAS = ["https://t.co/AbC123xyz", "www.example.com/news", "#AAPL", "#stocks", "@elonmusk",
+          "@CNBC", "\U0001F680", "\U0001F4C8\U0001F4C9", "$TSLA", "!!!", "❤"]
+
+
+def legacy_clean_text(text):
+    """SentimentAnalyzer._clean_text before the shared module"""
+    text = re.sub(r"http\S+|www\S+|https\S+", "", text, flags=re.MULTILINE)
+    text = re.sub(r"#\w+", "", text)
+    text = re.sub(r"@\w+", "", text)
+    emoji_pattern = re.compile(
+        "["
+        "\U0001F600-\U0001F64F"
+        "\U0001F300-\U0001F5FF"
+        "\U0001F680-\U0001F6FF"
+        "\U0001F700-\U0001F77F"
+        "\U0001F780-\U0001F7FF"
+        "\U0001F800-\U0001F8FF"
+        "\U0001F900-\U0001F9FF"
+        "\U0001FA00-\U0001FA6F"
+        "\U0001FA70-\U0001FAFF"
+        "\U00002702-\U000027B0"
+        "\U000024C2-\U0001F251"
+        "]+", flags=re.UNICODE)
+    text = emoji_pattern.sub(r"", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def legacy_root_clean_text(text):
+    """Root sentiment_pipeline.clean_text before the shared module"""
+    text = re.sub(r"http\S+|www\S+|https\S+", "", text, flags=re.MULTILINE)
+    text = re.sub(r"@\w+", "", text)
+    text = re.sub(r"#\w+", "", text)
+    text = re.sub(r"[^A-Za-z0-9\s]", "", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def make_tweets(rows, seed=0):
+    rng = random.Random(seed)
+    tweets = []
+    for _ in range(rows):
+        tokens = rng.choices(WORDS, k=rng.randint(5, 30))
+        for _ in range(rng.randint(0, 4)):
+            tokens.insert(rng.randrange(len(tokens) + 1), rng.choice(EXTRAS))
+        tweets.append(" ".join(tokens))
+    return pd.Series(tweets)
+
+
+def timed(label, rows, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<40} {elapsed:8.2f}s {rows / elapsed:12,.0f} rows/sec")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    tweets = make_tweets(args.rows)
+    print(f"{args.rows:,} synthetic tweets")
+
+    before = timed("before: Series.apply(_clean_text)", args.rows, lambda: tweets.apply(legacy_clean_text))
+    after = timed("after: clean_series", args.rows, lambda: clean_series(tweets))
+    if args.processes > 1:
+        timed(f"after: clean_series, {args.processes} processes", args.rows,
+              lambda: clean_series(tweets, processes=args.processes))
+    print(f"identical output: {before.equals(after)}")
+
+    before = timed("before: root Series.apply(clean_text)", args.rows, lambda: tweets.apply(legacy_root_clean_text))
+    after = timed("after: clean_series(strip_special=True)", args.rows,
+                  lambda: clean_series(tweets, strip_special=True))
+    print(f"identical output: {before.equals(after)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+In-process stand-in for the Elasticsearch endpoints the ingestion and the market predictor use:
+the product check on /, _bulk, _search and single-document _doc. Bodies are parsed and counted,
+not stored, so indexing cost is the client side plus an optional simulated per-request latency
+and 429 rejection rate. Searches are answered by a function the benchmark supplies.
+"""
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+VERSION = "8.17.2"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        # The client refuses to talk to anything that does not identify as Elasticsearch
+        self.send_header("X-Elastic-Product", "Elasticsearch")
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(payload)
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def do_HEAD(self):
+        self._reply(200, {})
+
+    def do_GET(self):
+        self._body()
+        if self.path.split("?")[0] == "/":
+            self._reply(200, {
+                "name": "fake-es",
+                "cluster_name": "benchmark",
+                "version": {"number": VERSION, "build_flavor": "default"},
+                "tagline": "You Know, for Search"
+            })
+        else:
+            self._reply(404, {"error": f"no handler for {self.path}", "status": 404})
+
+    def do_POST(self):
+        body = self._body()
+        path = self.path.split("?")[0].strip("/").split("/")
+        if path[-1] == "_bulk":
+            self._reply(200, self.server.bulk(body, path[0] if len(path) > 1 else None))
+        elif path[-1] == "_search" and self.server.search is not None:
+            self._reply(200, self.server.answer_search(path[0], json.loads(body or b"{}")))
+        elif len(path) == 2 and path[1] == "_doc":
+            self._reply(201, self.server.index_document(path[0]))
+        else:
+            self._reply(404, {"error": f"no handler for {self.path}", "status": 404})
+
+    do_PUT = do_POST
+
+
+class FakeElasticsearch(ThreadingHTTPServer):
+    """Threaded HTTP server answering _bulk requests; use as a context manager"""
+
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, reject_rate=0.0, seed=0, search=None):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        # search(index, body) -> response body, _search answers 404 without it
+        self.search = search
+        self.reject_rate = reject_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.reset()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.bytes = 0
+            self.documents = 0
+            self.rejected = 0
+            self.searches = 0
+
+    def bulk(self, body, default_index):
+        if self.latency:
+            time.sleep(self.latency)
+
+        lines = body.splitlines()
+        items = []
+        i = 0
+        while i < len(lines):
+            if not lines[i].strip():
+                i += 1
+                continue
+            op, meta = next(iter(json.loads(lines[i]).items()))
+            # Every action except delete is followed by its source line
+            i += 1 if op == "delete" else 2
+            item = {"_index": meta.get("_index", default_index), "_id": meta.get("_id") or uuid.uuid4().hex}
+            with self.lock:
+                rejected = self.reject_rate and self.random.random() < self.reject_rate
+            if rejected:
+                item.update(status=429, error={"type": "es_rejected_execution_exception",
+                                               "reason": "rejected by the benchmark"})
+            else:
+                item.update(_version=1, result="created", status=201)
+            items.append({op: item})
+
+        rejected = sum(1 for item in items if next(iter(item.values()))["status"] == 429)
+        with self.lock:
+            self.requests += 1
+            self.bytes += len(body)
+            self.documents += len(items) - rejected
+            self.rejected += rejected
+        return {"took": 1, "errors": bool(rejected), "items": items}
+
+    def answer_search(self, index, body):
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            self.searches += 1
+        return dict({"took": 1, "timed_out": False, "hits": {"total": {"value": 0, "relation": "eq"}, "hits": []}},
+                    **self.search(index, body))
+
+    def index_document(self, index):
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            self.requests += 1
+            self.documents += 1
+        return {"_index": index, "_id": uuid.uuid4().hex, "_version": 1, "result": "created"}
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.serve_forever, name="fake-es", daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+        self.thread.join()
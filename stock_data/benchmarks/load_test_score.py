@@ -0,0 +1,192 @@
+"""
+Load test of the backend's /sentiment/score endpoint: requests/sec and p50/p95/p99 latency at
+increasing concurrency. By default it serves the sentiment blueprint itself with a tiny random BERT,
+once per max batch size, so micro-batching can be compared against scoring each request on its own.
+
+    python stock_data/benchmarks/load_test_score.py --max-batch-sizes 1,32
+    python stock_data/benchmarks/load_test_score.py --url http://localhost:5000 --model ProsusAI/finbert
+
+The server runs in its own process so the load generator does not compete with it for the GIL.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(BENCHMARKS_DIR, "..", "..", "backend")
+
+
+def _sizes(value):
+    return [int(size) for size in value.split(",")]
+
+
+def serve(port, model, max_batch_size, max_wait_ms):
+    """Serve only the sentiment blueprint; the full app also loads the LSTM predictor's dependencies"""
+    os.environ.update({
+        "SENTIMENT_MODEL": model,
+        "SENTIMENT_MAX_BATCH_SIZE": str(max_batch_size),
+        "SENTIMENT_MAX_WAIT_MS": str(max_wait_ms)
+    })
+    sys.path.insert(0, BACKEND_DIR)
+    from flask import Flask, jsonify
+    from werkzeug.serving import make_server
+    from controllers.sentiment_controller import sentiment_bp
+    from services.sentiment_service import get_batcher, warm_up
+
+    app = Flask(__name__)
+    app.register_blueprint(sentiment_bp)
+
+    @app.route("/stats")
+    def stats():
+        batcher = get_batcher()
+        return jsonify({"batches": batcher.batches, "texts": batcher.texts})
+
+    warm_up()
+    make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+
+
+def _post(url, payload):
+    request = urllib.request.Request(f"{url}/sentiment/score", data=json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return response.read()
+
+
+def _get_json(url):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def run_level(url, texts, concurrency, duration, texts_per_request):
+    """Keep `concurrency` clients busy for duration seconds and return throughput and latency percentiles"""
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + duration
+
+    def client(seed):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            batch = rng.sample(texts, texts_per_request)
+            payload = {"text": batch[0]} if texts_per_request == 1 else {"texts": batch}
+            started = time.perf_counter()
+            try:
+                _post(url, payload)
+            except OSError as e:
+                errors.append(e)
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    clients = [threading.Thread(target=client, args=(seed,)) for seed in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_sec": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 0.50) * 1000 if latencies else None,
+        "p95_ms": _percentile(latencies, 0.95) * 1000 if latencies else None,
+        "p99_ms": _percentile(latencies, 0.99) * 1000 if latencies else None
+    }
+
+
+def sweep(url, texts, args, stats_url=None):
+    results = []
+    print(f"{'clients':>7} {'req/sec':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}"
+          + (f" {'batch':>6}" if stats_url else ""))
+    for concurrency in args.concurrency:
+        before = _get_json(stats_url) if stats_url else None
+        result = run_level(url, texts, concurrency, args.duration, args.texts_per_request)
+        if stats_url:
+            after = _get_json(stats_url)
+            batches = after["batches"] - before["batches"]
+            result["mean_batch_size"] = (after["texts"] - before["texts"]) / batches if batches else 0.0
+        results.append(result)
+        print(f"{concurrency:>7} {result['requests_per_sec']:>9.1f} {result['p50_ms'] or 0:>8.1f} "
+              f"{result['p95_ms'] or 0:>8.1f} {result['p99_ms'] or 0:>8.1f} {result['errors']:>6}"
+              + (f" {result['mean_batch_size']:>6.1f}" if stats_url else ""))
+    return results
+
+
+def _wait_until_ready(stats_url, server, timeout=300):
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if server.poll() is not None:
+            raise RuntimeError(f"Scoring server exited with {server.returncode}")
+        try:
+            return _get_json(stats_url)
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f"Scoring server did not start within {timeout}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="running backend to load instead of serving one")
+    parser.add_argument("--model", help="model name or path instead of the tiny random BERT")
+    parser.add_argument("--concurrency", type=_sizes, default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--duration", type=float, default=10, help="seconds per concurrency level")
+    parser.add_argument("--texts-per-request", type=int, default=1)
+    parser.add_argument("--max-batch-sizes", type=_sizes, default=[32], help="served runs only")
+    parser.add_argument("--max-wait-ms", type=float, default=5, help="served runs only")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--output", default="load-test-results.json")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.model, args.max_batch_sizes[0], args.max_wait_ms)
+        return
+
+    sys.path.insert(0, BENCHMARKS_DIR)
+    from synthetic_tweets import _text
+    rng = random.Random(0)
+    texts = [_text(rng) for _ in range(2000)]
+
+    report = {"created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "duration": args.duration,
+              "texts_per_request": args.texts_per_request, "runs": []}
+    if args.url:
+        print(f"Loading {args.url}")
+        report["runs"].append({"url": args.url, "results": sweep(args.url, texts, args)})
+    else:
+        from tiny_model import build_tiny_model
+        model = args.model or build_tiny_model(os.path.join(tempfile.mkdtemp(prefix="score-bench-"), "tiny-finbert"))
+        url = f"http://127.0.0.1:{args.port}"
+        for max_batch_size in args.max_batch_sizes:
+            print(f"\nmax batch size {max_batch_size}, max wait {args.max_wait_ms} ms, model {model}")
+            server = subprocess.Popen([sys.executable, __file__, "--serve", "--port", str(args.port), "--model", model,
+                                       "--max-batch-sizes", str(max_batch_size), "--max-wait-ms", str(args.max_wait_ms)],
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                _wait_until_ready(f"{url}/stats", server)
+                results = sweep(url, texts, args, stats_url=f"{url}/stats")
+            finally:
+                server.terminate()
+                server.wait()
+            report["runs"].append({"max_batch_size": max_batch_size, "max_wait_ms": args.max_wait_ms,
+                                   "model": args.model or "tiny-random-bert", "results": results})
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
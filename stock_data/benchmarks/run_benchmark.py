@@ -0,0 +1,226 @@
+"""
+Offline throughput benchmark of SentimentAnalyzer.process_data: synthetic tweets, a tiny random
+BERT and an in-process Elasticsearch stand-in, swept over chunk and batch sizes. Reports rows/sec
+and seconds per stage, saves them as JSON and can compare against an earlier results file.
+
+    python stock_data/benchmarks/run_benchmark.py --rows 50000 --output before.json
+    python stock_data/benchmarks/run_benchmark.py --rows 50000 --output after.json --baseline before.json
+
+Stages overlap in pipelined mode, so their seconds can add up to more than the wall time.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from config import Config  # noqa: E402
+from chunk_readers import csv_to_parquet  # noqa: E402
+from sentiment_pipeline import INFERENCE_BACKENDS, STAGES, SentimentAnalyzer, _csv_dtypes  # noqa: E402
+from fake_es import FakeElasticsearch  # noqa: E402
+from synthetic_tweets import write_csv  # noqa: E402
+from tiny_model import build_tiny_model  # noqa: E402
+
+# The pipeline's "inference" stage is the forward pass
+STAGE_NAMES = ["forward" if stage == "inference" else stage for stage in STAGES]
+
+
+def _sizes(value):
+    return [int(size) for size in value.split(",")]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _host():
+    import torch
+    import transformers
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "transformers": transformers.__version__
+    }
+
+
+def _convert(csv_path, input_format):
+    """The synthetic CSV in the benchmarked input format"""
+    if input_format == "csv":
+        return csv_path
+    parquet_path = os.path.splitext(csv_path)[0] + ".parquet"
+    csv_to_parquet(csv_path, parquet_path, dtype=_csv_dtypes(), date_columns=[Config.DATE_COL])
+    if input_format == "parquet":
+        return parquet_path
+
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+    arrow_path = os.path.splitext(csv_path)[0] + ".arrow"
+    feather.write_feather(pq.read_table(parquet_path), arrow_path)
+    return arrow_path
+
+
+def _configure(args, model, es_url, workdir):
+    """Point Config at the benchmark inputs; only in-process modes see these class attributes"""
+    Config.MODEL_NAME = model
+    Config.ES_HOSTS = [es_url]
+    Config.INFERENCE_BACKEND = args.backend
+    Config.INFERENCE_MODE = args.inference_mode
+    Config.PIPELINED = args.pipelined
+    Config.CASCADE = args.cascade_threshold is not None
+    if Config.CASCADE:
+        Config.CASCADE_THRESHOLD = args.cascade_threshold
+    Config.NEAR_DUPLICATES = args.near_duplicate_threshold is not None
+    if Config.NEAR_DUPLICATES:
+        Config.NEAR_DUPLICATE_THRESHOLD = args.near_duplicate_threshold
+    # Spawned workers would re-import an unpatched Config
+    Config.NUM_WORKERS = 1
+    # A warm cache would turn every run after the first into lookups
+    Config.SENTIMENT_CACHE_PATH = None
+    Config.INCREMENTAL = False
+    # Every point is run with its own batch size
+    Config.AUTOTUNE = False
+    Config.ES_INITIAL_BACKOFF = 0.01
+    Config.DEAD_LETTER_PATH = os.path.join(workdir, "dead-letter.ndjson")
+
+
+def run_once(analyzer, server, input_path, chunk_size, batch_size):
+    """Process input_path once and return throughput, stage seconds and bulk traffic"""
+    Config.CSV_PATH = input_path
+    Config.CHUNK_SIZE = chunk_size
+    Config.BATCH_SIZE = batch_size
+    analyzer.batch_size = batch_size
+    server.reset()
+
+    started = time.perf_counter()
+    analyzer.process_data(incremental=False)
+    elapsed = time.perf_counter() - started
+
+    stats = analyzer.stats
+    return {
+        "chunk_size": chunk_size,
+        "batch_size": batch_size,
+        "rows": stats["rows"],
+        "indexed": server.documents,
+        "wall_seconds": elapsed,
+        "rows_per_sec": stats["rows"] / elapsed,
+        "stages": {name: stats[f"{stage}_seconds"] for name, stage in zip(STAGE_NAMES, STAGES)},
+        "padding_waste": 1 - stats["tokens"] / stats["padded_tokens"] if stats["padded_tokens"] else 0.0,
+        "escalation_rate": stats["cascade_escalated"] / stats["cascade_texts"] if stats["cascade_texts"] else None,
+        "near_duplicate_clusters": stats["near_duplicate_clusters"] if Config.NEAR_DUPLICATES else None,
+        "model_rows": stats["model_rows"],
+        "bulk_requests": server.requests,
+        "bulk_bytes": server.bytes
+    }
+
+
+def compare(results, baseline_path, tolerance):
+    """Print rows/sec against a baseline results file and return the number of regressions"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r["chunk_size"], r["batch_size"]): r for r in baseline["results"]}
+    print(f"\nAgainst {baseline_path} (commit {baseline.get('commit')}):")
+
+    regressions = 0
+    for result in results:
+        before = previous.get((result["chunk_size"], result["batch_size"]))
+        if before is None:
+            continue
+        change = result["rows_per_sec"] / before["rows_per_sec"] - 1
+        regressed = change < -tolerance
+        regressions += regressed
+        print(f"  chunk {result['chunk_size']:>6} batch {result['batch_size']:>4}: "
+              f"{before['rows_per_sec']:10,.0f} -> {result['rows_per_sec']:10,.0f} rows/sec "
+              f"({change:+.1%}){'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--chunk-sizes", type=_sizes, default=[2000, 10000])
+    parser.add_argument("--batch-sizes", type=_sizes, default=[64, 512])
+    parser.add_argument("--repeats", type=int, default=1, help="runs per point, the fastest is kept")
+    parser.add_argument("--model", help="model name or path instead of the tiny random BERT")
+    parser.add_argument("--backend", choices=INFERENCE_BACKENDS, default="fp32")
+    parser.add_argument("--inference-mode", choices=["fixed", "bucketed"], default=Config.INFERENCE_MODE)
+    parser.add_argument("--pipelined", action="store_true")
+    parser.add_argument("--cascade-threshold", type=float, help="run the TextBlob -> FinBERT cascade at this threshold")
+    parser.add_argument("--near-duplicate-threshold", type=float,
+                        help="cluster near-duplicate texts at this similarity and score one per cluster")
+    parser.add_argument("--input-format", choices=["csv", "parquet", "arrow"], default="csv")
+    parser.add_argument("--es-latency-ms", type=float, default=0.0, help="simulated latency per bulk request")
+    parser.add_argument("--es-reject-rate", type=float, default=0.0, help="share of bulk items rejected with 429")
+    parser.add_argument("--workdir", help="where the CSV and tiny model go, a temporary directory by default")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare rows/sec against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="slowdown reported as a regression")
+    parser.add_argument("--verbose", action="store_true", help="keep the pipeline's per-chunk logging")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="sentiment-bench-")
+    input_path = _convert(write_csv(os.path.join(workdir, "tweets.csv"), args.rows), args.input_format)
+    warmup_path = _convert(write_csv(os.path.join(workdir, "warmup.csv"), 1000, seed=1), args.input_format)
+    model = args.model or build_tiny_model(os.path.join(workdir, "tiny-finbert"))
+    print(f"{args.rows:,} synthetic rows, model {model}, workdir {workdir}")
+
+    results = []
+    with FakeElasticsearch(latency=args.es_latency_ms / 1000, reject_rate=args.es_reject_rate) as server:
+        _configure(args, model, server.url, workdir)
+        analyzer = SentimentAnalyzer()
+        # One-off costs such as lazy initialization stay out of the first point
+        run_once(analyzer, server, warmup_path, args.chunk_sizes[0], args.batch_sizes[0])
+
+        print(f"{'chunk':>6} {'batch':>5} {'rows/sec':>10} " + " ".join(f"{name:>9}" for name in STAGE_NAMES))
+        for chunk_size in args.chunk_sizes:
+            for batch_size in args.batch_sizes:
+                result = min((run_once(analyzer, server, input_path, chunk_size, batch_size)
+                              for _ in range(args.repeats)), key=lambda r: r["wall_seconds"])
+                results.append(result)
+                print(f"{chunk_size:>6} {batch_size:>5} {result['rows_per_sec']:>10,.0f} "
+                      + " ".join(f"{seconds:>8.2f}s" for seconds in result["stages"].values()))
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": _git_commit(),
+        "host": _host(),
+        "settings": {
+            "rows": args.rows,
+            "repeats": args.repeats,
+            "model": args.model or "tiny-random-bert",
+            "backend": args.backend,
+            "inference_mode": args.inference_mode,
+            "pipelined": args.pipelined,
+            "cascade_threshold": args.cascade_threshold,
+            "near_duplicate_threshold": args.near_duplicate_threshold,
+            "input_format": args.input_format,
+            "es_latency_ms": args.es_latency_ms,
+            "es_reject_rate": args.es_reject_rate
+        },
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {args.output}")
+
+    if args.baseline and compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
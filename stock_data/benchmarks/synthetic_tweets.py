@@ -0,0 +1,124 @@
+"""
+Synthetic tweet CSV with the columns of the real scrape, for benchmarks that cannot use it.
+
+Tweet lengths follow a log-normal word count with a small tail of very long texts, and about a
+quarter of the rows repeat earlier viral tweets, half of them as retweets, with a Zipf-like
+popularity so a few texts are repeated many times.
+
+    python stock_data/benchmarks/synthetic_tweets.py /tmp/tweets.csv --rows 200000
+"""
+import argparse
+import csv
+import math
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from config import Config  # noqa: E402
+
+COLUMNS = ["created_at", "text", "group_name", "screenname", "username", "followers", "friends",
+           "retweet_count", "polarity", "location", "search_query", "twitter_id", "partition_0", "partition_1"]
+
+WORDS = ("stock stocks shares market earnings revenue guidance beat miss bullish bearish buy sell hold "
+         "calls puts options rally dip crash moon short squeeze long position price target upgrade "
+         "downgrade analyst quarter growth profit loss margin dividend split valuation chart support "
+         "resistance breakout volume today tomorrow week year new high low up down big huge strong weak "
+         "the a an and or but is are was be to of in on for with at by from this that it its my our "
+         "they we you i just really very not no yes again still now time good bad great best worst "
+         "ai chips cloud ads streaming subscribers cars deliveries battery gpu data center").split()
+EXTRAS = ["https://t.co/AbC123xyz", "https://t.co/Zz9yQ", "www.example.com/news", "#stocks", "#investing",
+          "@elonmusk", "@CNBC", "@jimcramer", "\U0001F680", "\U0001F4C8", "\U0001F4C9", "\U0001F525", "!!!",
+          "?", "$", "%", "&amp;"]
+UNMAPPED_GROUPS = ["Meta", "Intel", "Oracle"]
+LOCATIONS = ["New York, NY", "London", "San Francisco, CA", "Lagos, Nigeria", "Toronto", None]
+
+# Row mix: share of rows repeating a viral tweet, unmapped tickers and rows without text
+DUPLICATE_RATE = 0.25
+UNMAPPED_RATE = 0.05
+MISSING_TEXT_RATE = 0.01
+# Share of texts that are far longer than a tweet (threads, scraped articles)
+LONG_TEXT_RATE = 0.01
+VIRAL_POOL_SIZE = 2000
+
+
+def _text(rng):
+    if rng.random() < LONG_TEXT_RATE:
+        words = rng.randint(200, 600)
+    else:
+        words = min(max(int(rng.lognormvariate(math.log(14), 0.6)), 1), 60)
+    tokens = rng.choices(WORDS, k=words)
+    for _ in range(rng.choices(range(5), weights=[22, 33, 25, 13, 7])[0]):
+        tokens.insert(rng.randrange(len(tokens) + 1), rng.choice(EXTRAS))
+    if rng.random() < 0.3:
+        tokens.insert(0, f"${rng.choice(list(Config.TICKER_MAPPING.values()))}")
+    return " ".join(tokens)
+
+
+def iter_rows(rows, seed=0):
+    """Yield synthetic rows as lists in COLUMNS order"""
+    rng = random.Random(seed)
+    groups = list(Config.TICKER_MAPPING)
+    viral = []
+    created_at = datetime(2023, 1, 1)
+    twitter_id = 1600000000000000000
+
+    for _ in range(rows):
+        created_at += timedelta(seconds=int(rng.expovariate(1 / 3)))
+        twitter_id += rng.randint(1, 1000)
+
+        if viral and rng.random() < DUPLICATE_RATE:
+            # Pareto ranks, so lower indexes are far more popular
+            original = viral[min(int(rng.paretovariate(0.5)) - 1, len(viral) - 1)]
+            text = f"RT @user{rng.randrange(1000)}: {original}" if rng.random() < 0.5 else original
+        else:
+            text = _text(rng)
+            if len(viral) < VIRAL_POOL_SIZE and rng.random() < 0.05:
+                viral.append(text)
+        if rng.random() < MISSING_TEXT_RATE:
+            text = None
+
+        group = rng.choice(UNMAPPED_GROUPS) if rng.random() < UNMAPPED_RATE else rng.choice(groups)
+        user = rng.randrange(50000)
+        yield [
+            created_at.strftime("%Y-%m-%d %H:%M:%S"),
+            text,
+            group,
+            f"trader{user}",
+            f"Trader {user}",
+            int((rng.paretovariate(1.2) - 1) * 100),
+            int((rng.paretovariate(1.5) - 1) * 200),
+            int((rng.paretovariate(1.8) - 1) * 2),
+            round(rng.uniform(-1, 1), 4),
+            rng.choice(LOCATIONS),
+            group,
+            twitter_id,
+            created_at.year,
+            created_at.month,
+        ]
+
+
+def write_csv(path, rows, seed=0):
+    """Write a synthetic tweet CSV and return its path"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerows(iter_rows(rows, seed))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    write_csv(args.path, args.rows, args.seed)
+    print(f"Wrote {args.rows:,} rows to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+A tiny randomly initialized BERT sequence classifier saved in the same layout as ProsusAI/finbert,
+so AutoTokenizer/AutoModelForSequenceClassification load it through Config.MODEL_NAME. Its scores
+are meaningless; it only exercises the same code paths at a fraction of the cost.
+
+    python stock_data/benchmarks/tiny_model.py /tmp/tiny-finbert
+"""
+import argparse
+import os
+import string
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic_tweets import WORDS  # noqa: E402
+
+SPECIAL_TOKENS = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+# FinBERT's label order, which SENTIMENT_LABELS relies on
+ID2LABEL = {0: "positive", 1: "negative", 2: "neutral"}
+
+
+def _vocab():
+    """Benchmark words plus single characters and their continuations, so any text tokenizes"""
+    chars = string.ascii_lowercase + string.digits + string.punctuation
+    return SPECIAL_TOKENS + sorted(set(WORDS) | set(chars)) + [f"##{c}" for c in chars]
+
+
+def build_tiny_model(path, hidden_size=64, layers=2, heads=2, max_length=512, seed=0):
+    """Save a tiny BERT classifier and its WordPiece tokenizer to path and return path"""
+    import torch
+    from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+
+    os.makedirs(path, exist_ok=True)
+    vocab_file = os.path.join(path, "vocab.txt")
+    with open(vocab_file, "w") as f:
+        f.write("\n".join(_vocab()) + "\n")
+    tokenizer = BertTokenizerFast(vocab_file=vocab_file, do_lower_case=True, model_max_length=max_length)
+    tokenizer.save_pretrained(path)
+
+    config = BertConfig(
+        vocab_size=tokenizer.vocab_size,
+        hidden_size=hidden_size,
+        num_hidden_layers=layers,
+        num_attention_heads=heads,
+        intermediate_size=hidden_size * 4,
+        max_position_embeddings=max_length,
+        num_labels=len(ID2LABEL),
+        id2label=ID2LABEL,
+        label2id={label: i for i, label in ID2LABEL.items()}
+    )
+    torch.manual_seed(seed)
+    BertForSequenceClassification(config).save_pretrained(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--hidden-size", type=int, default=64)
+    parser.add_argument("--layers", type=int, default=2)
+    parser.add_argument("--heads", type=int, default=2)
+    args = parser.parse_args()
+
+    build_tiny_model(args.path, args.hidden_size, args.layers, args.heads)
+    print(f"Saved tiny model to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
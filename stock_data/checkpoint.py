@@ -0,0 +1,61 @@
+import hashlib
+import logging
+import os
+import pandas as pd
+from storage import load_or_none, read_json, write_json
+
+logger = logging.getLogger(__name__)
+
+# Bytes before the watermark fingerprinted to detect a replaced file
+_TAIL_BYTES = 4096
+
+
+def _fingerprint(path, offset):
+    with open(path, 'rb') as f:
+        f.seek(max(0, offset - _TAIL_BYTES))
+        return hashlib.sha1(f.read(min(offset, _TAIL_BYTES))).hexdigest()
+
+
+class IngestCheckpoint:
+    """Watermark of the last fully indexed chunk of an append-only CSV file"""
+
+    def __init__(self, path, source):
+        self.path = path
+        self.source = os.path.abspath(source)
+        self.state = self._load()
+
+    def _load(self):
+        state = load_or_none(self.path, read_json, "checkpoint", (OSError, ValueError))
+        if state is None:
+            return {}
+        if state.get("source") != self.source:
+            logger.info(f"Checkpoint {self.path} belongs to {state.get('source')}, starting fresh")
+            return {}
+        return state
+
+    def start_offset(self):
+        """Byte offset to resume from, 0 when there is no checkpoint or the file was replaced"""
+        offset = self.state.get("offset", 0)
+        if not offset:
+            return 0
+
+        if os.path.getsize(self.source) < offset or _fingerprint(self.source, offset) != self.state.get("fingerprint"):
+            logger.warning(f"{self.source} was truncated or replaced since the last run, reprocessing from the start")
+            return 0
+
+        logger.info(f"Resuming {self.source} from byte {offset} "
+                    f"(last created_at {self.state.get('last_created_at')}, "
+                    f"last twitter_id {self.state.get('last_twitter_id')})")
+        return offset
+
+    def save(self, offset, last_created_at=None, last_twitter_id=None):
+        """Atomically record that everything before offset has been indexed"""
+        self.state = {
+            "source": self.source,
+            "offset": offset,
+            "fingerprint": _fingerprint(self.source, offset),
+            "last_created_at": last_created_at,
+            "last_twitter_id": last_twitter_id,
+            "updated_at": pd.Timestamp.now(tz="UTC").isoformat()
+        }
+        write_json(self.path, self.state)
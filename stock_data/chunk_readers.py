@@ -0,0 +1,261 @@
+import io
+import logging
+import os
+import pandas as pd
+from storage import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# File extensions read through pyarrow.dataset instead of pandas' CSV reader
+ARROW_FORMATS = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow"
+}
+
+
+def detect_format(path):
+    """"parquet", "arrow" (IPC/Feather) or "csv" from a file or directory extension"""
+    return ARROW_FORMATS.get(os.path.splitext(path.rstrip("/"))[1].lower(), "csv")
+
+
+def read_csv_header(path):
+    """Return the raw header line of a CSV file"""
+    with open(path, 'rb') as f:
+        return f.readline()
+
+
+def iter_csv_chunks(path, chunksize, start_offset=0, **read_csv_kwargs):
+    """
+    Yield (chunk, end_offset) pairs for the records of a CSV file from a byte offset onwards.
+    Record boundaries are found by quote parity so quoted fields may span lines, and a trailing
+    record without its newline is left for the next run since it may still be being written.
+    """
+    with open(path, 'rb') as f:
+        header = f.readline()
+        offset = max(start_offset, len(header))
+        f.seek(offset)
+
+        lines = []
+        rows = 0
+        in_quotes = False
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            lines.append(line)
+            # An odd number of quotes flips whether the record continues on the next line
+            if line.count(b'"') % 2:
+                in_quotes = not in_quotes
+            if in_quotes:
+                continue
+
+            rows += 1
+            if rows >= chunksize:
+                offset += sum(len(l) for l in lines)
+                yield _parse_records(header, lines, read_csv_kwargs), offset
+                lines = []
+                rows = 0
+
+        if rows:
+            # Only complete records are parsed, a dangling quoted record stays unconsumed
+            complete = lines if not in_quotes else lines[:_last_record_end(lines)]
+            offset += sum(len(l) for l in complete)
+            yield _parse_records(header, complete, read_csv_kwargs), offset
+
+
+def _last_record_end(lines):
+    """Number of leading lines that form complete records"""
+    in_quotes = False
+    end = 0
+    for i, line in enumerate(lines):
+        if line.count(b'"') % 2:
+            in_quotes = not in_quotes
+        if not in_quotes:
+            end = i + 1
+    return end
+
+
+def _parse_records(header, lines, read_csv_kwargs):
+    return pd.read_csv(io.BytesIO(header + b''.join(lines)), **read_csv_kwargs)
+
+
+def _arrow_dtype(arrow_type):
+    """
+    Strings stay in Arrow buffers as pyarrow-backed StringDtype instead of becoming Python objects,
+    and integers map to Int64 so nulls do not turn 64-bit ids into floats
+    """
+    import pyarrow as pa
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.StringDtype("pyarrow")
+    if pa.types.is_integer(arrow_type):
+        return pd.Int64Dtype()
+    return None
+
+
+def iter_arrow_chunks(path, chunksize, columns, file_format="parquet", filter_column=None, filter_values=None,
+                      categorical_columns=(), on_filtered=None):
+    """
+    Yield DataFrames of chunksize rows from a Parquet or Arrow IPC file or directory. Only the
+    columns that exist are read, and with a filter_column the scan skips rows whose value is not
+    in filter_values, using row group statistics where the file has them; on_filtered is then
+    called with the number of rows skipped once the scan ends. categorical_columns are
+    dictionary encoded in Arrow and arrive as pandas categoricals.
+    """
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(path, format="ipc" if file_format == "arrow" else file_format)
+    names = set(dataset.schema.names)
+    scan_filter = None
+    if filter_column in names and filter_values is not None:
+        scan_filter = ds.field(filter_column).isin(list(filter_values))
+
+    batches = dataset.to_batches(columns=[c for c in columns if c in names], filter=scan_filter, batch_size=chunksize)
+    kept = 0
+    for table in _rechunk(batches, chunksize):
+        kept += table.num_rows
+        for column in categorical_columns:
+            if column in names:
+                table = table.set_column(table.schema.get_field_index(column), column,
+                                         pc.dictionary_encode(table.column(column)))
+        yield table.to_pandas(types_mapper=_arrow_dtype)
+    if scan_filter is not None and on_filtered is not None:
+        # Unfiltered row counts come from file metadata where the format has it
+        on_filtered(dataset.count_rows() - kept)
+
+
+def _rechunk(batches, chunksize):
+    """Regroup record batches of any size, filtered ones come out small, into tables of chunksize rows"""
+    import pyarrow as pa
+
+    pending = []
+    rows = 0
+    for batch in batches:
+        pending.append(batch)
+        rows += batch.num_rows
+        if rows >= chunksize:
+            table = pa.Table.from_batches(pending)
+            for start in range(0, table.num_rows - chunksize + 1, chunksize):
+                yield table.slice(start, chunksize)
+            remainder = table.slice(table.num_rows - table.num_rows % chunksize)
+            pending = remainder.to_batches()
+            rows = remainder.num_rows
+
+    if rows:
+        yield pa.Table.from_batches(pending)
+
+
+def _arrow_csv_type(dtype):
+    """Arrow type for a pandas read_csv dtype name"""
+    import pyarrow as pa
+    return {
+        "Int64": pa.int64(),
+        "float64": pa.float64(),
+        "string": pa.string(),
+        "category": pa.dictionary(pa.int32(), pa.string())
+    }[str(dtype)]
+
+
+def iter_pyarrow_csv_chunks(path, chunksize, columns, dtype=None, date_columns=(), filter_column=None,
+                            filter_values=None, block_size=1024 * 1024, on_filtered=None):
+    """
+    Stream a CSV with pyarrow's multithreaded reader, yielding DataFrames of chunksize rows. Only the
+    listed columns are converted, rows whose filter_column is not in filter_values are dropped from
+    each Arrow batch before anything reaches pandas (on_filtered is called with the number dropped
+    from each batch), and "category" columns arrive as categoricals.
+    Quoted values may contain newlines. The reader reads ahead several blocks, so block_size bounds
+    its memory; past 1 MB larger blocks only add RSS.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+
+    header = pd.read_csv(io.BytesIO(read_csv_header(path)), nrows=0).columns
+    include = [c for c in columns if c in header]
+    column_types = {c: _arrow_csv_type(t) for c, t in (dtype or {}).items() if c in include}
+    # Dates are parsed by pandas as parse_dates does: pyarrow converts values with a UTC offset to
+    # UTC, losing the wall-clock time the pandas reader keeps
+    column_types.update({c: pa.string() for c in date_columns if c in include})
+    reader = pacsv.open_csv(
+        path,
+        read_options=pacsv.ReadOptions(block_size=block_size),
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+        # Empty strings are missing, as in pandas
+        convert_options=pacsv.ConvertOptions(include_columns=include, column_types=column_types,
+                                             strings_can_be_null=True)
+    )
+
+    def batches():
+        value_set = pa.array(list(filter_values)) if filter_column in include and filter_values is not None else None
+        for batch in reader:
+            if value_set is not None:
+                rows = batch.num_rows
+                batch = batch.filter(pc.is_in(batch.column(filter_column), value_set=value_set))
+                if on_filtered is not None and rows > batch.num_rows:
+                    on_filtered(rows - batch.num_rows)
+            yield batch
+
+    for table in _rechunk(batches(), chunksize):
+        chunk = table.to_pandas(types_mapper=_arrow_dtype)
+        for column in date_columns:
+            if column in chunk.columns:
+                try:
+                    chunk[column] = pd.to_datetime(chunk[column])
+                except (ValueError, TypeError):
+                    pass
+        yield chunk
+
+
+def _stable_dtypes(sample, dtype, date_columns):
+    """
+    Dtypes inferred from a sample chunk, pinned so every chunk gets the same schema: integers become
+    nullable Int64, other numbers keep their type and everything else is read as strings
+    """
+    dtypes = {}
+    for column, inferred in sample.dtypes.items():
+        if column in date_columns:
+            continue
+        if pd.api.types.is_integer_dtype(inferred):
+            dtypes[column] = "Int64"
+        elif pd.api.types.is_numeric_dtype(inferred):
+            dtypes[column] = inferred
+        else:
+            dtypes[column] = "string"
+    # Categories differ per chunk, Parquet dictionary-encodes plain strings anyway
+    dtypes.update({column: "string" if str(t) == "category" else t for column, t in (dtype or {}).items()})
+    return dtypes
+
+
+def csv_to_parquet(csv_path, parquet_path, chunksize=100000, dtype=None, date_columns=()):
+    """
+    Convert a CSV file to Parquet a chunk at a time and return the number of rows written.
+    Column types not given in dtype are inferred from the first chunk and then kept for the rest,
+    and date columns are parsed with unparseable values left null. One row group is written per chunk.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    dtypes = _stable_dtypes(pd.read_csv(csv_path, nrows=chunksize, dtype=dtype), dtype, date_columns)
+
+    writer = None
+    rows = 0
+    with atomic_write(parquet_path) as tmp_path:
+        try:
+            for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=dtypes):
+                for column in date_columns:
+                    if column in chunk.columns:
+                        chunk[column] = pd.to_datetime(chunk[column], errors="coerce")
+                table = pa.Table.from_pandas(chunk, schema=writer.schema if writer else None, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema)
+                writer.write_table(table)
+                rows += len(chunk)
+                logger.info(f"Converted {rows} rows of {csv_path}")
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            raise ValueError(f"{csv_path} has no rows to convert")
+    return rows
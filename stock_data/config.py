@@ -1,3 +1,6 @@
+import os
+
+
 class Config:
     CSV_PATH = "/Users/silemobayo/Documents/MSC-PROJECT/stock-prediction/data.csv"
     TICKER_MAPPING = {
@@ -17,13 +20,55 @@ class Config:
     DATE_COL = "created_at"
     TEXT_COL = "text"
     GROUP_COL = "group_name"
+    ID_COL = "twitter_id"
     USER_COLS = ["screenname", "username", "followers", "friends"]
     METRIC_COLS = ["retweet_count", "polarity"]
+    META_COLS = ["location", "search_query", "partition_0", "partition_1"]
+    CATEGORICAL_COLS = ["group_name", "location", "search_query"]  # low-cardinality text read as categoricals
+    INPUT_FORMAT = None  # "csv", "parquet" or "arrow" (IPC/Feather); None infers it from the CSV_PATH extension
     
     # Model Settings
     MODEL_NAME = "ProsusAI/finbert"
     BATCH_SIZE = 512
     CHUNK_SIZE = 10000
+    CSV_ENGINE = "pyarrow"  # "pyarrow" (streaming, filters tickers before pandas) or "pandas"; incremental runs use pandas
+    MAX_LENGTH = 512
+    
+    # Inference
+    INFERENCE_BACKEND = "fp32"  # "fp32", "int8" (dynamic quantization), "bf16" (autocast) or "compile"
+    PARITY_MIN_AGREEMENT = 0.99  # label agreement with fp32 a backend needs to pass the parity check
+    INFERENCE_MODE = "fixed"  # "fixed" (BATCH_SIZE rows per batch) or "bucketed" (length-sorted, token budget)
+    TOKEN_BUDGET = 16384  # max padded tokens (rows x longest row) per batch in bucketed mode
+    CASCADE = False  # label uncached texts with TextBlob first, only uncertain ones go to FinBERT
+    CASCADE_THRESHOLD = 0.5  # |TextBlob polarity| a lexical label needs to skip FinBERT
+    CASCADE_NEUTRAL_MAX_SUBJECTIVITY = 0.1  # TextBlob subjectivity up to which a polarity-0 neutral label skips FinBERT
+    CASCADE_AUDIT_RATE = 0.02  # share of lexical labels also scored by FinBERT to measure agreement
+    NEAR_DUPLICATES = False  # cluster near-identical texts with MinHash/LSH, FinBERT scores one per cluster
+    NEAR_DUPLICATE_THRESHOLD = 0.8  # estimated Jaccard similarity of character 5-grams to join a cluster
+    NEAR_DUPLICATE_NUM_PERM = 64  # MinHash permutations per text
+    NEAR_DUPLICATE_WINDOW_CHUNKS = 5  # recent chunks whose clusters later texts can join; off with NUM_WORKERS > 1
+    USE_HF_DATASET = False  # route chunks through datasets.Dataset (slower, kept for comparison)
+    NUM_WORKERS = 1  # inference processes; 1 runs in-process
+    THREADS_PER_WORKER = None  # torch intra-op threads per worker, None splits the cores evenly
+    PIPELINED = False  # overlap read/clean/tokenize, inference and indexing in separate stages
+    PIPELINE_QUEUE_SIZE = 2  # chunks buffered between pipeline stages
+    CLEAN_PROCESSES = 1  # processes for text cleaning on large chunks
+    
+    # Autotuning: calibrate threads, batch size and token budget once per host and reuse the saved profile
+    AUTOTUNE = False
+    AUTOTUNE_SAMPLE_ROWS = 500
+    AUTOTUNE_BATCH_SIZES = [8, 16, 32, 64, 128, 256, 512]
+    AUTOTUNE_TOKEN_BUDGETS = [2048, 4096, 8192, 16384, 32768]
+    AUTOTUNE_MEMORY_CAP_MB = None  # peak RSS of all inference processes together, None allows half the RAM
+    AUTOTUNE_PROFILE_DIR = os.path.expanduser("~/.cache/stock-sentiment/autotune")
+    
+    # Prediction cache (set the path to None to disable)
+    SENTIMENT_CACHE_PATH = os.path.expanduser("~/.cache/stock-sentiment/sentiment.sqlite3")
+    SENTIMENT_CACHE_MAX_ENTRIES = 2000000
+    
+    # Incremental ingestion: only rows appended since the last checkpoint are processed
+    INCREMENTAL = False
+    CHECKPOINT_PATH = os.path.expanduser("~/.cache/stock-sentiment/ingest-checkpoint.json")
     
     # Elasticsearch
     ES_HOSTS = ["http://localhost:9200"]
@@ -31,6 +76,32 @@ class Config:
     ES_PASSWORD = "your_password"
     SENTIMENT_INDEX = "stock-sentiment"
     PREDICTION_INDEX = "market-predictions"
+    ES_INDEX_THREADS = 4  # parallel_bulk threads
+    ES_BULK_CHUNK_SIZE = 500  # documents per bulk request
+    ES_BULK_MAX_BYTES = 10 * 1024 * 1024  # bytes per bulk request
+    ES_MAX_RETRIES = 5  # retries for documents rejected with 429
+    ES_INITIAL_BACKOFF = 2  # seconds, doubled on every retry
+    ES_MAX_BACKOFF = 60
+    DEAD_LETTER_PATH = os.path.expanduser("~/.cache/stock-sentiment/dead-letter.ndjson")
+    
+    # Metrics, exported when a run finishes (both unset disables export)
+    PUSHGATEWAY_URL = os.environ.get("PUSHGATEWAY_URL")  # e.g. "localhost:9091"
+    METRICS_TEXTFILE_DIR = os.environ.get("METRICS_TEXTFILE_DIR")  # node_exporter textfile collector directory
+    
+    # Market data: OHLCV bars cached as Parquet per (interval, ticker), only bars the cache misses are downloaded
+    MARKET_DATA_DIR = os.path.expanduser("~/.cache/stock-sentiment/market-data")  # None downloads every time
+    MARKET_DATA_PROVIDER = "yfinance"  # or "file:<directory>" with <interval>/<ticker>.csv or .parquet files
+    MARKET_DATA_MAX_AGE = 900  # seconds the latest cached bars are served before checking for new ones
+    
+    # Market prediction: sentiment and bars of all tickers are fetched once per run, then each ticker's
+    # features are prepared on threads and its model trained on processes (1 and 1 is sequential)
+    PREDICTOR_PREPARE_THREADS = 4  # tickers merged and featurized at once
+    PREDICTOR_WORKERS = 1  # training processes; 1 trains on a background thread
+    FEATURE_STORE_DIR = os.path.expanduser("~/.cache/stock-sentiment/features")  # None recomputes every run
+    FEATURE_STORE_RETENTION_DAYS = 90  # days of hourly rows kept per ticker, beyond the LOOKBACK_DAYS used for training
+    MODEL_STORE_DIR = os.path.expanduser("~/.cache/stock-sentiment/models")  # None retrains every run
+    MODEL_WARM_START_ITERATIONS = 20  # boosting iterations added when only new rows arrived
+    MODEL_MAX_ITERATIONS = 300  # past this many a ticker's model is retrained from scratch
     
     # Time Settings
     LOOKBACK_DAYS = 30
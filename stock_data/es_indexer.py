@@ -0,0 +1,95 @@
+import json
+import logging
+import os
+import time
+from elasticsearch import helpers
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Bulk item statuses worth retrying: the cluster is shedding load
+RETRY_STATUSES = {429}
+
+
+class BulkIndexer:
+    """
+    Index pre-serialized documents with parallel_bulk. Items rejected with 429 are retried with
+    exponential backoff, anything else that fails is appended to a dead-letter NDJSON file.
+    """
+
+    def __init__(self, es, index, thread_count=4, chunk_size=500, max_chunk_bytes=10 * 1024 * 1024,
+                 max_retries=5, initial_backoff=2, max_backoff=60, dead_letter_path=None):
+        self.es = es
+        self.index = index
+        self.thread_count = thread_count
+        self.chunk_size = chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.dead_letter_path = dead_letter_path
+
+    def _actions(self, documents):
+        for doc_id, source in documents.items():
+            # helpers pass bytes sources through without re-serializing them
+            yield {"_op_type": "index", "_index": self.index, "_id": doc_id, "_source": source}
+
+    def index_documents(self, documents):
+        """Index (doc_id, source_bytes) pairs, returning (indexed, dead_lettered) counts"""
+        pending = dict(documents)
+        success = 0
+        dead = []
+
+        for attempt in range(self.max_retries + 1):
+            retry = {}
+            started = time.perf_counter()
+            for ok, item in helpers.parallel_bulk(
+                self.es,
+                self._actions(pending),
+                thread_count=self.thread_count,
+                chunk_size=self.chunk_size,
+                max_chunk_bytes=self.max_chunk_bytes,
+                raise_on_error=False,
+                raise_on_exception=False
+            ):
+                result = item["index"]
+                if ok:
+                    success += 1
+                elif result.get("status") in RETRY_STATUSES:
+                    retry[result["_id"]] = pending[result["_id"]]
+                else:
+                    dead.append((result["_id"], result.get("status"), result.get("error")))
+            metrics.ES_BULK_SECONDS.observe(time.perf_counter() - started)
+
+            if not retry:
+                break
+            if attempt == self.max_retries:
+                dead.extend((doc_id, 429, "retries exhausted") for doc_id in retry)
+                break
+
+            backoff = min(self.initial_backoff * 2 ** attempt, self.max_backoff)
+            logger.warning(f"{len(retry)} documents rejected with 429, retrying in {backoff}s")
+            metrics.ES_BULK_RETRIED.inc(len(retry))
+            time.sleep(backoff)
+            pending = retry
+
+        if dead:
+            self._dead_letter(dead, dict(documents))
+        return success, len(dead)
+
+    def _dead_letter(self, dead, sources):
+        if not self.dead_letter_path:
+            logger.error(f"{len(dead)} documents failed permanently and no dead-letter file is configured")
+            return
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.dead_letter_path)), exist_ok=True)
+        with open(self.dead_letter_path, "a") as f:
+            for doc_id, status, error in dead:
+                f.write(json.dumps({
+                    "_index": self.index,
+                    "_id": doc_id,
+                    "status": status,
+                    "error": error if isinstance(error, (str, dict)) else str(error),
+                    "source": json.loads(sources[doc_id])
+                }) + "\n")
+        logger.error(f"{len(dead)} documents failed permanently, written to {self.dead_letter_path}")
@@ -0,0 +1,112 @@
+"""Hourly predictor features per ticker as Parquet, recomputed only from the first hour that changed"""
+import logging
+import os
+import pandas as pd
+from storage import atomic_write, load_or_none
+
+logger = logging.getLogger(__name__)
+
+INPUT_COLUMNS = ["sentiment_confidence", "social_impact", "Close", "Volume"]
+FEATURE_COLUMNS = [
+    "sentiment_confidence",
+    "sentiment_trend",
+    "sentiment_volatility",
+    "social_impact",
+    "social_volatility",
+    "Volume",
+    "price_momentum"
+]
+TREND_WINDOW = pd.Timedelta(hours=6)
+MOMENTUM_PERIODS = 4
+
+
+def compute_features(inputs, horizon):
+    """Derived features and the horizon's forward return for merged hourly inputs"""
+    merged = inputs.copy()
+    # Rolling statistics for sentiment confidence
+    merged['sentiment_trend'] = merged['sentiment_confidence'].rolling(TREND_WINDOW).mean().fillna(merged['sentiment_confidence'])
+    merged['sentiment_volatility'] = merged['sentiment_confidence'].pct_change().fillna(0)
+
+    # Social impact features
+    merged['social_volatility'] = merged['social_impact'].pct_change().fillna(0)
+
+    # Price momentum
+    merged['price_momentum'] = merged['Close'].pct_change(MOMENTUM_PERIODS).fillna(0)
+
+    # Handle prediction horizon
+    merged['target'] = merged['Close'].pct_change(horizon).shift(-horizon)
+    return merged
+
+
+def training_rows(table):
+    """Features and targets of the rows that have both"""
+    features = table[FEATURE_COLUMNS].dropna()
+    targets = table['target'].dropna()
+    common_index = features.index.intersection(targets.index)
+    return features.loc[common_index], targets.loc[common_index]
+
+
+def _first_change(stored, inputs):
+    """First hour from the start of inputs that is new, missing or different compared with the stored inputs"""
+    stored = stored.loc[stored.index >= inputs.index.min(), INPUT_COLUMNS]
+    hours = stored.index.union(inputs.index)
+    before, after = stored.reindex(hours), inputs.reindex(hours)
+    changed = ~((before == after) | (before.isna() & after.isna())).all(axis=1)
+    return hours[changed.to_numpy().argmax()] if changed.any() else None
+
+
+class FeatureStore:
+    """Tables as <directory>/ticker=<ticker>/features.parquet; without a directory every update computes in full"""
+
+    def __init__(self, directory, horizon, retention_days):
+        self.directory = directory
+        self.horizon = horizon
+        self.retention = pd.Timedelta(days=retention_days)
+
+    def _path(self, ticker):
+        return os.path.join(self.directory, f"ticker={ticker}", "features.parquet")
+
+    def read(self, ticker, start=None):
+        """The ticker's stored table from start on, or None"""
+        if not self.directory:
+            return None
+        table = load_or_none(self._path(ticker), pd.read_parquet, "feature table")
+        if table is None:
+            return None
+        return table if start is None else table[table.index >= start]
+
+    def _save(self, ticker, table):
+        if not self.directory:
+            return
+        with atomic_write(self._path(ticker)) as tmp_path:
+            table.to_parquet(tmp_path)
+
+    def update(self, ticker, inputs):
+        """
+        Merge freshly fetched hourly inputs (INPUT_COLUMNS, UTC index) into the ticker's table,
+        recomputing only the rows they affect, and return the whole table
+        """
+        inputs = inputs[INPUT_COLUMNS].sort_index()
+        stored = self.read(ticker)
+        if stored is not None and list(stored.columns[:len(INPUT_COLUMNS)]) != INPUT_COLUMNS:
+            logger.warning(f"Feature table of {ticker} has other columns, rebuilding it")
+            stored = None
+        if stored is None or stored.empty:
+            table = compute_features(inputs, self.horizon)
+            logger.info(f"Computed {len(table)} feature rows for {ticker}")
+        else:
+            since = _first_change(stored, inputs)
+            if since is None:
+                logger.info(f"Features of {ticker} up to date, {len(stored)} rows")
+                return stored
+            merged = pd.concat([stored.loc[stored.index < since, INPUT_COLUMNS], inputs[inputs.index >= since]])
+            # Targets of the rows just before look ahead into the changed ones
+            first = max(0, merged.index.searchsorted(since) - self.horizon)
+            context = min(max(0, first - MOMENTUM_PERIODS),
+                          merged.index.searchsorted(merged.index[first] - TREND_WINDOW, side="right"))
+            tail = compute_features(merged.iloc[context:], self.horizon).iloc[first - context:]
+            table = pd.concat([stored.loc[stored.index < tail.index[0]], tail])
+            logger.info(f"Recomputed {len(tail)} of {len(table)} feature rows for {ticker} from {tail.index[0]}")
+        table = table[table.index >= table.index.max() - self.retention]
+        self._save(ticker, table)
+        return table
@@ -0,0 +1,215 @@
+"""OHLCV bars from a provider, cached as Parquet per (interval, ticker) and refreshed incrementally"""
+import abc
+import json
+import logging
+import os
+import threading
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from storage import atomic_write, load_or_none
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+_METADATA_KEY = b"market_data"
+
+
+def _utc(timestamp):
+    if timestamp is None:
+        return None
+    timestamp = pd.Timestamp(timestamp)
+    return timestamp.tz_localize("UTC") if timestamp.tz is None else timestamp.tz_convert("UTC")
+
+
+def _empty_bars():
+    return pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([], tz="UTC", name="Datetime"), dtype=float)
+
+
+def _utc_index(frame):
+    """Bars indexed by a UTC DatetimeIndex named Datetime, daily bars at midnight UTC"""
+    index = pd.DatetimeIndex(frame.index)
+    frame.index = (index.tz_localize("UTC") if index.tz is None else index.tz_convert("UTC")).rename("Datetime")
+    return frame
+
+
+def _read_cached_bars(path):
+    """Bars of a cache file and the state recorded in its metadata"""
+    table = pq.read_table(path)
+    return table.to_pandas(), json.loads(table.schema.metadata[_METADATA_KEY])
+
+
+class MarketDataProvider(abc.ABC):
+    """Source of OHLCV bars"""
+
+    @abc.abstractmethod
+    def download(self, tickers, start, end, interval):
+        """Return {ticker: bars in [start, end)} for the tickers that have any; end None means up to now"""
+        raise NotImplementedError
+
+
+class YFinanceProvider(MarketDataProvider):
+    # yf.download collects results in module-level state, so calls must not overlap
+    _lock = threading.Lock()
+
+    def download(self, tickers, start, end, interval):
+        import yfinance as yf
+
+        with self._lock:
+            data = yf.download(tickers, start=start, end=end, interval=interval, group_by="ticker",
+                               auto_adjust=False, progress=False)
+        if data is None or data.empty:
+            return {}
+        bars = {}
+        for ticker in tickers:
+            if ticker not in data.columns.get_level_values(0):
+                continue
+            frame = data[ticker].dropna(how="all")
+            if not frame.empty:
+                bars[ticker] = _utc_index(frame.reindex(columns=COLUMNS))
+        return bars
+
+
+class FileProvider(MarketDataProvider):
+    """Bars read from <directory>/<interval>/<ticker>.parquet or .csv, the first column holding timestamps"""
+
+    def __init__(self, directory, latency=0.0):
+        self.directory = directory
+        self.latency = latency  # seconds slept per call, to stand in for a remote provider
+        self.calls = 0
+
+    def _read(self, ticker, interval):
+        path = os.path.join(self.directory, interval, ticker)
+        if os.path.exists(f"{path}.parquet"):
+            return _utc_index(pd.read_parquet(f"{path}.parquet"))
+        if os.path.exists(f"{path}.csv"):
+            return _utc_index(pd.read_csv(f"{path}.csv", index_col=0, parse_dates=[0]))
+        return None
+
+    def download(self, tickers, start, end, interval):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        start, end = _utc(start), _utc(end)
+        bars = {}
+        for ticker in tickers:
+            frame = self._read(ticker, interval)
+            if frame is None:
+                continue
+            frame = frame[frame.index >= start]
+            if end is not None:
+                frame = frame[frame.index < end]
+            if not frame.empty:
+                bars[ticker] = frame.reindex(columns=COLUMNS)
+        return bars
+
+
+def provider_from_spec(spec):
+    """"yfinance", or "file:<directory>" for FileProvider"""
+    if spec == "yfinance":
+        return YFinanceProvider()
+    if spec.startswith("file:"):
+        return FileProvider(spec[len("file:"):])
+    raise ValueError(f"Unknown market data provider {spec!r}, expected 'yfinance' or 'file:<directory>'")
+
+
+class MarketDataCache:
+    """Parquet cache in front of a provider; without a directory every request goes to the provider"""
+
+    def __init__(self, directory, provider, max_age=900):
+        self.directory = directory
+        self.provider = provider
+        self.max_age = max_age
+        # One refresh at a time per process; files are replaced atomically for other processes
+        self.lock = threading.Lock()
+        self.downloads = 0
+
+    def _path(self, ticker, interval):
+        return os.path.join(self.directory, f"interval={interval}", f"ticker={ticker}", "bars.parquet")
+
+    def _load(self, ticker, interval):
+        """Cached bars with the start of the covered range and the time bars are known up to, or None"""
+        if not self.directory:
+            return None
+        entry = load_or_none(self._path(ticker, interval), _read_cached_bars, "market data cache",
+                             (OSError, KeyError, ValueError, pa.ArrowException))
+        if entry is None:
+            return None
+        bars, state = entry
+        return bars, _utc(state["covered_from"]), state["known_until"]
+
+    def _save(self, ticker, interval, bars, covered_from, known_until):
+        if not self.directory:
+            return
+        table = pa.Table.from_pandas(bars, preserve_index=True)
+        state = {"covered_from": covered_from.isoformat(), "known_until": known_until}
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), _METADATA_KEY: json.dumps(state)})
+        with atomic_write(self._path(ticker, interval)) as tmp_path:
+            pq.write_table(table, tmp_path)
+
+    def _download(self, tickers, start, end, interval):
+        logger.info(f"Downloading {interval} bars for {len(tickers)} tickers from {start} to {end or 'now'}")
+        self.downloads += 1
+        return self.provider.download(tickers, start, end, interval)
+
+    def get(self, tickers, start, end=None, interval="1d"):
+        """
+        Return {ticker: bars in [start, end)} for the tickers with any bars, downloading only what the
+        cache is missing. end None means up to now; the latest bars served may be up to max_age old.
+        """
+        start, end = _utc(start), _utc(end)
+        with self.lock:
+            now = time.time()
+            known_until = now if end is None else min(now, end.timestamp())
+            cached = {}
+            missing = []
+            heads = {}
+            tails = []
+            for ticker in tickers:
+                entry = self._load(ticker, interval)
+                if entry is None:
+                    missing.append(ticker)
+                    continue
+                cached[ticker] = entry
+                bars, covered_from, cached_until = entry
+                if start < covered_from:
+                    heads.setdefault(covered_from, []).append(ticker)
+                if known_until - cached_until > self.max_age:
+                    tails.append(ticker)
+
+            # Tickers missing the same range share one download
+            ranges = {}
+            if missing:
+                ranges[(start, end)] = list(missing)
+            for covered_from, group in heads.items():
+                ranges.setdefault((start, covered_from), []).extend(group)
+            if tails:
+                # From each ticker's last cached bar, which may have been still forming; one download
+                # from the earliest of them covers all
+                tail_start = min(bars.index.max() if len(bars) else covered_from
+                                 for bars, covered_from, _ in (cached[ticker] for ticker in tails))
+                ranges.setdefault((tail_start, end), []).extend(tails)
+
+            downloaded = {}
+            for (range_start, range_end), group in ranges.items():
+                for ticker, bars in self._download(group, range_start, range_end, interval).items():
+                    downloaded.setdefault(ticker, []).append(bars)
+
+            refreshed = set(missing) | set(tails)
+            changed = refreshed | {ticker for group in heads.values() for ticker in group}
+            result = {}
+            for ticker in tickers:
+                bars, covered_from, cached_until = cached.get(ticker, (_empty_bars(), start, known_until))
+                if ticker in changed:
+                    if ticker in downloaded:
+                        bars = pd.concat([frame for frame in [bars] + downloaded[ticker] if not frame.empty])
+                        bars = bars[~bars.index.duplicated(keep="last")].sort_index()
+                    self._save(ticker, interval, bars, min(start, covered_from),
+                               max(known_until, cached_until) if ticker in refreshed else cached_until)
+                bars = bars[bars.index >= start]
+                if end is not None:
+                    bars = bars[bars.index < end]
+                if not bars.empty:
+                    result[ticker] = bars
+            return result
@@ -1,113 +1,292 @@
-import yfinance as yf
+import numpy as np
 import pandas as pd
 import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from sklearn.ensemble import HistGradientBoostingRegressor
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 from elasticsearch import Elasticsearch
+from threadpoolctl import threadpool_limits
 from config import Config
+from market_data import MarketDataCache, provider_from_spec
+from feature_store import FeatureStore, training_rows
+from model_store import ModelArtifact, ModelStore, StagedModel, feature_schema, fingerprint, row_hashes
+import metrics
 
 logger = logging.getLogger(__name__)
 
+
+def _tickers():
+    """Distinct tickers in mapping order; several groups map to the same ticker"""
+    return list(dict.fromkeys(Config.TICKER_MAPPING.values()))
+
+
+def _outcome(ticker, error):
+    if isinstance(error, ValueError):
+        logger.info(str(error))  # Log and skip the ticker if there's no social data
+        return "skipped"
+    logger.error(f"Failed processing {ticker}: {str(error)}")
+    return "failed"
+
+
+def _record(ticker, seconds, outcome):
+    metrics.TICKER_SECONDS.labels(ticker).observe(seconds)
+    metrics.TICKERS.labels(outcome).inc()
+
+
+def _timed(function, *args):
+    """
+    (function(*args), seconds), timed where it runs so the wait for a pool worker is not counted.
+    An error raised carries the seconds as its seconds attribute.
+    """
+    started = time.perf_counter()
+    try:
+        return function(*args), time.perf_counter() - started
+    except Exception as e:
+        e.seconds = time.perf_counter() - started
+        raise
+
+
+# Kept referenced so the limits stay applied for the life of the training worker
+_worker_thread_limits = None
+
+
+def _init_worker(threads):
+    """Bound the OpenMP threads gradient boosting uses in each training process"""
+    global _worker_thread_limits
+    _worker_thread_limits = threadpool_limits(threads)
+
+
+def _fit_predict(ticker, features, targets, store):
+    """
+    Predict from a ticker's latest row with its stored model, retrained or extended first when the
+    training rows changed. Module-level so training workers can run it; returns (prediction, mode, seconds).
+    """
+    started = time.perf_counter()
+    schema = feature_schema(features)
+    hashes = row_hashes(features, targets)
+    digest = fingerprint(schema, hashes)
+    artifact = store.load(ticker)
+    mode = store.refit_mode(artifact, schema, digest, hashes)
+    if mode == "unchanged":
+        model = artifact.model
+    elif mode == "warm_start":
+        model = MarketPredictor._extend_model(artifact.model, features, targets, store.warm_start_iterations)
+    else:
+        model = MarketPredictor._train_model(features, targets)
+    seconds = time.perf_counter() - started
+    if model is not None and mode != "unchanged":
+        logger.info(f"Trained {ticker} model ({mode}) on {len(features)} rows in {seconds:.2f}s, "
+                    f"{model.iterations} iterations")
+        store.save(ticker, ModelArtifact(schema, digest, hashes, model))
+    elif model is not None:
+        logger.info(f"Training data for {ticker} unchanged, reusing its model")
+    return MarketPredictor._predict(model, features), mode, seconds
+
+
 class MarketPredictor:
     def __init__(self):
         self.es = Elasticsearch(
             Config.ES_HOSTS,
             timeout=30
         )
-        self.models = {}
+        self.market_data = MarketDataCache(
+            Config.MARKET_DATA_DIR,
+            provider_from_spec(Config.MARKET_DATA_PROVIDER),
+            Config.MARKET_DATA_MAX_AGE
+        )
+        self.feature_store = FeatureStore(
+            Config.FEATURE_STORE_DIR,
+            Config.PREDICTION_HORIZON,
+            Config.FEATURE_STORE_RETENTION_DAYS
+        )
+        self.model_store = ModelStore(
+            Config.MODEL_STORE_DIR,
+            Config.MODEL_WARM_START_ITERATIONS,
+            Config.MODEL_MAX_ITERATIONS
+        )
     
     def run_pipeline(self):
         """Predict for all tickers"""
-        for ticker in Config.TICKER_MAPPING.values():
-            try:
-                features, targets = self._prepare_data(ticker)
-                if not features.empty:
-                    model = self._train_model(features, targets)
-                    prediction = self._predict(model, features)
-                    self._index_prediction(ticker, prediction)
-            except ValueError as ve:
-                logger.info(str(ve))  # Log and skip the ticker if there's no social data
-                continue
-            except Exception as e:
-                logger.error(f"Failed processing {ticker}: {str(e)}")
-
-    def _prepare_data(self, ticker):
-        """Prepare data with enhanced sentiment confidence handling"""
+        started = time.perf_counter()
+        try:
+            tickers = _tickers()
+            social = self._fetch_social(tickers)
+            market = self._fetch_market(tickers)
+            if Config.PREDICTOR_PREPARE_THREADS > 1 or Config.PREDICTOR_WORKERS > 1:
+                self._run_concurrent(tickers, social, market)
+            else:
+                for ticker in tickers:
+                    self._run_ticker(ticker, social, market)
+            metrics.PREDICTOR_LAST_SUCCESS.set_to_current_time()
+        finally:
+            metrics.PREDICTOR_RUN_SECONDS.set(time.perf_counter() - started)
+            metrics.export(metrics.PREDICTOR, "market_predictor")
+
+    def _run_ticker(self, ticker, social, market):
+        started = time.perf_counter()
+        outcome = "skipped"
+        try:
+            features, targets = self._prepare_data(ticker, social, market)
+            if not features.empty:
+                outcome = self._finish_ticker(ticker, _fit_predict(ticker, features, targets, self.model_store))
+        except Exception as e:
+            outcome = _outcome(ticker, e)
+        _record(ticker, time.perf_counter() - started, outcome)
+
+    def _finish_ticker(self, ticker, result):
+        prediction, mode, seconds = result
+        metrics.MODEL_UPDATE_SECONDS.labels(mode).observe(seconds)
+        self._index_prediction(ticker, prediction)
+        return "predicted" if prediction is not None else "failed"
+
+    def _training_pool(self):
+        """Processes for training, or a single background thread when PREDICTOR_WORKERS is 1"""
+        if Config.PREDICTOR_WORKERS <= 1:
+            return ThreadPoolExecutor(max_workers=1, thread_name_prefix="predictor-train")
+        threads = max(1, (os.cpu_count() or 1) // Config.PREDICTOR_WORKERS)
+        # spawn avoids forking a parent that holds the preparing threads' sockets and locks
+        return ProcessPoolExecutor(
+            max_workers=Config.PREDICTOR_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(threads,)
+        )
+
+    def _run_concurrent(self, tickers, social, market):
+        """
+        Merge the already fetched sentiment and bars into features for PREDICTOR_PREPARE_THREADS
+        tickers at a time, and train each ticker on the training pool as soon as its features are
+        ready. Every ticker succeeds or fails on its own.
+        """
+        logger.info(f"Predicting {len(tickers)} tickers with {Config.PREDICTOR_PREPARE_THREADS} preparing threads "
+                    f"and {Config.PREDICTOR_WORKERS} training workers")
+        # Seconds each ticker spent being prepared, trained and indexed, not waiting for a thread or worker
+        elapsed = {}
+        with ThreadPoolExecutor(max_workers=Config.PREDICTOR_PREPARE_THREADS,
+                                thread_name_prefix="predictor-prepare") as preparers, self._training_pool() as trainers:
+            preparations = {}
+            for ticker in tickers:
+                preparations[preparers.submit(_timed, self._prepare_data, ticker, social, market)] = ticker
+
+            trainings = {}
+            for future in as_completed(preparations):
+                ticker = preparations[future]
+                try:
+                    (features, targets), elapsed[ticker] = future.result()
+                except Exception as e:
+                    _record(ticker, e.seconds, _outcome(ticker, e))
+                    continue
+                if features.empty:
+                    _record(ticker, elapsed[ticker], "skipped")
+                    continue
+                trainings[trainers.submit(_timed, _fit_predict, ticker, features, targets, self.model_store)] = ticker
+
+            for future in as_completed(trainings):
+                ticker = trainings[future]
+                started = time.perf_counter()
+                try:
+                    result, seconds = future.result()
+                    elapsed[ticker] += seconds
+                    outcome = self._finish_ticker(ticker, result)
+                except Exception as e:
+                    # A worker that died raises without the seconds
+                    elapsed[ticker] += getattr(e, "seconds", 0.0)
+                    outcome = _outcome(ticker, e)
+                _record(ticker, elapsed[ticker] + time.perf_counter() - started, outcome)
+
+    def _fetch_social(self, tickers):
+        """
+        Hourly sentiment buckets of all tickers over the last LOOKBACK_DAYS in one aggregation,
+        decoded into a frame indexed by (ticker, datetime). Empty when the query fails.
+        """
         query = {
             "size": 0,
             "query": {
-                "term": {"metadata.ticker.keyword": ticker}
+                "bool": {
+                    "filter": [
+                        {"terms": {"metadata.ticker.keyword": tickers}},
+                        {"range": {"created_at": {"gte": f"now-{Config.LOOKBACK_DAYS}d/h"}}}
+                    ]
+                }
             },
             "aggs": {
-                "hourly": {
-                    "date_histogram": {
-                        "field": "created_at",
-                        "fixed_interval": "1h"
-                    },
+                "tickers": {
+                    "terms": {"field": "metadata.ticker.keyword", "size": len(tickers)},
                     "aggs": {
-                        "avg_sentiment": {"avg": {"field": "confidence"}},
-                        "sum_retweets": {"sum": {"field": "metadata.retweet_count"}},
-                        "avg_followers": {"avg": {"field": "metadata.user.followers"}}
+                        "hourly": {
+                            "date_histogram": {
+                                "field": "created_at",
+                                "fixed_interval": "1h"
+                            },
+                            "aggs": {
+                                "avg_sentiment": {"avg": {"field": "confidence"}},
+                                "sum_retweets": {"sum": {"field": "metadata.retweet_count"}},
+                                "avg_followers": {"avg": {"field": "metadata.user.followers"}}
+                            }
+                        }
                     }
                 }
             }
         }
+        # Only the bucket keys and metric values come back, not key_as_string, doc_count or hits
+        buckets = "aggregations.tickers.buckets"
+        filter_path = [f"{buckets}.key", f"{buckets}.hourly.buckets.key"] + [
+            f"{buckets}.hourly.buckets.{metric}.value" for metric in ["avg_sentiment", "sum_retweets", "avg_followers"]
+        ]
 
+        columns = {"ticker": [], "datetime": [], "avg_sentiment": [], "sum_retweets": [], "avg_followers": []}
         try:
-            result = self.es.search(index=Config.SENTIMENT_INDEX, body=query)
-            print(f"Elasticsearch query result: {result}")
+            result = self.es.search(index=Config.SENTIMENT_INDEX, body=query, filter_path=filter_path)
+            for ticker_bucket in result.get("aggregations", {}).get("tickers", {}).get("buckets", []):
+                hourly = ticker_bucket.get("hourly", {}).get("buckets", [])
+                columns["ticker"] += [ticker_bucket["key"]] * len(hourly)
+                columns["datetime"] += [bucket["key"] for bucket in hourly]
+                for metric in ["avg_sentiment", "sum_retweets", "avg_followers"]:
+                    columns[metric] += [bucket.get(metric, {}).get("value") for bucket in hourly]
         except Exception as e:
             logger.error(f"Elasticsearch query failed: {str(e)}")
-            return pd.DataFrame(), pd.Series()
+            # Indexed like a successful result, so every ticker is skipped for lack of social data
+            return pd.DataFrame(columns=["sentiment_confidence", "social_impact"], dtype=float,
+                                index=pd.MultiIndex.from_arrays([[], pd.DatetimeIndex([], tz="UTC")],
+                                                                names=["ticker", "datetime"]))
 
-        # Process results safely
-        social_data = []
-        if 'aggregations' in result and 'hourly' in result['aggregations'] and 'buckets' in result['aggregations']['hourly']:
-            for bucket in result['aggregations']['hourly']['buckets']:
-                social_impact = 0
-                try:
-                    sum_retweets = bucket.get('sum_retweets', {}).get('value', 0) or 0
-                    avg_followers = bucket.get('avg_followers', {}).get('value', 0) or 0
-                    avg_sentiment = bucket.get('avg_sentiment', {}).get('value', 0) or 0
-
-                    # Calculate social impact based on retweets and followers
-                    social_impact = (sum_retweets * (avg_followers / 1000)) if avg_followers else 0
-                except (TypeError, KeyError):
-                    pass
-
-                social_data.append({
-                    "datetime": pd.to_datetime(bucket['key_as_string']),
-                    "sentiment_confidence": avg_sentiment,  # Use confidence as a feature
-                    "social_impact": social_impact
-                })
-
-        if not social_data:
-            logger.warning(f"No social data found for {ticker}, skipping.")
-            return pd.DataFrame(), pd.Series()
+        # Empty hours have null metrics
+        values = {metric: np.nan_to_num(np.array(columns[metric], dtype=float))
+                  for metric in ["avg_sentiment", "sum_retweets", "avg_followers"]}
+        social = pd.DataFrame({
+            "sentiment_confidence": values["avg_sentiment"],  # Use confidence as a feature
+            # Social impact based on retweets and followers
+            "social_impact": values["sum_retweets"] * (values["avg_followers"] / 1000)
+        }, index=pd.MultiIndex.from_arrays(
+            [columns["ticker"], pd.to_datetime(columns["datetime"], unit="ms", utc=True)], names=["ticker", "datetime"]
+        ))
+        logger.info(f"Fetched {len(social)} hourly sentiment buckets for {social.index.get_level_values(0).nunique()} "
+                    f"of {len(tickers)} tickers")
+        return social
 
-        # Get market data with error handling
+    def _fetch_market(self, tickers):
+        """Hourly bars of the last 60 days for all tickers, from the cache and one download of what it misses"""
         try:
-            logger.info(f"Downloading market data for {ticker}")
-            stock_data = yf.download(ticker, period="60d", interval="60m")
-
-            # Check if data was retrieved
-            if stock_data.empty:
-                logger.warning(f"No market data found for {ticker}")
-                return pd.DataFrame(), pd.Series()
-
-            # Handle multi-index if present
-            if isinstance(stock_data.columns, pd.MultiIndex):
-                stock_data.columns = stock_data.columns.droplevel(0)  # Drop the ticker level
-            if isinstance(stock_data.index, pd.MultiIndex):
-                stock_data = stock_data.droplevel(0, axis=0)  # Drop the first level (ticker symbol)
+            return self.market_data.get(tickers, pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=60), interval="60m")
         except Exception as e:
-            logger.error(f"Failed to download {ticker} data: {str(e)}")
+            logger.error(f"Failed to download market data: {str(e)}")
+            return {}
+
+    def _prepare_data(self, ticker, social, market):
+        """Prepare data with enhanced sentiment confidence handling"""
+        if ticker not in social.index.get_level_values("ticker"):
+            logger.warning(f"No social data found for {ticker}, skipping.")
             return pd.DataFrame(), pd.Series()
+        social_df = social.xs(ticker, level="ticker")
 
-        # Create and prepare social data dataframe
-        social_df = pd.DataFrame(social_data)
-        social_df.set_index('datetime', inplace=True)
+        stock_data = market.get(ticker)
+        if stock_data is None:
+            logger.warning(f"No market data found for {ticker}")
+            return pd.DataFrame(), pd.Series()
 
         logger.info(f"Social data shape: {social_df.shape}, Stock data shape: {stock_data.shape}")
         logger.info(f"Social data index type: {type(social_df.index)}")
@@ -142,38 +321,11 @@ class MarketPredictor:
             logger.info(f"Stock data sample:\n{stock_data.head()}")
             return pd.DataFrame(), pd.Series()
 
-        # Feature engineering with sentiment confidence
+        # Features come from the ticker's feature table, recomputed only where the merged hours changed
         try:
-            # Rolling statistics for sentiment confidence
-            merged['sentiment_trend'] = merged['sentiment_confidence'].rolling('6h').mean().fillna(merged['sentiment_confidence'])
-            merged['sentiment_volatility'] = merged['sentiment_confidence'].pct_change().fillna(0)
-
-            # Social impact features
-            merged['social_volatility'] = merged['social_impact'].pct_change().fillna(0)
-
-            # Price momentum
-            merged['price_momentum'] = merged['Close'].pct_change(4).fillna(0)
-
-            # Final feature set
-            features = merged[[
-                'sentiment_confidence',
-                'sentiment_trend',
-                'sentiment_volatility',
-                'social_impact',
-                'social_volatility',
-                'Volume',
-                'price_momentum'
-            ]].dropna()
-
-            # Handle prediction horizon
-            targets = merged['Close'].pct_change(
-                Config.PREDICTION_HORIZON
-            ).shift(-Config.PREDICTION_HORIZON)
-
-            # Align features and targets
-            common_index = features.index.intersection(targets.dropna().index)
-            features = features.loc[common_index]
-            targets = targets.loc[common_index]
+            table = self.feature_store.update(ticker, merged)
+            # Train on the hours fetched this run; the table keeps older ones for other readers
+            features, targets = training_rows(table[table.index >= merged.index.min()])
 
             logger.info(f"Final features shape: {features.shape}, targets shape: {targets.shape}")
         except KeyError as e:
@@ -182,7 +334,8 @@ class MarketPredictor:
 
         return features, targets
 
-    def _train_model(self, features, targets):
+    @staticmethod
+    def _train_model(features, targets):
         """Train a model with the features"""
         try:
             model = Pipeline([
@@ -192,12 +345,30 @@ class MarketPredictor:
             
             model.fit(features, targets)
             logger.info(f"Model trained successfully")
-            return model
+            return StagedModel([model])
         except Exception as e:
             logger.error(f"Model training failed: {str(e)}")
             return None
 
-    def _predict(self, model, features):
+    @staticmethod
+    def _extend_model(model, features, targets, iterations):
+        """
+        Add boosting iterations fitted to the model's residuals. HistGradientBoosting's own warm_start
+        would re-bin the new rows while its earlier trees keep the old bin thresholds.
+        """
+        try:
+            stage = Pipeline([
+                ('scaler', StandardScaler()),
+                ('model', HistGradientBoostingRegressor(max_iter=iterations))
+            ])
+            stage.fit(features, targets - model.predict(features))
+            return StagedModel(model.stages + [stage])
+        except Exception as e:
+            logger.error(f"Model update failed: {str(e)}")
+            return None
+
+    @staticmethod
+    def _predict(model, features):
         """Generate predictions"""
         if model is None:
             return None
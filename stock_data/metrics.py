@@ -0,0 +1,102 @@
+"""
+Prometheus metrics for the batch jobs. Each job has its own registry that is exported once when
+the run finishes, pushed to a Pushgateway and/or written for the node_exporter textfile collector,
+since the Airflow tasks exit long before a scrape would see them.
+"""
+import logging
+import os
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, push_to_gateway, write_to_textfile
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+SENTIMENT = CollectorRegistry()
+PREDICTOR = CollectorRegistry()
+
+# Per-chunk durations range from milliseconds (read) to minutes (inference on a large chunk)
+_STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+STAGE_SECONDS = Histogram(
+    "sentiment_stage_seconds", "Time spent per chunk in each ingestion stage",
+    ["stage"], buckets=_STAGE_BUCKETS, registry=SENTIMENT
+)
+ROWS_PROCESSED = Counter(
+    "sentiment_rows_processed", "Rows scored by the sentiment model or the cache", registry=SENTIMENT
+)
+ROWS_DROPPED = Counter(
+    "sentiment_rows_dropped", "Rows dropped before scoring", ["reason"], registry=SENTIMENT
+)
+ROWS_FAILED = Counter(
+    "sentiment_rows_failed", "Scored rows that did not reach Elasticsearch", ["reason"], registry=SENTIMENT
+)
+BATCH_SIZE = Gauge(
+    "sentiment_batch_size_rows", "Mean rows per inference batch in the last chunk", registry=SENTIMENT
+)
+PADDING_WASTE = Gauge(
+    "sentiment_padding_waste_ratio", "Share of padded tokens that were padding in the last chunk",
+    registry=SENTIMENT
+)
+ES_BULK_SECONDS = Histogram(
+    "sentiment_es_bulk_seconds", "Time for one parallel bulk pass over a chunk's documents, per attempt",
+    buckets=_STAGE_BUCKETS, registry=SENTIMENT
+)
+ES_BULK_RETRIED = Counter(
+    "sentiment_es_bulk_retried_documents", "Documents resent after a 429 rejection", registry=SENTIMENT
+)
+NEAR_DUPLICATE_TEXTS = Counter(
+    "sentiment_near_duplicate_texts",
+    "Unique texts by near-duplicate outcome: representative (scored), merged into a cluster of its chunk, "
+    "or window (cluster labeled from an earlier chunk)",
+    ["outcome"], registry=SENTIMENT
+)
+CASCADE_TEXTS = Counter(
+    "sentiment_cascade_texts", "Uncached texts by cascade outcome: accepted (TextBlob label kept) or escalated",
+    ["outcome"], registry=SENTIMENT
+)
+CASCADE_AUDITED = Counter(
+    "sentiment_cascade_audited", "Confident TextBlob labels checked against FinBERT, by whether they agreed",
+    ["result"], registry=SENTIMENT
+)
+SENTIMENT_RUN_SECONDS = Gauge(
+    "sentiment_pipeline_run_seconds", "Duration of the last sentiment run", registry=SENTIMENT
+)
+SENTIMENT_LAST_SUCCESS = Gauge(
+    "sentiment_pipeline_last_success_timestamp_seconds", "When the last sentiment run succeeded",
+    registry=SENTIMENT
+)
+
+TICKER_SECONDS = Histogram(
+    "market_predictor_ticker_seconds", "Time to query, fetch, train and predict one ticker",
+    ["ticker"], buckets=_STAGE_BUCKETS, registry=PREDICTOR
+)
+TICKERS = Counter(
+    "market_predictor_tickers", "Tickers by outcome: predicted, skipped (no data) or failed",
+    ["outcome"], registry=PREDICTOR
+)
+MODEL_UPDATE_SECONDS = Histogram(
+    "market_predictor_model_update_seconds",
+    "Time to bring a ticker's model up to date by mode: unchanged, warm_start or full (retrained)",
+    ["mode"], buckets=_STAGE_BUCKETS, registry=PREDICTOR
+)
+PREDICTOR_RUN_SECONDS = Gauge(
+    "market_predictor_run_seconds", "Duration of the last market prediction run", registry=PREDICTOR
+)
+PREDICTOR_LAST_SUCCESS = Gauge(
+    "market_predictor_last_success_timestamp_seconds", "When the last market prediction run succeeded",
+    registry=PREDICTOR
+)
+
+
+def export(registry, job):
+    """Push a job's metrics and/or write them to <METRICS_TEXTFILE_DIR>/<job>.prom; errors are only logged"""
+    if Config.PUSHGATEWAY_URL:
+        try:
+            push_to_gateway(Config.PUSHGATEWAY_URL, job=job, registry=registry)
+        except Exception as e:
+            logger.error(f"Failed to push metrics to {Config.PUSHGATEWAY_URL}: {str(e)}")
+    if Config.METRICS_TEXTFILE_DIR:
+        try:
+            # write_to_textfile renames a temporary file into place, so the collector never reads half a file
+            write_to_textfile(os.path.join(Config.METRICS_TEXTFILE_DIR, f"{job}.prom"), registry)
+        except OSError as e:
+            logger.error(f"Failed to write metrics to {Config.METRICS_TEXTFILE_DIR}: {str(e)}")
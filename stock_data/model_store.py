@@ -0,0 +1,112 @@
+"""Per-ticker predictor models saved with joblib, keyed by a fingerprint of the rows they were trained on"""
+import hashlib
+import json
+import logging
+import os
+import time
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from storage import atomic_write, load_or_none
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the artifact layout changes; older artifacts are retrained
+ARTIFACT_VERSION = 1
+
+
+def feature_schema(features):
+    return [[str(column), str(dtype)] for column, dtype in features.dtypes.items()]
+
+
+def row_hashes(features, targets):
+    """uint64 hash of every row's timestamp, features and target, indexed by timestamp"""
+    return pd.util.hash_pandas_object(features.assign(_target=targets), index=True)
+
+
+def fingerprint(schema, hashes):
+    digest = hashlib.blake2b(json.dumps(schema).encode("utf-8"), digest_size=16)
+    digest.update(hashes.index.asi8.tobytes())
+    digest.update(hashes.to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class StagedModel:
+    """A model plus boosting stages fitted to its residuals; predictions are the sum of all stages"""
+
+    def __init__(self, stages):
+        self.stages = stages
+
+    @property
+    def iterations(self):
+        return sum(stage[-1].n_iter_ for stage in self.stages)
+
+    def predict(self, features):
+        return np.sum([stage.predict(features) for stage in self.stages], axis=0)
+
+
+class ModelArtifact:
+    __slots__ = ("version", "sklearn_version", "schema", "fingerprint", "row_hashes", "model", "trained_at")
+
+    def __init__(self, schema, fingerprint, row_hashes, model):
+        self.version = ARTIFACT_VERSION
+        self.sklearn_version = sklearn.__version__
+        self.schema = schema
+        self.fingerprint = fingerprint
+        self.row_hashes = row_hashes
+        self.model = model
+        self.trained_at = time.time()
+
+
+class ModelStore:
+    """Artifacts as <directory>/<ticker>.joblib; without a directory nothing is saved and every run retrains"""
+
+    def __init__(self, directory, warm_start_iterations, max_iterations):
+        self.directory = directory
+        self.warm_start_iterations = warm_start_iterations
+        self.max_iterations = max_iterations
+
+    def _path(self, ticker):
+        return os.path.join(self.directory, f"{ticker}.joblib")
+
+    def load(self, ticker):
+        """The ticker's artifact, or None when there is none or it was written by another version"""
+        if not self.directory:
+            return None
+        path = self._path(ticker)
+        artifact = load_or_none(path, joblib.load, "model artifact")
+        if artifact is None:
+            return None
+        if artifact.version != ARTIFACT_VERSION or artifact.sklearn_version != sklearn.__version__:
+            logger.info(f"Model artifact {path} was saved by another version, retraining")
+            return None
+        return artifact
+
+    def save(self, ticker, artifact):
+        if not self.directory:
+            return
+        with atomic_write(self._path(ticker)) as tmp_path:
+            joblib.dump(artifact, tmp_path)
+
+    def refit_mode(self, artifact, schema, digest, hashes):
+        """
+        "unchanged" when the artifact was trained on the same rows (or on a superset that only lost
+        its oldest ones to the lookback), "warm_start" when rows were only added after the newest one
+        it saw, otherwise "full"
+        """
+        if artifact is None or artifact.schema != schema:
+            return "full"
+        if artifact.fingerprint == digest:
+            return "unchanged"
+        trained = artifact.row_hashes
+        trained_until = trained.index.max()
+        # The newest trained row may come from a bar that was still forming, so it may differ
+        settled = trained[(trained.index >= hashes.index.min()) & (trained.index < trained_until)]
+        if not hashes[hashes.index < trained_until].equals(settled):
+            return "full"
+        if not (hashes.index > trained_until).any():
+            return "unchanged"
+        if artifact.model.iterations + self.warm_start_iterations > self.max_iterations:
+            return "full"
+        return "warm_start"
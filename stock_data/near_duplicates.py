@@ -0,0 +1,160 @@
+"""
+MinHash/LSH near-duplicate detection for cleaned tweet texts.
+
+Texts are compared as sets of character 5-grams, so an "RT" prefix, a link stripped differently or a
+bot swapping one token still leaves most of the set shared. LSH bands make texts whose estimated
+Jaccard similarity is around the threshold or above candidates, candidates are checked against the
+threshold on their full signatures, and union-find turns the matching pairs into clusters. Clusters
+of recent chunks are kept in a rolling window with their labels, so later copies reuse them.
+"""
+import hashlib
+import threading
+import zlib
+from collections import deque
+import numpy as np
+
+SHINGLE_SIZE = 5
+# Texts hashed per block, bounding the (permutations x shingles) matrix to a few tens of MB
+_BLOCK_TEXTS = 1000
+
+
+def _shingle_hashes(text):
+    text = " ".join(text.lower().split())
+    if len(text) <= SHINGLE_SIZE:
+        return [zlib.crc32(text.encode("utf-8"))]
+    return {zlib.crc32(text[i:i + SHINGLE_SIZE].encode("utf-8")) for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def _lsh_params(threshold, num_perm):
+    """Bands x rows splitting num_perm whose S-curve midpoint (1/bands)^(1/rows) is closest to threshold"""
+    options = [(bands, num_perm // bands) for bands in range(1, num_perm + 1) if num_perm % bands == 0]
+    return min(options, key=lambda option: abs((1 / option[0]) ** (1 / option[1]) - threshold))
+
+
+def cluster_id(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class WindowCluster:
+    """A cluster remembered from an earlier chunk, with the prediction its representative got"""
+    __slots__ = ("cluster_id", "signature", "label", "confidence", "stage")
+
+    def __init__(self, cluster_id, signature, label, confidence, stage):
+        self.cluster_id = cluster_id
+        self.signature = signature
+        self.label = label
+        self.confidence = confidence
+        self.stage = stage
+
+
+class Clusters:
+    """
+    Clustering of a chunk's unique texts: codes maps each text to its cluster, the first text of a
+    cluster represents it, and window_matches holds the earlier cluster it joined, if any
+    """
+
+    def __init__(self, codes, texts, signatures, window_matches):
+        self.codes = codes
+        self.texts = texts
+        self.signatures = signatures
+        self.window_matches = window_matches
+        self.cluster_ids = [match.cluster_id if match is not None else cluster_id(text)
+                            for text, match in zip(texts, window_matches)]
+
+
+class NearDuplicateIndex:
+    """MinHash signatures with LSH buckets for one chunk at a time, plus the clusters of the last window_chunks"""
+
+    def __init__(self, threshold, num_perm, window_chunks, seed=1):
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: with odd 64-bit multipliers the product wraps mod 2^64 and its high half is the hash
+        self.a = rng.integers(0, 2 ** 64, num_perm, dtype=np.uint64, endpoint=False) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 64, num_perm, dtype=np.uint64, endpoint=False)
+        self.threshold = threshold
+        self.bands, self.rows = _lsh_params(threshold, num_perm)
+        self.window = deque(maxlen=window_chunks)
+        self.lock = threading.Lock()
+
+    def signatures(self, texts):
+        """(len(texts), num_perm) MinHash signatures"""
+        signatures = np.empty((len(texts), len(self.a)), dtype=np.uint32)
+        for start in range(0, len(texts), _BLOCK_TEXTS):
+            hashes = [np.fromiter(_shingle_hashes(text), dtype=np.uint64) for text in texts[start:start + _BLOCK_TEXTS]]
+            offsets = np.cumsum([0] + [len(h) for h in hashes[:-1]])
+            values = (self.a[:, None] * np.concatenate(hashes)[None, :] + self.b[:, None]) >> np.uint64(32)
+            signatures[start:start + len(hashes)] = np.minimum.reduceat(values, offsets, axis=1).T
+        return signatures
+
+    def _similar(self, first, second):
+        """Whether the share of equal MinHash values, an estimate of Jaccard similarity, reaches the threshold"""
+        return np.count_nonzero(first == second) >= self.threshold * len(first)
+
+    def _band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def _window_match(self, window, key, signature):
+        # Most recent chunk first
+        for clusters in window:
+            match = clusters.get(key)
+            if match is not None and self._similar(signature, match.signature):
+                return match
+        return None
+
+    def match(self, signatures):
+        """The window cluster each signature joins, or None, for texts clustered before the window last changed"""
+        with self.lock:
+            window = list(reversed(self.window))
+        matches = []
+        for signature in signatures:
+            keys = self._band_keys(signature)
+            matches.append(next((match for match in (self._window_match(window, key, signature) for key in keys)
+                                 if match is not None), None))
+        return matches
+
+    def cluster(self, texts):
+        """Group a chunk's unique texts into clusters of near-duplicates, matching them against the window too"""
+        signatures = self.signatures(texts)
+        parent = list(range(len(texts)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        with self.lock:
+            window = list(reversed(self.window))
+        buckets = {}
+        matches = [None] * len(texts)
+        for i, signature in enumerate(signatures):
+            for key in self._band_keys(signature):
+                j = buckets.setdefault(key, i)
+                if j != i:
+                    root_i, root_j = find(i), find(j)
+                    # The lower index stays root, so the first text in the chunk represents the cluster
+                    if root_i != root_j and self._similar(signature, signatures[j]):
+                        parent[max(root_i, root_j)] = min(root_i, root_j)
+                if matches[i] is None:
+                    matches[i] = self._window_match(window, key, signature)
+
+        roots = np.array([find(i) for i in range(len(texts))])
+        representatives, codes = np.unique(roots, return_inverse=True)
+        # A cluster joins an earlier one when any of its members matched it
+        window_matches = [None] * len(representatives)
+        for i, match in enumerate(matches):
+            if match is not None and window_matches[codes[i]] is None:
+                window_matches[codes[i]] = match
+        return Clusters(codes, [texts[i] for i in representatives], signatures[representatives], window_matches)
+
+    def remember(self, clusters, labels, confidence, stages):
+        """Add a chunk's new clusters and their predictions to the window, dropping the oldest chunk"""
+        entries = {}
+        for i, match in enumerate(clusters.window_matches):
+            if match is not None:
+                continue
+            cluster = WindowCluster(clusters.cluster_ids[i], clusters.signatures[i], int(labels[i]),
+                                    float(confidence[i]), int(stages[i]))
+            for key in self._band_keys(cluster.signature):
+                entries.setdefault(key, cluster)
+        with self.lock:
+            self.window.append(entries)
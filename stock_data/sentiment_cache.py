@@ -0,0 +1,93 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# SQLite caps the number of bound parameters per statement
+_QUERY_BATCH = 500
+# Share of max_entries evicted at once, so the cache is not trimmed again on every write at the limit
+_EVICT_FRACTION = 0.1
+
+
+class SentimentCache:
+    """SQLite-backed store of sentiment predictions keyed by a hash of (model name, cleaned text)"""
+
+    def __init__(self, path, model_name, max_entries):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            "key BLOB PRIMARY KEY, label INTEGER NOT NULL, confidence REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS predictions_last_used ON predictions (last_used)")
+        self.conn.commit()
+        # Counted once here and kept up to date by put_many; rows other processes add are only
+        # picked up when it is re-read at the limit
+        self.rows = self.conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+    def _key(self, text):
+        return hashlib.blake2b(f"{self.model_name}\0{text}".encode("utf-8"), digest_size=16).digest()
+
+    def get_many(self, texts):
+        """Return {text: (label, confidence)} for the cached texts"""
+        keys = {self._key(text): text for text in texts}
+        found = {}
+        key_list = list(keys)
+        with self.lock:
+            for i in range(0, len(key_list), _QUERY_BATCH):
+                batch = key_list[i:i + _QUERY_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT key, label, confidence FROM predictions WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, label, confidence in rows:
+                    found[keys[key]] = (label, confidence)
+                # Refresh hits so eviction drops the least recently used entries
+                if rows:
+                    hit_keys = [row[0] for row in rows]
+                    self.conn.execute(
+                        f"UPDATE predictions SET last_used = ? WHERE key IN ({','.join('?' * len(hit_keys))})",
+                        [time.time(), *hit_keys]
+                    )
+            self.conn.commit()
+        return found
+
+    def put_many(self, entries):
+        """
+        Store (text, label, confidence) entries, keeping the prediction already stored for a text.
+        Past max_entries the least recently used entries are evicted down to
+        (1 - _EVICT_FRACTION) * max_entries.
+        """
+        now = time.time()
+        rows = [(self._key(text), int(label), float(confidence), now) for text, label, confidence in entries]
+        if not rows:
+            return
+        with self.lock:
+            changes = self.conn.total_changes
+            self.conn.executemany("INSERT OR IGNORE INTO predictions VALUES (?, ?, ?, ?)", rows)
+            self.rows += self.conn.total_changes - changes
+            if self.rows > self.max_entries:
+                self.rows = self.conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+                excess = self.rows - int(self.max_entries * (1 - _EVICT_FRACTION))
+                if self.rows > self.max_entries and excess > 0:
+                    self.conn.execute(
+                        "DELETE FROM predictions WHERE key IN "
+                        "(SELECT key FROM predictions ORDER BY last_used LIMIT ?)",
+                        (excess,)
+                    )
+                    self.rows -= excess
+                    logger.info(f"Evicted {excess} entries from the sentiment cache")
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -1,221 +1,1174 @@
+import argparse
+import contextlib
+import functools
+import hashlib
 import logging
+import os
+import queue
+import threading
+import time
 import torch
+import numpy as np
 import pandas as pd
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import resource
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from elasticsearch import Elasticsearch, helpers
-from datasets import Dataset
+from elasticsearch import Elasticsearch
 from config import Config
-import re
+from text_cleaning import clean_series
+from batching import pad_batch, token_budget_batches
+from sentiment_cache import SentimentCache
+from chunk_readers import csv_to_parquet, detect_format, iter_arrow_chunks, iter_csv_chunks, iter_pyarrow_csv_chunks
+from checkpoint import IngestCheckpoint
+from autotune import AutotuneProfile, calibrate
+from near_duplicates import NearDuplicateIndex
+from es_indexer import BulkIndexer
+import metrics
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SENTIMENT_LABELS = ["positive", "negative", "neutral"]
+INFERENCE_BACKENDS = ["fp32", "int8", "bf16", "compile"]
+# Stages timed into <stage>_seconds stats; inference is the padded forward pass
+STAGES = ["read", "clean", "tokenize", "inference", "serialize", "index"]
+# Which model produced a label in cascade mode, stored as the document's "stage"
+CASCADE_STAGES = ["finbert", "textblob"]
+
+
+def _fixed_padded_tokens(lengths, batch_size):
+    """Padded tokens the fixed-size batching would spend on the same rows"""
+    return int(sum(
+        lengths[i:i + batch_size].max() * len(lengths[i:i + batch_size])
+        for i in range(0, len(lengths), batch_size)
+    ))
+
+
+# Marks the end of the stream on a pipeline queue
+_STAGE_DONE = object()
+
+
+def _put(stage_queue, item, stop):
+    """Blocking put that gives up once the pipeline is stopping"""
+    while not stop.is_set():
+        try:
+            stage_queue.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(stage_queue, stop):
+    """Blocking get that returns _STAGE_DONE once the pipeline is stopping"""
+    while not stop.is_set():
+        try:
+            return stage_queue.get(timeout=0.5)
+        except queue.Empty:
+            continue
+    return _STAGE_DONE
+
+
+@contextlib.contextmanager
+def _timed(stats, stage):
+    """Add the wall time of the block to stats[<stage>_seconds]"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats[f"{stage}_seconds"] += time.perf_counter() - started
+
+
+def _timed_iter(items, stats, stage):
+    """Yield from items, timing each step as the given stage"""
+    items = iter(items)
+    while True:
+        step = Counter()
+        with _timed(step, stage):
+            item = next(items, _STAGE_DONE)
+        stats.update(step)
+        _observe_stages(step)
+        if item is _STAGE_DONE:
+            return
+        yield item
+
+
+def _observe_stages(stats):
+    for stage in STAGES:
+        if stats[f"{stage}_seconds"]:
+            metrics.STAGE_SECONDS.labels(stage).observe(stats[f"{stage}_seconds"])
+
+
+def _bf16_supported():
+    """Whether the CPU has native bf16 kernels (AVX512-BF16 / AMX)"""
+    try:
+        return torch.backends.mkldnn.is_available() and torch.ops.mkldnn._is_mkldnn_bf16_supported()
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def _cache_model_key(backend):
+    """Cache namespace for a backend; fp32 keeps the plain model name"""
+    return Config.MODEL_NAME if backend == "fp32" else f"{Config.MODEL_NAME}@{backend}"
+
+
+try:
+    import orjson
+
+    def _dumps(doc):
+        return orjson.dumps(doc, default=str)
+except ImportError:
+    import json
+
+    def _dumps(doc):
+        return json.dumps(doc, default=str, ensure_ascii=False).encode("utf-8")
+
+
+def _tickers(chunk):
+    """Each row's ticker mapped from its group, UNKNOWN when unmapped or absent"""
+    if 'group_name' not in chunk.columns:
+        return ["UNKNOWN"] * len(chunk)
+    return chunk['group_name'].astype(object).map(Config.TICKER_MAPPING).fillna("UNKNOWN").tolist()
+
+
+def _column_values(chunk, name, integer=False):
+    """A column as Python values with None for missing entries, or None when the column is absent"""
+    if name not in chunk.columns:
+        return None
+    values = chunk[name]
+    if integer:
+        values = pd.to_numeric(values, errors="coerce")
+        # Integer columns skip the float round-trip, which loses precision above 2**53
+        if not pd.api.types.is_integer_dtype(values):
+            # Truncate like int() did, invalid values become missing
+            values = np.trunc(values.astype("Float64"))
+        values = values.astype("Int64")
+    return values.astype(object).where(values.notna(), None).tolist()
+
+
+def _set_column(records, key, values, skip_missing=False):
+    if values is not None:
+        for record, value in zip(records, values):
+            if value is not None or not skip_missing:
+                record[key] = value
+
+
+def _isoformat(dates):
+    """ISO 8601 strings for a date column, timezone info dropped"""
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        return dates.astype(str).tolist()
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    # Match datetime.isoformat(), which omits zero microseconds
+    return dates.dt.strftime("%Y-%m-%dT%H:%M:%S.%f").str.replace(r"\.000000$", "", regex=True).tolist()
+
+
+def _input_format():
+    return Config.INPUT_FORMAT or detect_format(Config.CSV_PATH)
+
+
+def _input_columns():
+    """Columns the documents are built from, the only ones read from Parquet/Arrow input"""
+    return ([Config.DATE_COL, Config.TEXT_COL, Config.GROUP_COL, Config.ID_COL]
+            + Config.USER_COLS + Config.METRIC_COLS + Config.META_COLS)
+
+
+def _csv_dtypes():
+    dtypes = {column: "string" for column in [Config.TEXT_COL, "screenname", "username"]}
+    dtypes.update({column: "category" for column in Config.CATEGORICAL_COLS})
+    dtypes.update({
+        "followers": "Int64",
+        "friends": "Int64",
+        "retweet_count": "Int64",
+        # Kept as text, a float64 column cannot hold 64-bit ids exactly
+        Config.ID_COL: "string"
+    })
+    return dtypes
+
+
+def _read_csv_kwargs():
+    columns = set(_input_columns())
+    return {
+        "parse_dates": [Config.DATE_COL],
+        "dtype": _csv_dtypes(),
+        # A callable tolerates inputs that lack some of the optional columns
+        "usecols": lambda column: column in columns
+    }
+
+
+def _pyarrow_available():
+    try:
+        import pyarrow.csv  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _read_sample(rows):
+    """The first rows of the input, for checks that do not need the whole file"""
+    if _input_format() == "csv":
+        return pd.read_csv(Config.CSV_PATH, nrows=rows, **_read_csv_kwargs())
+    return next(iter_arrow_chunks(Config.CSV_PATH, rows, _input_columns(), _input_format(),
+                                  categorical_columns=Config.CATEGORICAL_COLS),
+                pd.DataFrame(columns=_input_columns()))
+
+
+def _lexical_scores(texts):
+    """
+    TextBlob labels, scores and subjectivity: the polarity's sign picks the label and its magnitude is
+    the score, which is on another scale than FinBERT's confidence
+    """
+    from textblob import TextBlob
+
+    sentiments = [TextBlob(text).sentiment for text in texts]
+    polarity = np.fromiter((sentiment.polarity for sentiment in sentiments), dtype=np.float32, count=len(texts))
+    subjectivity = np.fromiter((sentiment.subjectivity for sentiment in sentiments), dtype=np.float32, count=len(texts))
+    positive, negative, neutral = (SENTIMENT_LABELS.index(label) for label in ["positive", "negative", "neutral"])
+    labels = np.where(polarity > 0, positive, np.where(polarity < 0, negative, neutral))
+    return labels, np.abs(polarity), subjectivity
+
+
+def _lexical_confident(labels, scores, subjectivity, threshold):
+    """
+    Polar labels scoring at or above the threshold, and neutral ones (polarity 0, so score 0) in
+    texts TextBlob finds hardly any opinion in, such as plain announcements and noise
+    """
+    neutral = labels == SENTIMENT_LABELS.index("neutral")
+    return np.where(neutral, subjectivity <= Config.CASCADE_NEUTRAL_MAX_SUBJECTIVITY, scores >= threshold)
+
+
+def _worker_threads():
+    """Torch intra-op threads for each inference worker"""
+    if Config.THREADS_PER_WORKER:
+        return Config.THREADS_PER_WORKER
+    return max(1, (os.cpu_count() or 1) // Config.NUM_WORKERS)
+
+
+# Per-process analyzer used by the inference worker pool
+_worker_analyzer = None
+
+
+def _init_worker(threads, batch_size, token_budget):
+    """Load the model once per worker process with a bounded thread count"""
+    global _worker_analyzer
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+    _worker_analyzer = SentimentAnalyzer(load_model=True, connect_es=False)
+    _worker_analyzer.batch_size = batch_size
+    _worker_analyzer.token_budget = token_budget
+
+
+def _score_chunk_in_worker(chunk):
+    return _worker_analyzer._score_chunk(chunk)
+
+
+class _Lookup:
+    """Per-chunk dedupe state: row -> unique text codes, resolved predictions and the misses to score"""
+
+    def __init__(self, codes, labels, confidence, misses, miss_texts):
+        self.codes = codes
+        self.labels = labels
+        self.confidence = confidence
+        self.misses = misses
+        self.miss_texts = miss_texts
+        # CASCADE_STAGES index per unique text, and the TextBlob label of audited misses (-1 otherwise)
+        self.stages = np.zeros(len(labels), dtype=np.int8)
+        self.audit_labels = None
+        # Near-duplicate clusters of the unique texts, which then stand for one cluster each
+        self.clusters = None
+
+
 class SentimentAnalyzer:
-    def __init__(self):
+    def __init__(self, load_model=None, connect_es=True):
         self.device = 0 if torch.cuda.is_available() else -1
+        self.tokenizer = None
+        self.model = None
+        self.backend = None
+        self.es = None
+        self.indexer = None
+        self.cache = None
+        self.checkpoint = None
+        self.stats = Counter()
+        # Inference settings, replaced by the host's calibrated profile when autotuning
+        self.batch_size = Config.BATCH_SIZE
+        self.token_budget = Config.TOKEN_BUDGET
+        self.threads = None
+        self.rng = np.random.default_rng()
+        self.near_duplicates = None
+        if Config.NEAR_DUPLICATES:
+            # Each worker process would keep a window of just the chunks it happened to score
+            self.near_duplicates = NearDuplicateIndex(
+                Config.NEAR_DUPLICATE_THRESHOLD,
+                Config.NEAR_DUPLICATE_NUM_PERM,
+                Config.NEAR_DUPLICATE_WINDOW_CHUNKS if Config.NUM_WORKERS <= 1 else 0
+            )
+
+        # With a worker pool the model lives in the workers only
+        if load_model is None:
+            load_model = Config.NUM_WORKERS <= 1
+        if load_model:
+            self._load_model()
+        if connect_es:
+            self.es = Elasticsearch(
+                Config.ES_HOSTS,
+                http_auth=(Config.ES_USER, Config.ES_PASSWORD),
+                request_timeout=60
+            )
+            self.indexer = BulkIndexer(
+                self.es,
+                Config.SENTIMENT_INDEX,
+                thread_count=Config.ES_INDEX_THREADS,
+                chunk_size=Config.ES_BULK_CHUNK_SIZE,
+                max_chunk_bytes=Config.ES_BULK_MAX_BYTES,
+                max_retries=Config.ES_MAX_RETRIES,
+                initial_backoff=Config.ES_INITIAL_BACKOFF,
+                max_backoff=Config.ES_MAX_BACKOFF,
+                dead_letter_path=Config.DEAD_LETTER_PATH
+            )
+
+    def _load_model(self, backend=None):
+        """Load the tokenizer and the model prepared for an inference backend"""
+        backend = backend or Config.INFERENCE_BACKEND
+        if backend not in INFERENCE_BACKENDS:
+            raise ValueError(f"Unknown inference backend {backend!r}, expected one of {INFERENCE_BACKENDS}")
+        if backend == "bf16" and not _bf16_supported():
+            logger.warning("CPU has no native bf16 support, falling back to fp32")
+            backend = "fp32"
+
         self.tokenizer = AutoTokenizer.from_pretrained(Config.MODEL_NAME)
         self.model = AutoModelForSequenceClassification.from_pretrained(Config.MODEL_NAME)
-        self.es = Elasticsearch(
-            Config.ES_HOSTS,
-            http_auth=(Config.ES_USER, Config.ES_PASSWORD),
-            request_timeout=60
-        )
-    
-    def process_data(self):
-        """Process CSV with enhanced metadata handling"""
-        dtype = {
-            "followers": "Int64",
-            "friends": "Int64",
-            "retweet_count": "Int64"
-        }
-        
-        for chunk in pd.read_csv(
-            Config.CSV_PATH,
-            chunksize=Config.CHUNK_SIZE,
-            parse_dates=[Config.DATE_COL],
-            dtype=dtype
-        ):
-            self._process_chunk(chunk)
+        self.model.eval()
+        if backend == "int8":
+            # Dynamic quantization: int8 weights for the Linear layers, activations quantized on the fly
+            self.model = torch.ao.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        elif backend == "compile":
+            # Padded widths vary per batch, so compile for dynamic shapes to avoid recompiling
+            self.model = torch.compile(self.model, dynamic=True)
+        self.backend = backend
+        logger.info(f"Loaded {Config.MODEL_NAME} with the {backend} inference backend")
+
+        if Config.SENTIMENT_CACHE_PATH:
+            self.cache = SentimentCache(
+                Config.SENTIMENT_CACHE_PATH,
+                _cache_model_key(backend),
+                Config.SENTIMENT_CACHE_MAX_ENTRIES
+            )
+
+    def _forward(self, model_inputs):
+        """Run the model and return (confidence, label) tensors"""
+        autocast = torch.autocast("cpu", dtype=torch.bfloat16) if self.backend == "bf16" else contextlib.nullcontext()
+        with autocast:
+            logits = self.model(**model_inputs).logits
+        probs = torch.nn.functional.softmax(logits.float(), dim=1)
+        return torch.max(probs, dim=1)
+
+    def autotune(self, sample_rows=None, recalibrate=False):
+        """
+        Use this host's calibrated threads, batch size and token budget. Without a saved profile
+        (or with recalibrate) a short sweep on the first rows of the input finds them first.
+        """
+        profile = AutotuneProfile(Config.AUTOTUNE_PROFILE_DIR)
+        settings = None if recalibrate else profile.get(Config.INFERENCE_BACKEND)
+        if settings is None:
+            sample_rows = sample_rows or Config.AUTOTUNE_SAMPLE_ROWS
+            texts = self._filter_chunk(_read_sample(sample_rows), Counter())['text'].tolist()
+            if not texts:
+                raise ValueError(f"No usable rows in the first {sample_rows} rows of {Config.CSV_PATH}")
+            # With a worker pool the model lives in the workers, so calibrate on a temporary copy
+            tuner = self if self.model is not None else SentimentAnalyzer(load_model=True, connect_es=False)
+            settings = calibrate(tuner, texts, _worker_threads())
+            profile.save(Config.INFERENCE_BACKEND, settings)
+        else:
+            logger.info(f"Using the autotune profile from {profile.path}")
+
+        self.batch_size = settings["batch_size"]
+        self.token_budget = settings["token_budget"]
+        self.threads = settings["threads"]
+        # Workers set their own threads when they start
+        if Config.NUM_WORKERS <= 1:
+            torch.set_num_threads(self.threads)
+        return settings
+
+    def process_data(self, incremental=None):
+        """
+        Process CSV with enhanced metadata handling. In incremental mode only rows appended since
+        the last checkpoint are read, and the checkpoint advances after each chunk is indexed.
+        """
+        if incremental is None:
+            incremental = Config.INCREMENTAL
+        if incremental and _input_format() != "csv":
+            # Byte-offset watermarks only make sense for an append-only CSV
+            logger.warning(f"Incremental mode only supports CSV input, processing all of {Config.CSV_PATH}")
+            incremental = False
+        self.checkpoint = IngestCheckpoint(Config.CHECKPOINT_PATH, Config.CSV_PATH) if incremental else None
+        if Config.AUTOTUNE:
+            self.autotune()
+        # Read stats stay separate, when pipelined reading and indexing run on different threads
+        read_stats = Counter()
+        chunks = _timed_iter(self._iter_chunks(read_stats), read_stats, "read")
+
+        self.stats.clear()
+        started = time.perf_counter()
+        try:
+            self._process_chunks(chunks)
+            metrics.SENTIMENT_LAST_SUCCESS.set_to_current_time()
+        finally:
+            # Every stage has stopped by now, so merging here cannot race the index thread
+            self.stats.update(read_stats)
+            # Exported on failure too, so a failing daily run still shows how far it got
+            metrics.SENTIMENT_RUN_SECONDS.set(time.perf_counter() - started)
+            metrics.export(metrics.SENTIMENT, "sentiment_pipeline")
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"Processed {self.stats['rows']} rows in {elapsed:.1f}s "
+                    f"({self.stats['rows'] / elapsed:.1f} rows/sec), "
+                    f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+        self._log_stats("Run")
+
+    def _process_chunks(self, chunks):
+        if Config.NUM_WORKERS > 1:
+            self._process_with_workers(chunks)
+        elif Config.PIPELINED:
+            if self.model is None:
+                self._load_model()
+            self._process_pipelined(chunks)
+        else:
+            if self.model is None:
+                self._load_model()
+            for chunk, watermark in chunks:
+                self._process_chunk(chunk)
+                self._advance_checkpoint(watermark)
+
+    def _iter_chunks(self, stats):
+        """Yield (chunk, watermark) pairs, the watermark is None outside incremental mode"""
+        count_unmapped = functools.partial(self._count_unmapped, stats)
+        if _input_format() != "csv":
+            # Projection and the ticker filter are pushed into the scan, skipped rows are never decoded
+            for chunk in iter_arrow_chunks(Config.CSV_PATH, Config.CHUNK_SIZE, _input_columns(), _input_format(),
+                                           filter_column='group_name', filter_values=Config.TICKER_MAPPING.keys(),
+                                           categorical_columns=Config.CATEGORICAL_COLS,
+                                           on_filtered=count_unmapped):
+                yield chunk, None
+            return
+
+        read_csv_kwargs = _read_csv_kwargs()
+        if self.checkpoint is None:
+            if Config.CSV_ENGINE == "pyarrow" and _pyarrow_available():
+                chunks = iter_pyarrow_csv_chunks(Config.CSV_PATH, Config.CHUNK_SIZE, _input_columns(), _csv_dtypes(),
+                                                 date_columns=[Config.DATE_COL], filter_column='group_name',
+                                                 filter_values=Config.TICKER_MAPPING.keys(),
+                                                 on_filtered=count_unmapped)
+            else:
+                chunks = pd.read_csv(Config.CSV_PATH, chunksize=Config.CHUNK_SIZE, **read_csv_kwargs)
+            for chunk in chunks:
+                yield chunk, None
+            return
+
+        start_offset = self.checkpoint.start_offset()
+        for chunk, offset in iter_csv_chunks(Config.CSV_PATH, Config.CHUNK_SIZE, start_offset, **read_csv_kwargs):
+            watermark = {"offset": offset}
+            if Config.DATE_COL in chunk.columns and chunk[Config.DATE_COL].notna().any():
+                watermark["last_created_at"] = str(chunk[Config.DATE_COL].max())
+            if Config.ID_COL in chunk.columns and len(chunk):
+                watermark["last_twitter_id"] = str(chunk[Config.ID_COL].iloc[-1])
+            yield chunk, watermark
+
+    def _count_unmapped(self, stats, rows):
+        """Rows of unmapped tickers the reader filtered out, which _filter_chunk never sees"""
+        stats["dropped_unmapped_ticker"] += rows
+        metrics.ROWS_DROPPED.labels("unmapped_ticker").inc(rows)
+
+    def _advance_checkpoint(self, watermark):
+        if watermark is not None:
+            self.checkpoint.save(**watermark)
+
+    def _process_with_workers(self, chunks):
+        """Score chunks on a pool of inference processes, indexing results in chunk order"""
+        threads = self.threads or _worker_threads()
+        max_in_flight = Config.NUM_WORKERS * 2
+        logger.info(f"Starting {Config.NUM_WORKERS} inference workers with {threads} threads each")
+
+        # spawn avoids forking a parent that already started torch threads
+        with ProcessPoolExecutor(
+            max_workers=Config.NUM_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(threads, self.batch_size, self.token_budget)
+        ) as pool:
+            pending = deque()
+            for chunk, watermark in chunks:
+                pending.append((pool.submit(_score_chunk_in_worker, chunk), watermark))
+                # Bound the chunks held in memory by waiting on the oldest one
+                if len(pending) >= max_in_flight:
+                    self._index_pending(*pending.popleft())
+            while pending:
+                self._index_pending(*pending.popleft())
+
+    def _index_pending(self, future, watermark):
+        self._index_scored(*future.result())
+        self._advance_checkpoint(watermark)
     
+    def _process_pipelined(self, chunks):
+        """
+        Run read -> clean/tokenize -> infer -> index as concurrent stages joined by bounded queues,
+        so chunk N+1 is prepared and chunk N-1 is indexed while the model runs on chunk N.
+        """
+        raw = queue.Queue(maxsize=Config.PIPELINE_QUEUE_SIZE)
+        prepared = queue.Queue(maxsize=Config.PIPELINE_QUEUE_SIZE)
+        scored = queue.Queue(maxsize=Config.PIPELINE_QUEUE_SIZE)
+        stop = threading.Event()
+        errors = []
+
+        def read():
+            try:
+                for item in chunks:
+                    if not _put(raw, item, stop):
+                        return
+            finally:
+                _put(raw, _STAGE_DONE, stop)
+
+        def prepare():
+            try:
+                while (item := _get(raw, stop)) is not _STAGE_DONE:
+                    chunk, watermark = item
+                    chunk_stats = Counter()
+                    with _timed(chunk_stats, "clean"):
+                        chunk = self._filter_chunk(chunk, chunk_stats)
+                    # Empty chunks still travel downstream so the checkpoint advances in order
+                    lookup = self._lookup(chunk['text'], chunk_stats) if not chunk.empty else None
+                    encodings = self._encode(lookup.miss_texts, chunk_stats) if lookup else []
+                    if not _put(prepared, (chunk, lookup, encodings, chunk_stats, watermark), stop):
+                        return
+            finally:
+                _put(prepared, _STAGE_DONE, stop)
+
+        def index():
+            while (item := _get(scored, stop)) is not _STAGE_DONE:
+                chunk, labels, confidence, fields, chunk_stats, watermark = item
+                if labels is not None:
+                    with _timed(chunk_stats, "serialize"):
+                        documents = self._encode_documents(chunk, labels, confidence, fields)
+                    self._index_scored(documents, chunk_stats)
+                self._advance_checkpoint(watermark)
+
+        def run_stage(target):
+            try:
+                target()
+            except Exception as e:
+                logger.error(f"Pipeline stage {target.__name__} failed: {str(e)}")
+                errors.append(e)
+                stop.set()
+
+        threads = [threading.Thread(target=run_stage, args=(stage,), name=f"sentiment-{stage.__name__}", daemon=True)
+                   for stage in (read, prepare, index)]
+        for thread in threads:
+            thread.start()
+
+        # Inference stays on the calling thread; torch releases the GIL during the forward pass
+        def infer():
+            try:
+                while (item := _get(prepared, stop)) is not _STAGE_DONE:
+                    chunk, lookup, encodings, chunk_stats, watermark = item
+                    labels = confidence = fields = None
+                    if lookup is not None:
+                        encodings = self._recheck(lookup, encodings, chunk_stats)
+                        labels, confidence, fields = self._resolve(
+                            lookup, *self._predict_encoded(encodings, chunk_stats), chunk_stats
+                        )
+                    if not _put(scored, (chunk, labels, confidence, fields, chunk_stats, watermark), stop):
+                        return
+            finally:
+                _put(scored, _STAGE_DONE, stop)
+
+        run_stage(infer)
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+
     def _process_chunk(self, chunk):
         """Process chunk with metadata"""
+        self._index_scored(*self._score_chunk(chunk))
+
+    def _index_scored(self, predictions, chunk_stats):
+        indexed = True
+        if predictions:
+            with _timed(chunk_stats, "index"):
+                indexed = self._index_to_es(predictions, chunk_stats)
+        elif chunk_stats["rows"]:
+            logger.warning("No predictions generated")
+
+        self.stats.update(chunk_stats)
+        self._record_metrics(chunk_stats)
+        self._log_stats("Chunk", chunk_stats)
+        # Stop rather than move the checkpoint past documents that never reached ES
+        if not indexed and self.checkpoint is not None:
+            raise RuntimeError("Indexing failed, stopping so the next run resumes from the last indexed chunk")
+
+    def _score_chunk(self, chunk):
+        """Filter, clean and score a chunk, returning its documents and inference stats"""
+        chunk_stats = Counter()
+        with _timed(chunk_stats, "clean"):
+            chunk = self._filter_chunk(chunk, chunk_stats)
+        if chunk.empty:
+            return [], chunk_stats
+        started = time.perf_counter()
+
+        # Run sentiment analysis on unseen texts only, predictions come back in row order
+        lookup = self._lookup(chunk['text'], chunk_stats)
+        if Config.USE_HF_DATASET:
+            labels, confidence = self._predict_with_dataset(pd.DataFrame({'text': lookup.miss_texts}), chunk_stats)
+        else:
+            encodings = self._encode(lookup.miss_texts, chunk_stats)
+            labels, confidence = self._predict_encoded(encodings, chunk_stats)
+        labels, confidence, fields = self._resolve(lookup, labels, confidence, chunk_stats)
+        chunk_stats["scoring_seconds"] += time.perf_counter() - started
+
+        with _timed(chunk_stats, "serialize"):
+            documents = self._encode_documents(chunk, labels, confidence, fields)
+        return documents, chunk_stats
+
+    def _filter_chunk(self, chunk, stats):
+        """Drop unmapped tickers and incomplete rows, then clean the text"""
         # Clean and filter data
         if 'group_name' in chunk.columns and hasattr(Config, 'TICKER_MAPPING'):
+            rows = len(chunk)
             chunk = chunk[chunk['group_name'].isin(Config.TICKER_MAPPING.keys())]
+            stats["dropped_unmapped_ticker"] += rows - len(chunk)
         
         # Ensure required columns exist
         required_cols = ['text']
         if Config.DATE_COL in chunk.columns:
             required_cols.append(Config.DATE_COL)
         
+        rows = len(chunk)
         chunk = chunk.dropna(subset=required_cols)
+        stats["dropped_incomplete"] += rows - len(chunk)
         
         if chunk.empty:
             logger.warning("No valid data to process after filtering")
-            return
+            return chunk
         
         # Clean the text column
-        chunk['text'] = chunk['text'].apply(self._clean_text)
-        
-        # Explicitly get the column data we'll need later
-        original_data = chunk.to_dict('records')
-        
-        # Prepare for sentiment analysis
+        chunk['text'] = clean_series(chunk['text'], processes=Config.CLEAN_PROCESSES)
+        return chunk
+
+    def _build_documents(self, chunk, labels, confidence, fields=None):
+        """Build ES documents for a scored chunk column by column"""
+        n = len(chunk)
+        tickers = _tickers(chunk)
+        screennames = _column_values(chunk, "screenname") or [None] * n
+        usernames = _column_values(chunk, "username") or [None] * n
+
+        users = [{"screenname": screenname, "username": username}
+                 for screenname, username in zip(screennames, usernames)]
+        metadata = [{"ticker": ticker, "user": user} for ticker, user in zip(tickers, users)]
+        predictions = [
+            {
+                "metadata": meta,
+                "text": text,
+                "sentiment": SENTIMENT_LABELS[label],
+                "confidence": score
+            }
+            for meta, text, label, score in zip(metadata, chunk['text'].tolist(), labels, confidence)
+        ]
+
+        # Optional fields are filled one column at a time, only when the column exists
+        for field, values in (fields or {}).items():
+            _set_column(predictions, field, values)
+        if Config.DATE_COL in chunk.columns:
+            _set_column(predictions, "created_at", _isoformat(chunk[Config.DATE_COL]))
+        # Counts are left out of a document when missing, as the row-by-row builder did
+        for field in ["followers", "friends"]:
+            _set_column(users, field, _column_values(chunk, field, integer=True), skip_missing=True)
+        for field in ["location", "search_query"]:
+            _set_column(metadata, field, _column_values(chunk, field))
+        _set_column(metadata, "retweet_count", _column_values(chunk, "retweet_count", integer=True), skip_missing=True)
+
+        metric_columns = [metric for metric in ["polarity", "partition_0", "partition_1"] if metric in chunk.columns]
+        if metric_columns:
+            model_metrics = [{} for _ in range(n)]
+            for metric in metric_columns:
+                _set_column(model_metrics, metric, _column_values(chunk, metric))
+            _set_column(predictions, "model_metrics", model_metrics)
+
+        return predictions
+
+    def _document_ids(self, chunk):
+        """
+        Deterministic ids from the model name, ticker and raw twitter_id, so reruns overwrite documents
+        instead of duplicating them, while a tweet found under groups of two tickers keeps one document
+        per ticker. Rows without an id fall back to a hash of their content.
+        """
+        twitter_ids = _column_values(chunk, Config.ID_COL) or [None] * len(chunk)
+        created_at = _isoformat(chunk[Config.DATE_COL]) if Config.DATE_COL in chunk.columns else [""] * len(chunk)
+        usernames = _column_values(chunk, "username") or [None] * len(chunk)
+        return [
+            hashlib.sha1(
+                (f"{Config.MODEL_NAME}\0{ticker}\0{twitter_id}" if twitter_id is not None
+                 else f"{Config.MODEL_NAME}\0{ticker}\0{date}\0{username}\0{text}").encode("utf-8")
+            ).hexdigest()
+            for ticker, twitter_id, date, username, text
+            in zip(_tickers(chunk), twitter_ids, created_at, usernames, chunk['text'].tolist())
+        ]
+
+    def _encode_documents(self, chunk, labels, confidence, fields=None):
+        """
+        Build the chunk's documents and encode them to JSON once, paired with their ids,
+        so bulk bodies are assembled from bytes
+        """
+        predictions = self._build_documents(chunk, labels, confidence, fields)
+        return list(zip(self._document_ids(chunk), (_dumps(prediction) for prediction in predictions)))
+
+    def _lookup(self, texts, stats):
+        """
+        Dedupe a chunk's texts and resolve the cached ones, and in cascade mode the ones TextBlob is sure of.
+        With near-duplicate clustering the unique texts are grouped first, and only each cluster's
+        representative is looked up and scored; clusters matching a recent chunk's reuse its label.
+        """
+        codes, uniques = pd.factorize(texts, sort=False)
+        uniques = list(uniques)
+        stats["rows"] += len(codes)
+        stats["unique_rows"] += len(uniques)
+        clusters = None
+        if self.near_duplicates is not None and uniques:
+            started = time.perf_counter()
+            clusters = self.near_duplicates.cluster(uniques)
+            codes = clusters.codes[codes]
+            uniques = clusters.texts
+            stats["near_duplicate_seconds"] += time.perf_counter() - started
+            stats["near_duplicate_clusters"] += len(uniques)
+        labels = np.full(len(uniques), -1, dtype=np.int64)
+        confidence = np.zeros(len(uniques), dtype=np.float32)
+
+        if self.cache is not None and uniques:
+            cached = self.cache.get_many(uniques)
+            for i, text in enumerate(uniques):
+                if text in cached:
+                    labels[i], confidence[i] = cached[text]
+
+        misses = np.flatnonzero(labels < 0)
+        if self.cache is not None:
+            stats["cache_hits"] += len(uniques) - len(misses)
+            stats["cache_misses"] += len(misses)
+        lookup = _Lookup(codes, labels, confidence, misses, [uniques[i] for i in misses])
+        if clusters is not None:
+            lookup.clusters = clusters
+            self._match_window(lookup, stats)
+        if Config.CASCADE:
+            self._first_stage(lookup, stats)
+        return lookup
+
+    def _match_window(self, lookup, stats):
+        """Resolve the missed clusters that joined a cluster of a recent chunk with that cluster's prediction"""
+        matches = [lookup.clusters.window_matches[i] for i in lookup.misses]
+        matched = np.array([match is not None for match in matches], dtype=bool)
+        for i, match in zip(lookup.misses, matches):
+            if match is not None:
+                lookup.labels[i], lookup.confidence[i], lookup.stages[i] = match.label, match.confidence, match.stage
+        lookup.misses = lookup.misses[~matched]
+        lookup.miss_texts = [text for text, match in zip(lookup.miss_texts, matches) if match is None]
+        stats["near_duplicate_window_hits"] += int(matched.sum())
+
+    def _recheck(self, lookup, encodings, stats):
+        """
+        Resolve the misses that chunks scored since _lookup ran have cached or added to the
+        near-duplicate window meanwhile, returning the encodings of the remaining ones. Pipelined
+        lookups run up to PIPELINE_QUEUE_SIZE + 1 chunks ahead of inference, so texts repeated in
+        nearby chunks would otherwise be scored again.
+        """
+        if not len(lookup.misses):
+            return encodings
+        found = np.zeros(len(lookup.misses), dtype=bool)
+        if self.cache is not None:
+            cached = self.cache.get_many(lookup.miss_texts)
+            for j, (i, text) in enumerate(zip(lookup.misses, lookup.miss_texts)):
+                if text in cached:
+                    lookup.labels[i], lookup.confidence[i] = cached[text]
+                    found[j] = True
+            stats["cache_hits"] += int(found.sum())
+            stats["cache_misses"] -= int(found.sum())
+        if lookup.clusters is not None:
+            # Matched on the representative's signature only, _lookup also tried the other members
+            remaining = np.flatnonzero(~found)
+            matches = self.near_duplicates.match(lookup.clusters.signatures[lookup.misses[remaining]])
+            for j, match in zip(remaining, matches):
+                if match is not None:
+                    i = lookup.misses[j]
+                    lookup.labels[i], lookup.confidence[i], lookup.stages[i] = match.label, match.confidence, match.stage
+                    lookup.clusters.window_matches[i] = match
+                    lookup.clusters.cluster_ids[i] = match.cluster_id
+                    found[j] = True
+                    stats["near_duplicate_window_hits"] += 1
+
+        keep = ~found
+        lookup.misses = lookup.misses[keep]
+        lookup.miss_texts = [text for text, kept in zip(lookup.miss_texts, keep) if kept]
+        if lookup.audit_labels is not None:
+            lookup.audit_labels = lookup.audit_labels[keep]
+        return [ids for ids, kept in zip(encodings, keep) if kept]
+
+    def _first_stage(self, lookup, stats):
+        """
+        Label the misses with TextBlob and keep the confident labels (see _lexical_confident),
+        leaving the uncertain ones as misses for FinBERT. A sample of the confident ones is sent
+        to FinBERT as well, so agreement between the two stages can be measured.
+        """
+        if not lookup.miss_texts:
+            return
+        started = time.perf_counter()
+        labels, confidence, subjectivity = _lexical_scores(lookup.miss_texts)
+        confident = _lexical_confident(labels, confidence, subjectivity, Config.CASCADE_THRESHOLD)
+        audit = confident & (self.rng.random(len(confident)) < Config.CASCADE_AUDIT_RATE)
+        accept = confident & ~audit
+
+        accepted = lookup.misses[accept]
+        lookup.labels[accepted] = labels[accept]
+        lookup.confidence[accepted] = confidence[accept]
+        lookup.stages[accepted] = CASCADE_STAGES.index("textblob")
+        escalate = ~accept
+        lookup.misses = lookup.misses[escalate]
+        lookup.miss_texts = [text for text, keep in zip(lookup.miss_texts, escalate) if keep]
+        lookup.audit_labels = np.where(audit, labels, -1)[escalate]
+
+        stats["cascade_texts"] += len(confident)
+        stats["cascade_escalated"] += int(escalate.sum())
+        stats["cascade_seconds"] += time.perf_counter() - started
+
+    def _resolve(self, lookup, miss_labels, miss_confidence, stats):
+        """
+        Merge model predictions for the misses into the lookup and expand back to one per row.
+        Returns labels, confidences and the optional document fields: in cascade mode the stage
+        that produced each label and the TextBlob score, with near-duplicate clustering the row's
+        cluster id. Rows TextBlob labelled get no confidence, only FinBERT fills that field.
+        """
+        if len(lookup.misses):
+            lookup.labels[lookup.misses] = miss_labels
+            lookup.confidence[lookup.misses] = miss_confidence
+            if self.cache is not None:
+                # TextBlob labels stay out of the cache, it holds FinBERT predictions only
+                self.cache.put_many(zip(lookup.miss_texts, miss_labels, miss_confidence))
+            if lookup.audit_labels is not None:
+                audited = lookup.audit_labels >= 0
+                stats["cascade_audited"] += int(audited.sum())
+                agreed = lookup.audit_labels[audited] == np.asarray(miss_labels)[audited]
+                stats["cascade_audit_agreed"] += int(agreed.sum())
+
+        fields = {}
+        confidence = lookup.confidence[lookup.codes].tolist()
+        if Config.CASCADE:
+            row_stages = lookup.stages[lookup.codes]
+            lexical = (row_stages == CASCADE_STAGES.index("textblob")).tolist()
+            stats["cascade_textblob_rows"] += sum(lexical)
+            fields["stage"] = [CASCADE_STAGES[stage] for stage in row_stages]
+            # The TextBlob score moves to its own field, so confidence averages stay FinBERT probabilities
+            fields["lexical_score"] = [score if is_lexical else None for score, is_lexical in zip(confidence, lexical)]
+            confidence = [None if is_lexical else score for score, is_lexical in zip(confidence, lexical)]
+        if lookup.clusters is not None:
+            self.near_duplicates.remember(lookup.clusters, lookup.labels, lookup.confidence, lookup.stages)
+            fields["cluster_id"] = [lookup.clusters.cluster_ids[code] for code in lookup.codes]
+        return lookup.labels[lookup.codes].tolist(), confidence, fields
+
+    def _predict_with_dataset(self, chunk, stats):
+        """
+        Predict in fixed batches of self.batch_size rows through a HuggingFace Dataset.
+        Kept for comparison, it copies every chunk into Arrow several times.
+        """
+        if chunk.empty:
+            return [], []
+        from datasets import Dataset
+
+        started = time.perf_counter()
         dataset = Dataset.from_pandas(chunk)
-        dataset = dataset.map(self._tokenize, batched=True, batch_size=Config.BATCH_SIZE)
+        dataset = dataset.map(self._tokenize, batched=True, batch_size=self.batch_size)
         
         # Set format only for columns that exist
         format_columns = ['input_ids', 'attention_mask']
         dataset.set_format('torch', columns=format_columns, 
                            device='cuda' if self.device == 0 else 'cpu')
         
-        predictions = []
-        idx = 0
+        labels, confidence = [], []
         with torch.no_grad():
-            for batch in dataset.iter(batch_size=Config.BATCH_SIZE):
+            for batch in dataset.iter(batch_size=self.batch_size):
                 model_inputs = {k: v for k, v in batch.items() if k in ['input_ids', 'attention_mask']}
-                outputs = self.model(**model_inputs)
-                probs = torch.nn.functional.softmax(outputs.logits, dim=1)
-                confidence, labels = torch.max(probs, dim=1)
-                
-                # Use the batch size to determine how many records to process
-                batch_size = len(labels)
-                
-                for i in range(batch_size):
-                    if idx + i >= len(original_data):
-                        break
-                        
-                    row_data = original_data[idx + i]
-                    
-                    # Create prediction dictionary with safe field access
-                    prediction = {
-                        "metadata": {
-                            "ticker": Config.TICKER_MAPPING.get(row_data.get("group_name", ""), "UNKNOWN") 
-                                     if hasattr(Config, 'TICKER_MAPPING') else "UNKNOWN",
-                            "user": {}
-                        },
-                        "text": row_data.get("text", ""),
-                        "sentiment": ["positive", "negative", "neutral"][labels[i].item()],
-                        "confidence": confidence[i].item()
-                    }
-                    
-                    # Add created_at if available
-                    if "created_at" in row_data:
-                        created_at = row_data["created_at"]
-                        if hasattr(created_at, "tz_localize"):
-                            created_at = created_at.tz_localize(None)  # Remove timezone info if already set
-                        prediction["created_at"] = created_at.isoformat() if hasattr(created_at, "isoformat") else str(created_at)
-                    
-                    # Add user fields if available
-                    user_fields = {
-                        "screenname": row_data.get("screenname"),
-                        "username": row_data.get("username")
-                    }
-                    
-                    # Add numeric user fields with type checking
-                    for field in ["followers", "friends"]:
-                        if field in row_data and pd.notna(row_data[field]):
-                            try:
-                                user_fields[field] = int(row_data[field])
-                            except (ValueError, TypeError):
-                                user_fields[field] = None
-                    
-                    prediction["metadata"]["user"] = user_fields
-                    
-                    # Add other metadata if available
-                    for field in ["location", "search_query"]:
-                        if field in row_data:
-                            prediction["metadata"][field] = row_data.get(field)
-                    
-                    # Add retweet_count if available
-                    if "retweet_count" in row_data and pd.notna(row_data["retweet_count"]):
-                        try:
-                            prediction["metadata"]["retweet_count"] = int(row_data["retweet_count"])
-                        except (ValueError, TypeError):
-                            prediction["metadata"]["retweet_count"] = None
-                    
-                    # Add model metrics if available
-                    model_metrics = {}
-                    for metric in ["polarity", "partition_0", "partition_1"]:
-                        if metric in row_data:
-                            model_metrics[metric] = row_data[metric]
-                    
-                    if model_metrics:
-                        prediction["model_metrics"] = model_metrics
-                    
-                    predictions.append(prediction)
-                
-                idx += batch_size
-        
-        if predictions:
-            self._index_to_es(predictions)
-        else:
-            logger.warning("No predictions generated")
-    
-    def _clean_text(self, text):
+                batch_confidence, batch_labels = self._forward(model_inputs)
+                labels.extend(batch_labels.tolist())
+                confidence.extend(batch_confidence.tolist())
+
+                stats["tokens"] += int(model_inputs['attention_mask'].sum())
+                stats["batches"] += 1
+                stats["padded_tokens"] += model_inputs['attention_mask'].numel()
+
+        stats["model_rows"] += len(labels)
+        stats["inference_seconds"] += time.perf_counter() - started
+        return labels, confidence
+
+    def _encode(self, texts, stats):
+        """Tokenize without padding; batches are padded at inference time"""
+        if not texts:
+            return []
+        started = time.perf_counter()
+        input_ids = self.tokenizer(
+            texts,
+            truncation=True,
+            max_length=Config.MAX_LENGTH,
+            return_attention_mask=False,
+            return_token_type_ids=False
+        )['input_ids']
+        stats["tokenize_seconds"] += time.perf_counter() - started
+        return input_ids
+
+    def _warm_up(self, input_ids):
+        """Predict the first batch of input_ids, so one-off costs such as compilation are not timed"""
+        self._predict_encoded(input_ids[:self.batch_size], Counter())
+
+    def _predict_encoded(self, input_ids, stats):
         """
-        Clean the text by removing URLs, hashtags, mentions, emojis, and other noise.
+        Predict tokenized rows, returned in the original row order. In bucketed mode rows are
+        sorted by length and packed into token-budget batches, otherwise batches are
+        self.batch_size consecutive rows.
         """
-        # Remove URLs
-        text = re.sub(r"http\S+|www\S+|https\S+", "", text, flags=re.MULTILINE)
-        
-        # Remove hashtags
-        text = re.sub(r"#\w+", "", text)
-        
-        # Remove mentions
-        text = re.sub(r"@\w+", "", text)
-        
-        # Remove emojis
-        emoji_pattern = re.compile(
-            "["
-            u"\U0001F600-\U0001F64F"  # emoticons
-            u"\U0001F300-\U0001F5FF"  # symbols & pictographs
-            u"\U0001F680-\U0001F6FF"  # transport & map symbols
-            u"\U0001F700-\U0001F77F"  # alchemical symbols
-            u"\U0001F780-\U0001F7FF"  # Geometric Shapes Extended
-            u"\U0001F800-\U0001F8FF"  # Supplemental Arrows-C
-            u"\U0001F900-\U0001F9FF"  # Supplemental Symbols and Pictographs
-            u"\U0001FA00-\U0001FA6F"  # Chess Symbols
-            u"\U0001FA70-\U0001FAFF"  # Symbols and Pictographs Extended-A
-            u"\U00002702-\U000027B0"  # Dingbats
-            u"\U000024C2-\U0001F251" 
-            "]+", flags=re.UNICODE)
-        text = emoji_pattern.sub(r"", text)
-        
-        # Remove extra spaces
-        text = re.sub(r"\s+", " ", text).strip()
-        
-        return text
+        started = time.perf_counter()
+        lengths = np.fromiter((len(ids) for ids in input_ids), dtype=np.int64, count=len(input_ids))
+        if Config.INFERENCE_MODE == "bucketed":
+            order = np.argsort(lengths, kind='stable')
+            batches = token_budget_batches(lengths[order], self.token_budget, self.batch_size)
+        else:
+            order = np.arange(len(input_ids))
+            batches = [(i, min(i + self.batch_size, len(input_ids)))
+                       for i in range(0, len(input_ids), self.batch_size)]
+
+        labels = np.empty(len(input_ids), dtype=np.int64)
+        confidence = np.empty(len(input_ids), dtype=np.float32)
+        with torch.no_grad():
+            for start, end in batches:
+                rows = order[start:end]
+                batch = pad_batch([input_ids[i] for i in rows], self.tokenizer.pad_token_id)
+                batch_confidence, batch_labels = self._forward({k: v.to(self.model.device) for k, v in batch.items()})
+                labels[rows] = batch_labels.cpu().numpy()
+                confidence[rows] = batch_confidence.cpu().numpy()
+
+                stats["padded_tokens"] += batch['input_ids'].numel()
+                stats["batches"] += 1
+
+        stats["model_rows"] += len(input_ids)
+        stats["tokens"] += int(lengths.sum())
+        stats["fixed_padded_tokens"] += _fixed_padded_tokens(lengths, self.batch_size)
+        stats["inference_seconds"] += time.perf_counter() - started
+        return labels.tolist(), confidence.tolist()
+
+    def _record_metrics(self, stats):
+        """Export a chunk's stats; read time is observed as chunks are read"""
+        _observe_stages(stats)
+        metrics.ROWS_PROCESSED.inc(stats["rows"])
+        for reason in ["unmapped_ticker", "incomplete"]:
+            metrics.ROWS_DROPPED.labels(reason).inc(stats[f"dropped_{reason}"])
+        for reason in ["dead_lettered", "index_error"]:
+            metrics.ROWS_FAILED.labels(reason).inc(stats[reason])
+        if stats["batches"]:
+            metrics.BATCH_SIZE.set(stats["model_rows"] / stats["batches"])
+        if stats["padded_tokens"]:
+            metrics.PADDING_WASTE.set(1 - stats["tokens"] / stats["padded_tokens"])
+        if stats["near_duplicate_clusters"]:
+            metrics.NEAR_DUPLICATE_TEXTS.labels("representative").inc(
+                stats["near_duplicate_clusters"] - stats["near_duplicate_window_hits"])
+            metrics.NEAR_DUPLICATE_TEXTS.labels("merged").inc(stats["unique_rows"] - stats["near_duplicate_clusters"])
+            metrics.NEAR_DUPLICATE_TEXTS.labels("window").inc(stats["near_duplicate_window_hits"])
+        if stats["cascade_texts"]:
+            metrics.CASCADE_TEXTS.labels("accepted").inc(stats["cascade_texts"] - stats["cascade_escalated"])
+            metrics.CASCADE_TEXTS.labels("escalated").inc(stats["cascade_escalated"])
+            metrics.CASCADE_AUDITED.labels("agreed").inc(stats["cascade_audit_agreed"])
+            metrics.CASCADE_AUDITED.labels("disagreed").inc(stats["cascade_audited"] - stats["cascade_audit_agreed"])
+
+    def _log_stats(self, scope, stats=None):
+        """Log inference throughput, padding waste and cache hit rate"""
+        stats = self.stats if stats is None else stats
+        if stats["cache_hits"] or stats["cache_misses"]:
+            logger.info(
+                f"{scope} cache: {stats['rows'] - stats['unique_rows']} duplicate rows in chunks, "
+                f"{stats['cache_hits']} hits, {stats['cache_misses']} misses, "
+                f"hit rate {stats['cache_hits'] / (stats['cache_hits'] + stats['cache_misses']):.1%}"
+            )
+        if stats["near_duplicate_clusters"]:
+            logger.info(
+                f"{scope} near-duplicates: {stats['unique_rows']} unique texts in "
+                f"{stats['near_duplicate_clusters']} clusters "
+                f"({stats['unique_rows'] - stats['near_duplicate_clusters']} merged), "
+                f"{stats['near_duplicate_window_hits']} clusters labeled from earlier chunks, "
+                f"clustering took {stats['near_duplicate_seconds']:.2f}s"
+            )
+        if stats["cascade_texts"]:
+            message = (
+                f"{scope} cascade: {stats['cascade_escalated'] / stats['cascade_texts']:.1%} of "
+                f"{stats['cascade_texts']} uncached texts escalated to FinBERT, "
+                f"{stats['cascade_textblob_rows']} rows labeled by TextBlob in {stats['cascade_seconds']:.2f}s"
+            )
+            if stats["cascade_audited"]:
+                message += (f", audit agreement {stats['cascade_audit_agreed'] / stats['cascade_audited']:.1%} "
+                            f"over {stats['cascade_audited']} texts")
+            logger.info(message)
+        stage_times = [f"{stage} {stats[f'{stage}_seconds']:.2f}s" for stage in STAGES if stats[f"{stage}_seconds"]]
+        if stage_times:
+            logger.info(f"{scope} stages: {', '.join(stage_times)}")
+        if not stats["padded_tokens"]:
+            return
+
+        seconds = stats["inference_seconds"] or float("nan")
+        message = (
+            f"{scope} inference: {stats['rows']} rows ({stats['model_rows']} through the model), "
+            f"{stats['rows'] / seconds:.1f} rows/sec, "
+            f"{stats['tokens'] / seconds:.1f} tokens/sec, "
+            f"padding waste {1 - stats['tokens'] / stats['padded_tokens']:.1%}"
+        )
+        if stats["fixed_padded_tokens"]:
+            message += f" (fixed batches: {1 - stats['tokens'] / stats['fixed_padded_tokens']:.1%})"
+        if stats["scoring_seconds"]:
+            message += f", {stats['scoring_seconds']:.2f}s scoring"
+        logger.info(message)
     
     def _tokenize(self, examples):
         return self.tokenizer(
             examples["text"],
             padding=True,
             truncation=True,
-            max_length=512,
+            max_length=Config.MAX_LENGTH,
             return_tensors="pt"
         )
     
-    def _index_to_es(self, predictions):
-        """Bulk index with enhanced error handling"""
-        actions = ({
-            '_op_type': 'index',
-            '_index': Config.SENTIMENT_INDEX,
-            '_source': pred
-        } for pred in predictions)
-
+    def _index_to_es(self, predictions, stats):
+        """Bulk index (id, document) pairs with retries and dead-lettering"""
         try:
-            success, failed = helpers.bulk(
-                self.es,
-                actions,
-                chunk_size=Config.BATCH_SIZE,
-                request_timeout=60,
-                raise_on_error=False
-            )
-            logger.info(f"Indexed {success} documents, {len(failed)} failed")
+            success, failed = self.indexer.index_documents(predictions)
+            logger.info(f"Indexed {success} documents, {failed} failed")
+            stats["indexed"] += success
+            stats["dead_lettered"] += failed
+            return True
         except Exception as e:
             logger.error(f"Error indexing documents: {str(e)}")
+            stats["index_error"] += len(predictions)
+            return False
+
+def check_backend_parity(sample_rows, backends=None):
+    """
+    Score a sample of Config.CSV_PATH with each backend and compare labels and confidences
+    against fp32. Returns one result per backend and the fastest one within
+    Config.PARITY_MIN_AGREEMENT.
+    """
+    backends = backends or INFERENCE_BACKENDS
+    sample = SentimentAnalyzer(load_model=False, connect_es=False)
+    texts = sample._filter_chunk(_read_sample(sample_rows), Counter())['text'].tolist()
+    if not texts:
+        raise ValueError(f"No usable rows in the first {sample_rows} rows of {Config.CSV_PATH}")
+
+    results = []
+    reference = None
+    for backend in ["fp32"] + [b for b in backends if b != "fp32"]:
+        analyzer = SentimentAnalyzer(load_model=False, connect_es=False)
+        analyzer._load_model(backend)
+        encodings = analyzer._encode(texts, Counter())
+
+        analyzer._warm_up(encodings)
+        started = time.perf_counter()
+        labels, confidence = analyzer._predict_encoded(encodings, Counter())
+        elapsed = time.perf_counter() - started
+
+        labels, confidence = np.array(labels), np.array(confidence)
+        if reference is None:
+            reference = labels, confidence
+        confidence_delta = np.abs(confidence - reference[1])
+        result = {
+            "backend": analyzer.backend,
+            "rows_per_sec": len(texts) / elapsed,
+            "label_agreement": float((labels == reference[0]).mean()),
+            "mean_confidence_delta": float(confidence_delta.mean()),
+            "max_confidence_delta": float(confidence_delta.max())
+        }
+        result["within_threshold"] = result["label_agreement"] >= Config.PARITY_MIN_AGREEMENT
+        logger.info(
+            f"{backend}: {result['rows_per_sec']:.1f} rows/sec, "
+            f"label agreement {result['label_agreement']:.2%}, "
+            f"confidence delta mean {result['mean_confidence_delta']:.4f} max {result['max_confidence_delta']:.4f}"
+        )
+        results.append(result)
+
+    best = max((r for r in results if r["within_threshold"]), key=lambda r: r["rows_per_sec"])
+    logger.info(f"Fastest backend within {Config.PARITY_MIN_AGREEMENT:.2%} agreement: {best['backend']}")
+    return results, best["backend"]
+
+
+def check_cascade(sample_rows, thresholds=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8)):
+    """
+    Score a sample of Config.CSV_PATH with FinBERT and with TextBlob, and report for each cascade
+    threshold the share of texts escalated to FinBERT, label agreement with FinBERT alone and the
+    throughput the cascade would reach
+    """
+    analyzer = SentimentAnalyzer(load_model=True, connect_es=False)
+    texts = analyzer._filter_chunk(_read_sample(sample_rows), Counter())['text'].tolist()
+    if not texts:
+        raise ValueError(f"No usable rows in the first {sample_rows} rows of {Config.CSV_PATH}")
+
+    analyzer._warm_up(analyzer._encode(texts[:analyzer.batch_size], Counter()))
+    started = time.perf_counter()
+    finbert_labels, _ = analyzer._predict_encoded(analyzer._encode(texts, Counter()), Counter())
+    finbert_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    lexical_labels, lexical_scores, subjectivity = _lexical_scores(texts)
+    lexical_seconds = time.perf_counter() - started
+
+    finbert_labels = np.array(finbert_labels)
+    logger.info(f"FinBERT alone: {len(texts) / finbert_seconds:.1f} rows/sec, "
+                f"TextBlob alone: {len(texts) / lexical_seconds:.1f} rows/sec, "
+                f"agreement {(lexical_labels == finbert_labels).mean():.1%}")
+    results = []
+    for threshold in thresholds:
+        accept = _lexical_confident(lexical_labels, lexical_scores, subjectivity, threshold)
+        escalation_rate = 1 - accept.mean()
+        result = {
+            "threshold": threshold,
+            "escalation_rate": float(escalation_rate),
+            "agreement": float((np.where(accept, lexical_labels, finbert_labels) == finbert_labels).mean()),
+            "textblob_agreement": (float((lexical_labels[accept] == finbert_labels[accept]).mean())
+                                   if accept.any() else None),
+            # FinBERT time scales with the rows escalated to it
+            "rows_per_sec": float(len(texts) / (lexical_seconds + escalation_rate * finbert_seconds))
+        }
+        logger.info(
+            f"threshold {threshold:.2f}: {result['escalation_rate']:.1%} escalated, "
+            f"agreement with FinBERT {result['agreement']:.1%}, {result['rows_per_sec']:.1f} rows/sec"
+        )
+        results.append(result)
+    return results
+
 
 if __name__ == "__main__":
-    analyzer = SentimentAnalyzer()
-    analyzer.process_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Score tweets with FinBERT and index them into Elasticsearch")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only process rows appended since the last checkpoint")
+    parser.add_argument("--parity-check", type=int, metavar="ROWS",
+                        help="compare the inference backends against fp32 on ROWS sample rows and exit")
+    parser.add_argument("--to-parquet", metavar="PATH",
+                        help="convert Config.CSV_PATH to Parquet at PATH and exit")
+    parser.add_argument("--autotune", type=int, metavar="ROWS",
+                        help="calibrate threads, batch size and token budget on ROWS sample rows, "
+                             "save the host profile and exit")
+    parser.add_argument("--cascade-check", type=int, metavar="ROWS",
+                        help="compare the TextBlob -> FinBERT cascade against FinBERT alone on ROWS sample rows "
+                             "at several thresholds and exit")
+    args = parser.parse_args()
+
+    if args.to_parquet:
+        rows = csv_to_parquet(Config.CSV_PATH, args.to_parquet, Config.CHUNK_SIZE * 10,
+                              dtype=_csv_dtypes(), date_columns=[Config.DATE_COL])
+        logger.info(f"Wrote {rows} rows to {args.to_parquet}")
+    elif args.parity_check:
+        check_backend_parity(args.parity_check)
+    elif args.cascade_check:
+        check_cascade(args.cascade_check)
+    elif args.autotune:
+        SentimentAnalyzer(load_model=True, connect_es=False).autotune(args.autotune, recalibrate=True)
+    else:
+        analyzer = SentimentAnalyzer()
+        analyzer.process_data(incremental=True if args.incremental else None)
\ No newline at end of file
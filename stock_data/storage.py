@@ -0,0 +1,47 @@
+"""Atomic writes and tolerant reads for the local state and cache files"""
+import contextlib
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+@contextlib.contextmanager
+def atomic_write(path):
+    """
+    Yield a temporary path next to path and move it over path once the block succeeds, so readers
+    in other threads and processes see the old file or the new one, never a partial write
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_or_none(path, load, description, errors=Exception):
+    """load(path), or None when the file is missing or load raises one of errors, which is logged"""
+    try:
+        return load(path)
+    except FileNotFoundError:
+        return None
+    except errors as e:
+        logger.warning(f"Ignoring unreadable {description} {path}: {str(e)}")
+        return None
+
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_json(path, state, **kwargs):
+    """Atomically replace path with state as JSON"""
+    with atomic_write(path) as tmp_path:
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, **kwargs)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The stock_data modules import each other as top-level modules (from config import Config)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
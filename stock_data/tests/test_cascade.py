@@ -0,0 +1,57 @@
+"""Which texts the TextBlob stage of the cascade decides and which go on to FinBERT"""
+from collections import Counter
+import pandas as pd
+import pytest
+from config import Config
+from sentiment_pipeline import SENTIMENT_LABELS, SentimentAnalyzer
+
+POSITIVE = "apple earnings were excellent, a wonderful quarter"  # polarity 1.0
+NEGATIVE = "tesla had a terrible awful quarter"  # polarity -1.0
+ANNOUNCEMENT = "nvidia reports quarterly results on tuesday"  # polarity 0, subjectivity 0
+OPINION = "my personal view on google stock"  # polarity 0, subjectivity 0.3
+WEAK = "microsoft shares fell sharply"  # polarity -0.125
+TEXTS = [POSITIVE, NEGATIVE, ANNOUNCEMENT, OPINION, WEAK, POSITIVE]
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.setattr(Config, "CASCADE", True)
+    monkeypatch.setattr(Config, "CASCADE_THRESHOLD", 0.5)
+    monkeypatch.setattr(Config, "CASCADE_NEUTRAL_MAX_SUBJECTIVITY", 0.1)
+    monkeypatch.setattr(Config, "CASCADE_AUDIT_RATE", 0.0)
+    return SentimentAnalyzer(load_model=False, connect_es=False)
+
+
+def _labels(*names):
+    return [SENTIMENT_LABELS.index(name) for name in names]
+
+
+def test_confident_and_opinion_free_texts_skip_the_model(analyzer):
+    stats = Counter()
+    lookup = analyzer._lookup(pd.Series(TEXTS), stats)
+
+    # A neutral label only stands when the text carries no opinion
+    assert lookup.miss_texts == [OPINION, WEAK]
+    assert (stats["cascade_texts"], stats["cascade_escalated"]) == (5, 2)
+
+    labels, confidence, fields = analyzer._resolve(lookup, _labels("positive", "negative"), [0.7, 0.95], stats)
+    assert labels == _labels("positive", "negative", "neutral", "positive", "negative", "positive")
+    assert fields["stage"] == ["textblob", "textblob", "textblob", "finbert", "finbert", "textblob"]
+    # Confidence holds FinBERT probabilities only, the TextBlob score has its own field
+    assert confidence == pytest.approx([None, None, None, 0.7, 0.95, None])
+    assert fields["lexical_score"] == [1.0, 1.0, 0.0, None, None, 1.0]
+    assert stats["cascade_textblob_rows"] == 4
+
+
+def test_audited_texts_are_scored_by_both(analyzer, monkeypatch):
+    monkeypatch.setattr(Config, "CASCADE_AUDIT_RATE", 1.0)
+    stats = Counter()
+    lookup = analyzer._lookup(pd.Series(TEXTS), stats)
+    assert lookup.miss_texts == [POSITIVE, NEGATIVE, ANNOUNCEMENT, OPINION, WEAK]
+
+    # FinBERT disagrees on the announcement
+    finbert = _labels("positive", "negative", "positive", "neutral", "negative")
+    labels, _, fields = analyzer._resolve(lookup, finbert, [0.9] * 5, stats)
+    assert fields["stage"] == ["finbert"] * 6
+    assert labels == finbert + finbert[:1]
+    assert (stats["cascade_audited"], stats["cascade_audit_agreed"]) == (3, 2)
@@ -0,0 +1,85 @@
+"""The pyarrow and pandas CSV engines, and the Parquet/Arrow reader, feeding the same documents"""
+from collections import Counter
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+import pytest
+from chunk_readers import iter_arrow_chunks
+from config import Config
+from sentiment_pipeline import SentimentAnalyzer
+
+CSV = (
+    "twitter_id,created_at,text,group_name,screenname,followers,retweet_count,location\n"
+    "1478000000000000001,2022-01-03 10:00:00+05:00,apple beats estimates,Apple,a,10,1,Lagos\n"
+    "1478000000000000002,2022-01-03 11:30:15+05:00,tesla misses,Tesla,b,,2,\n"
+    "1478000000000000003,2022-01-03 12:00:00+05:00,unmapped group,Nokia,c,5,0,Oslo\n"
+    ",2022-01-03 13:00:00+05:00,\"no id, quoted\",Nvidia,d,7,,Paris\n"
+)
+
+
+def _documents(analyzer):
+    """Encoded documents of every chunk the configured reader yields"""
+    documents = []
+    for chunk, _ in analyzer._iter_chunks(Counter()):
+        chunk = analyzer._filter_chunk(chunk, Counter())
+        documents += analyzer._encode_documents(chunk, [0] * len(chunk), [0.5] * len(chunk))
+    return documents
+
+
+@pytest.mark.parametrize("dates", [
+    ["2022-01-03 10:00:00+05:00", "2022-01-03 11:30:15+05:00"],
+    ["2022-01-03 10:00:00", "2022-01-03 11:30:15"]
+])
+def test_engines_build_the_same_documents(tmp_path, monkeypatch, dates):
+    path = tmp_path / "tweets.csv"
+    path.write_text(CSV.replace("2022-01-03 10:00:00+05:00", dates[0])
+                    .replace("2022-01-03 11:30:15+05:00", dates[1]))
+    monkeypatch.setattr(Config, "CSV_PATH", str(path))
+    monkeypatch.setattr(Config, "INPUT_FORMAT", "csv")
+    monkeypatch.setattr(Config, "CHUNK_SIZE", 2)
+    analyzer = SentimentAnalyzer(load_model=False, connect_es=False)
+
+    monkeypatch.setattr(Config, "CSV_ENGINE", "pandas")
+    expected = _documents(analyzer)
+    monkeypatch.setattr(Config, "CSV_ENGINE", "pyarrow")
+    assert _documents(analyzer) == expected
+
+    # The wall-clock time of the input is kept, its offset dropped
+    assert [b'"created_at":"2022-01-03T10:00:00"' in source for _, source in expected] == [True, False, False]
+    assert b'"created_at":"2022-01-03T11:30:15"' in expected[1][1]
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_arrow_reader_projects_and_filters(tmp_path, file_format):
+    groups = ["Apple", "Nokia", "Tesla", "Nokia", "Apple", "Sony", "Tesla"]
+    table = pa.table({
+        "twitter_id": pa.array([1, 2, 3, 4, 5, 6, None], pa.int64()),
+        "text": [f"tweet {i}" for i in range(7)],
+        "group_name": groups,
+        "location": ["Lagos", None, "Oslo", "Paris", "Lagos", "Rome", None],
+        "unused": [0.5] * 7
+    })
+    path = str(tmp_path / f"tweets.{file_format}")
+    if file_format == "parquet":
+        pq.write_table(table, path, row_group_size=3)
+    else:
+        feather.write_feather(table, path)
+    filtered = []
+
+    chunks = list(iter_arrow_chunks(path, 2, ["twitter_id", "text", "group_name", "location", "missing"], file_format,
+                                    filter_column="group_name", filter_values=["Apple", "Tesla"],
+                                    categorical_columns=["group_name", "location"], on_filtered=filtered.append))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2]
+    rows = pd.concat(chunks, ignore_index=True)
+    assert list(rows.columns) == ["twitter_id", "text", "group_name", "location"]
+    assert rows["text"].tolist() == ["tweet 0", "tweet 2", "tweet 4", "tweet 6"]
+    assert rows["twitter_id"].tolist() == [1, 3, 5, pd.NA]
+    assert filtered == [3]
+    assert str(rows["twitter_id"].dtype) == "Int64"
+    assert isinstance(rows["text"].dtype, pd.StringDtype)
+    for chunk in chunks:
+        assert isinstance(chunk["group_name"].dtype, pd.CategoricalDtype)
+        assert isinstance(chunk["location"].dtype, pd.CategoricalDtype)
+    assert rows["location"].astype(object).tolist()[:3] == ["Lagos", "Oslo", "Lagos"]
@@ -0,0 +1,55 @@
+"""Documents and ids built column-wise from a scored chunk, against values worked out by hand"""
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+from sentiment_pipeline import SentimentAnalyzer
+
+
+def _sha1(*parts):
+    return hashlib.sha1("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def test_documents_and_ids():
+    chunk = pd.DataFrame({
+        "twitter_id": pd.array(["9007199254740993", None, "17"], dtype="string"),
+        "created_at": pd.to_datetime(["2022-01-03 10:00:00", "2022-01-03 11:30:15.250000", "2022-01-04 00:00:00"],
+                                     format="ISO8601").tz_localize("UTC+05:00"),
+        "text": ["apple beats", "google slips", "who knows"],
+        "group_name": pd.Categorical(["Apple", "Youtube", "Nokia"]),
+        "screenname": ["a", None, "c"],
+        "followers": pd.array([10, None, 2 ** 62], dtype="Int64"),
+        "retweet_count": [3.7, np.nan, 0.0],
+        "location": ["Lagos", np.nan, "Oslo"],
+        "polarity": [0.5, np.nan, -0.25]
+    })
+    # username, friends, search_query and the partitions are absent and left out of the documents
+    analyzer = SentimentAnalyzer(load_model=False, connect_es=False)
+    encoded = analyzer._encode_documents(chunk, [0, 1, 2], [0.9, 0.8, 0.7], {"cluster_id": ["x", "y", "z"]})
+
+    assert [json.loads(source) for _, source in encoded] == [
+        {
+            "metadata": {"ticker": "AAPL", "user": {"screenname": "a", "username": None, "followers": 10},
+                         "location": "Lagos", "retweet_count": 3},
+            "text": "apple beats", "sentiment": "positive", "confidence": 0.9, "cluster_id": "x",
+            "created_at": "2022-01-03T10:00:00", "model_metrics": {"polarity": 0.5}
+        },
+        {
+            # Missing counts are left out, other missing values are null
+            "metadata": {"ticker": "GOOGL", "user": {"screenname": None, "username": None}, "location": None},
+            "text": "google slips", "sentiment": "negative", "confidence": 0.8, "cluster_id": "y",
+            "created_at": "2022-01-03T11:30:15.250000", "model_metrics": {"polarity": None}
+        },
+        {
+            "metadata": {"ticker": "UNKNOWN", "user": {"screenname": "c", "username": None, "followers": 2 ** 62},
+                         "location": "Oslo", "retweet_count": 0},
+            "text": "who knows", "sentiment": "neutral", "confidence": 0.7, "cluster_id": "z",
+            "created_at": "2022-01-04T00:00:00", "model_metrics": {"polarity": -0.25}
+        }
+    ]
+    # Ids come from the raw twitter_id text, a float would round 2**53 + 1; rows without one hash their content
+    assert [doc_id for doc_id, _ in encoded] == [
+        _sha1("ProsusAI/finbert", "AAPL", "9007199254740993"),
+        _sha1("ProsusAI/finbert", "GOOGL", "2022-01-03T11:30:15.250000", "None", "google slips"),
+        _sha1("ProsusAI/finbert", "UNKNOWN", "17")
+    ]
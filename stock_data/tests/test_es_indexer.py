@@ -0,0 +1,95 @@
+"""BulkIndexer retries, dead-lettering and the deterministic document ids it is fed"""
+import json
+import threading
+import pandas as pd
+from elasticsearch import Elasticsearch
+from elastic_transport import ApiResponseMeta, HttpHeaders, NodeConfig, ObjectApiResponse
+from config import Config
+from es_indexer import BulkIndexer
+from sentiment_pipeline import SentimentAnalyzer
+
+
+class StubElasticsearch(Elasticsearch):
+    """Answers _bulk in process, rejecting each id with 429 as often as rejections says, and keeps the last source per id"""
+
+    def __init__(self, rejections=None):
+        super().__init__("http://stub:9200")
+        self.rejections = dict(rejections or {})
+        self.stored = {}
+        self.attempts = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def options(self, **kwargs):
+        return self
+
+    def bulk(self, *, operations, **kwargs):
+        items = []
+        with self.lock:
+            self.requests += 1
+            for action, source in zip(operations[::2], operations[1::2]):
+                doc_id = json.loads(action)["index"]["_id"]
+                self.attempts[doc_id] = self.attempts.get(doc_id, 0) + 1
+                if self.rejections.get(doc_id, 0) >= self.attempts[doc_id]:
+                    items.append({"index": {"_id": doc_id, "status": 429,
+                                            "error": {"type": "es_rejected_execution_exception"}}})
+                else:
+                    self.stored[doc_id] = json.loads(source)
+                    items.append({"index": {"_id": doc_id, "status": 201, "result": "created"}})
+        meta = ApiResponseMeta(200, "1.1", HttpHeaders(), 0.0, NodeConfig("http", "stub", 9200))
+        return ObjectApiResponse(body={"took": 1, "errors": False, "items": items}, meta=meta)
+
+
+def _indexer(es, dead_letter_path, max_retries=2):
+    return BulkIndexer(es, "stock-sentiment", thread_count=2, chunk_size=2, max_retries=max_retries,
+                       initial_backoff=0, max_backoff=0, dead_letter_path=str(dead_letter_path))
+
+
+def _documents(n=5):
+    return [(f"id-{i}", json.dumps({"text": f"tweet {i}"}).encode("utf-8")) for i in range(n)]
+
+
+def test_rejected_documents_are_retried(tmp_path):
+    es = StubElasticsearch({"id-1": 1, "id-3": 2})
+    indexed, dead = _indexer(es, tmp_path / "dead.ndjson").index_documents(_documents())
+
+    assert (indexed, dead) == (5, 0)
+    assert es.attempts == {"id-0": 1, "id-1": 2, "id-2": 1, "id-3": 3, "id-4": 1}
+    assert sorted(es.stored) == [f"id-{i}" for i in range(5)]
+    assert not (tmp_path / "dead.ndjson").exists()
+
+
+def test_exhausted_retries_are_dead_lettered(tmp_path):
+    dead_letter_path = tmp_path / "dead.ndjson"
+    es = StubElasticsearch({"id-2": 10})
+    indexed, dead = _indexer(es, dead_letter_path, max_retries=2).index_documents(_documents())
+
+    assert (indexed, dead) == (4, 1)
+    assert es.attempts["id-2"] == 3
+    lines = [json.loads(line) for line in dead_letter_path.read_text().splitlines()]
+    assert lines == [{"_index": "stock-sentiment", "_id": "id-2", "status": 429,
+                      "error": "retries exhausted", "source": {"text": "tweet 2"}}]
+
+
+def test_rerun_overwrites_instead_of_duplicating(tmp_path):
+    chunk = pd.DataFrame({
+        "group_name": ["Apple", "Google", "Youtube", "Tesla"],
+        "text": ["same tweet", "same tweet", "same tweet", "no id"],
+        Config.ID_COL: pd.array(["1234567890123456789", "1234567890123456789", "1234567890123456789", None],
+                                dtype="string"),
+        Config.DATE_COL: pd.to_datetime(["2026-01-05 14:00"] * 4)
+    })
+    analyzer = SentimentAnalyzer(load_model=False, connect_es=False)
+    first = analyzer._encode_documents(chunk, [0, 0, 0, 2], [0.9, 0.9, 0.9, 0.8])
+    second = analyzer._encode_documents(chunk, [0, 0, 0, 2], [0.9, 0.9, 0.9, 0.8])
+
+    ids = [doc_id for doc_id, _ in first]
+    assert ids == [doc_id for doc_id, _ in second]
+    # One document per ticker: Google and Youtube both map to GOOGL
+    assert len(set(ids)) == 3 and ids[1] == ids[2]
+
+    es = StubElasticsearch()
+    indexer = _indexer(es, tmp_path / "dead.ndjson")
+    indexer.index_documents(first)
+    indexer.index_documents(second)
+    assert sorted(es.stored) == sorted(set(ids))
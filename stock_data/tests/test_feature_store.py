@@ -0,0 +1,65 @@
+"""FeatureStore.update must give the same table as computing every stored hour at once"""
+import numpy as np
+import pandas as pd
+import pytest
+from feature_store import INPUT_COLUMNS, FeatureStore, compute_features
+
+
+def _hourly_inputs(days=30):
+    rng = np.random.default_rng(1)
+    hours = pd.DatetimeIndex([
+        hour for day in pd.bdate_range("2026-01-05", periods=days, tz="UTC")
+        for hour in pd.date_range(day + pd.Timedelta(hours=14), periods=7, freq="h")
+    ])
+    return pd.DataFrame({
+        "sentiment_confidence": rng.uniform(0.5, 1, len(hours)),
+        "social_impact": rng.uniform(1, 50, len(hours)),
+        "Close": 100 + rng.normal(0, 1, len(hours)).cumsum(),
+        "Volume": rng.integers(1000, 9000, len(hours))
+    }, index=hours)
+
+
+def _assert_matches_full(table, inputs, horizon):
+    pd.testing.assert_frame_equal(table, compute_features(inputs[INPUT_COLUMNS], horizon),
+                                  check_freq=False, check_dtype=False)
+
+
+@pytest.mark.parametrize("horizon", [1, 3])
+def test_incremental_updates_match_full_recompute(tmp_path, horizon):
+    inputs = _hourly_inputs()
+    store = FeatureStore(str(tmp_path), horizon, retention_days=90)
+
+    store.update("T", inputs[:100])
+    # Same hours again, then a later window that dropped the oldest hours and added new ones
+    store.update("T", inputs[:100])
+    table = store.update("T", inputs[10:130])
+    _assert_matches_full(table, inputs[:130], horizon)
+
+    # A revised bar in the window is recomputed along with the rows that look back or ahead at it
+    inputs.iloc[120, inputs.columns.get_loc("Close")] += 1.0
+    table = store.update("T", inputs[20:150])
+    _assert_matches_full(table, inputs[:150], horizon)
+
+    inputs.iloc[60, inputs.columns.get_loc("sentiment_confidence")] = 0.1
+    table = store.update("T", inputs[30:160])
+    _assert_matches_full(table, inputs[:160], horizon)
+
+    # What was saved is what update returned
+    pd.testing.assert_frame_equal(store.read("T"), table, check_freq=False)
+
+
+def test_retention_drops_old_hours(tmp_path):
+    inputs = _hourly_inputs(days=40)
+    store = FeatureStore(str(tmp_path), 1, retention_days=10)
+    table = store.update("T", inputs)
+
+    assert table.index.min() >= inputs.index.max() - pd.Timedelta(days=10)
+    assert table.index.max() == inputs.index.max()
+
+
+def test_without_directory_nothing_is_stored():
+    inputs = _hourly_inputs()
+    store = FeatureStore(None, 1, retention_days=90)
+
+    _assert_matches_full(store.update("T", inputs), inputs, 1)
+    assert store.read("T") is None
@@ -0,0 +1,75 @@
+"""Record splitting of iter_csv_chunks and resuming through IngestCheckpoint"""
+from checkpoint import IngestCheckpoint
+from chunk_readers import iter_csv_chunks
+
+HEADER = b"twitter_id,text\n"
+ROWS = [
+    b"1,plain tweet\n",
+    b'2,"quoted, with a comma"\n',
+    b'3,"spans\ntwo lines with ""quotes"""\n',
+    b"4,last complete\n",
+]
+
+
+def _write(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+
+def _read(path, chunksize=2, start_offset=0):
+    chunks = list(iter_csv_chunks(path, chunksize, start_offset, dtype={"twitter_id": "string"}))
+    rows = [row for chunk, _ in chunks for row in chunk.itertuples(index=False)]
+    return rows, [offset for _, offset in chunks]
+
+
+def test_quoted_multiline_record_is_one_row(tmp_path):
+    path = _write(tmp_path / "t.csv", HEADER + b"".join(ROWS))
+    rows, offsets = _read(path)
+
+    assert [row.twitter_id for row in rows] == ["1", "2", "3", "4"]
+    assert rows[2].text == 'spans\ntwo lines with "quotes"'
+    # Chunks end on record boundaries
+    assert offsets == [len(HEADER) + len(ROWS[0]) + len(ROWS[1]), len(HEADER) + sum(map(len, ROWS))]
+
+
+def test_dangling_record_is_left_for_the_next_run(tmp_path):
+    complete = HEADER + b"".join(ROWS)
+    for dangling in [b"5,no newline yet", b'5,"open quote\nstill being written\n']:
+        path = _write(tmp_path / "t.csv", complete + dangling)
+        rows, offsets = _read(path, chunksize=10)
+
+        assert [row.twitter_id for row in rows] == ["1", "2", "3", "4"]
+        assert offsets[-1] == len(complete)
+
+
+def test_resume_from_saved_offset(tmp_path):
+    path = _write(tmp_path / "t.csv", HEADER + b"".join(ROWS) + b"5,partial")
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    _, offsets = _read(path, chunksize=10)
+    IngestCheckpoint(checkpoint_path, path).save(offsets[-1], last_twitter_id="4")
+
+    # The partial record is completed and another one appended
+    with open(path, "ab") as f:
+        f.write(b" now\n6,appended\n")
+    start_offset = IngestCheckpoint(checkpoint_path, path).start_offset()
+    rows, _ = _read(path, start_offset=start_offset)
+
+    assert start_offset == offsets[-1]
+    assert [(row.twitter_id, row.text) for row in rows] == [("5", "partial now"), ("6", "appended")]
+
+
+def test_truncated_or_replaced_file_starts_over(tmp_path):
+    data = HEADER + b"".join(ROWS)
+    path = _write(tmp_path / "t.csv", data)
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    IngestCheckpoint(checkpoint_path, path).save(len(data))
+
+    _write(tmp_path / "t.csv", data[:-len(ROWS[-1])])
+    assert IngestCheckpoint(checkpoint_path, path).start_offset() == 0
+
+    # Same size, different content before the watermark
+    _write(tmp_path / "t.csv", data.replace(b"plain tweet", b"other tweet"))
+    assert IngestCheckpoint(checkpoint_path, path).start_offset() == 0
+
+    _write(tmp_path / "t.csv", data + b"5,appended\n")
+    assert IngestCheckpoint(checkpoint_path, path).start_offset() == len(data)
@@ -0,0 +1,61 @@
+"""MarketDataCache read through FileProvider: cache hits and incremental downloads"""
+import numpy as np
+import pandas as pd
+from market_data import COLUMNS, FileProvider, MarketDataCache
+
+
+class RecordingProvider(FileProvider):
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.ranges = []
+
+    def download(self, tickers, start, end, interval):
+        self.ranges.append((sorted(tickers), pd.Timestamp(start), pd.Timestamp(end)))
+        return super().download(tickers, start, end, interval)
+
+
+def _write_bars(directory, ticker, days=30):
+    dates = pd.bdate_range("2026-01-05", periods=days)
+    rng = np.random.default_rng(2)
+    bars = pd.DataFrame(rng.uniform(90, 110, (len(dates), len(COLUMNS))), index=dates.rename("Date"), columns=COLUMNS)
+    (directory / "1d").mkdir(parents=True, exist_ok=True)
+    bars.to_csv(directory / "1d" / f"{ticker}.csv")
+    return bars
+
+
+def _day(date):
+    return pd.Timestamp(date, tz="UTC")
+
+
+def test_second_read_is_served_from_the_cache(tmp_path):
+    bars = _write_bars(tmp_path / "source", "AAPL")
+    provider = RecordingProvider(str(tmp_path / "source"))
+    cache = MarketDataCache(str(tmp_path / "cache"), provider)
+
+    first = cache.get(["AAPL", "NONE"], "2026-01-05", "2026-01-19")["AAPL"]
+    assert list(first.index) == [_day(date) for date in bars.index if date < pd.Timestamp("2026-01-19")]
+    np.testing.assert_allclose(first.to_numpy(), bars.loc[:"2026-01-16"].to_numpy())
+
+    # A fresh cache object on the same directory reads the Parquet files, not the provider
+    second = MarketDataCache(str(tmp_path / "cache"), provider).get(["AAPL"], "2026-01-07", "2026-01-19")["AAPL"]
+    assert provider.calls == 1
+    pd.testing.assert_frame_equal(second, first[first.index >= _day("2026-01-07")])
+
+
+def test_only_missing_days_are_downloaded(tmp_path):
+    bars = _write_bars(tmp_path / "source", "AAPL")
+    provider = RecordingProvider(str(tmp_path / "source"))
+    cache = MarketDataCache(str(tmp_path / "cache"), provider)
+
+    cache.get(["AAPL"], "2026-01-12", "2026-01-19")
+    extended = cache.get(["AAPL"], "2026-01-05", "2026-01-28")["AAPL"]
+
+    assert provider.ranges[1:] == [
+        # Days before the cached range, then from the last cached bar on
+        (["AAPL"], _day("2026-01-05"), _day("2026-01-12")),
+        (["AAPL"], _day("2026-01-16"), _day("2026-01-28"))
+    ]
+    assert list(extended.index) == [_day(date) for date in bars.loc[:"2026-01-27"].index]
+
+    cache.get(["AAPL"], "2026-01-05", "2026-01-28")
+    assert provider.calls == 3
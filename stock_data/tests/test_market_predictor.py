@@ -0,0 +1,35 @@
+"""Per-ticker seconds of the concurrent predictor run, which leave out the wait for a thread or worker"""
+import time
+import pandas as pd
+import pytest
+import market_predictor
+from config import Config
+from market_predictor import MarketPredictor
+
+
+def test_ticker_seconds_leave_out_queueing(monkeypatch):
+    monkeypatch.setattr(Config, "PREDICTOR_PREPARE_THREADS", 1)
+    monkeypatch.setattr(Config, "PREDICTOR_WORKERS", 1)
+    recorded = {}
+    monkeypatch.setattr(market_predictor, "_record", lambda ticker, seconds, outcome: recorded.update(
+        {ticker: (outcome, seconds)}))
+    monkeypatch.setattr(market_predictor, "_fit_predict", lambda *args: (1.0, "full", 0.0))
+
+    def prepare(ticker, social, market):
+        # One thread prepares the tickers in turn, each taking 0.1s
+        time.sleep(0.1)
+        if ticker == "NONE":
+            raise ValueError("No social data for NONE")
+        return pd.DataFrame({"a": [1.0]}), pd.Series([1.0])
+
+    predictor = MarketPredictor.__new__(MarketPredictor)
+    predictor.model_store = None
+    monkeypatch.setattr(predictor, "_prepare_data", prepare)
+    monkeypatch.setattr(predictor, "_finish_ticker", lambda ticker, result: "predicted")
+    predictor._run_concurrent(["AAPL", "TSLA", "NONE", "NVDA"], None, None)
+
+    assert {ticker: outcome for ticker, (outcome, _) in recorded.items()} == \
+        {"AAPL": "predicted", "TSLA": "predicted", "NONE": "skipped", "NVDA": "predicted"}
+    # NVDA waited 0.3s for the thread, which it is not charged for
+    for _, seconds in recorded.values():
+        assert seconds == pytest.approx(0.1, abs=0.08)
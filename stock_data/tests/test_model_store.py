@@ -0,0 +1,74 @@
+"""ModelStore artifacts and the refit mode _fit_predict picks from them"""
+import numpy as np
+import pandas as pd
+from market_predictor import _fit_predict
+from model_store import ModelStore, feature_schema, fingerprint, row_hashes
+
+
+def _training_rows(rows=200):
+    rng = np.random.default_rng(3)
+    hours = pd.date_range("2026-01-05 14:00", periods=rows, freq="h", tz="UTC")
+    features = pd.DataFrame(rng.normal(size=(rows, 3)), index=hours, columns=["a", "b", "c"])
+    targets = pd.Series(features["a"] * 0.5 + rng.normal(0, 0.1, rows), index=hours)
+    return features, targets
+
+
+def _store(directory, max_iterations=300):
+    return ModelStore(str(directory), warm_start_iterations=20, max_iterations=max_iterations)
+
+
+def test_saved_model_is_loaded_and_reused(tmp_path):
+    features, targets = _training_rows()
+    store = _store(tmp_path)
+
+    prediction, mode, _ = _fit_predict("T", features, targets, store)
+    assert mode == "full"
+    artifact = store.load("T")
+    assert artifact.fingerprint == fingerprint(feature_schema(features), row_hashes(features, targets))
+    assert artifact.model.predict(features.iloc[-1:])[-1] == prediction
+
+    # A new store object on the same directory reuses the model
+    assert _fit_predict("T", features, targets, _store(tmp_path))[:2] == (prediction, "unchanged")
+
+
+def test_new_rows_add_a_stage(tmp_path):
+    features, targets = _training_rows()
+    store = _store(tmp_path)
+    _fit_predict("T", features[:150], targets[:150], store)
+
+    # The oldest rows fell out of the lookback and newer ones arrived
+    _, mode, _ = _fit_predict("T", features[10:], targets[10:], store)
+    model = store.load("T").model
+    assert mode == "warm_start"
+    assert len(model.stages) == 2 and model.iterations == 120
+
+    # A revised row the model was trained on needs a full fit
+    targets.iloc[100] += 1
+    assert _fit_predict("T", features[10:], targets[10:], store)[1] == "full"
+    assert len(store.load("T").model.stages) == 1
+
+
+def test_warm_start_beyond_max_iterations_retrains(tmp_path):
+    features, targets = _training_rows()
+    store = _store(tmp_path, max_iterations=110)
+    _fit_predict("T", features[:150], targets[:150], store)
+
+    assert _fit_predict("T", features, targets, store)[1] == "full"
+
+
+def test_unreadable_or_outdated_artifact_falls_back_to_a_full_fit(tmp_path):
+    features, targets = _training_rows()
+    store = _store(tmp_path)
+    _fit_predict("T", features, targets, store)
+
+    artifact = store.load("T")
+    artifact.version -= 1
+    store.save("T", artifact)
+    assert store.load("T") is None
+    assert _fit_predict("T", features, targets, store)[1] == "full"
+
+    (tmp_path / "T.joblib").write_bytes(b"not a joblib file")
+    assert store.load("T") is None
+    assert _fit_predict("T", features, targets, store)[1] == "full"
+    # The full fit replaced the corrupt artifact
+    assert store.load("T") is not None
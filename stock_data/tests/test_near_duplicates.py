@@ -0,0 +1,86 @@
+"""Near-duplicate clusters, matches against the window and the labels they pass on"""
+from collections import Counter
+import numpy as np
+import pandas as pd
+import pytest
+from config import Config
+from near_duplicates import NearDuplicateIndex
+from sentiment_pipeline import SentimentAnalyzer
+
+APPLE = "apple shares jump after record iphone sales in china this quarter, analysts raise targets"
+TESLA = "tesla recalls thousands of model y cars over a steering defect found by regulators"
+CHUNK = [APPLE, f"RT {APPLE}", APPLE.replace("jump", "jumps"), TESLA, f"{TESLA} wow", "netflix adds subscribers"]
+
+
+def _index():
+    return NearDuplicateIndex(threshold=0.8, num_perm=64, window_chunks=2)
+
+
+def test_variants_join_the_first_text_cluster():
+    clusters = _index().cluster(CHUNK)
+
+    assert clusters.codes.tolist() == [0, 0, 0, 1, 1, 2]
+    assert clusters.texts == [APPLE, TESLA, "netflix adds subscribers"]
+    assert clusters.window_matches == [None, None, None]
+
+
+def test_later_chunks_match_remembered_clusters():
+    index = _index()
+    clusters = index.cluster(CHUNK)
+    index.remember(clusters, np.array([0, 1, 2]), np.array([0.9, 0.8, 0.7]), np.zeros(3, dtype=np.int8))
+
+    later = index.cluster([f"RT RT {APPLE}", "a tweet about something else entirely"])
+    apple, other = later.window_matches
+    assert (apple.label, apple.confidence, apple.cluster_id) == (0, 0.9, clusters.cluster_ids[0])
+    assert later.cluster_ids[0] == clusters.cluster_ids[0]
+    assert other is None
+
+
+def test_scores_propagate_to_duplicates():
+    analyzer = SentimentAnalyzer(load_model=False, connect_es=False)
+    analyzer.near_duplicates = _index()
+    stats = Counter()
+
+    # Only cluster representatives are left for the model
+    lookup = analyzer._lookup(pd.Series(CHUNK), stats)
+    assert lookup.miss_texts == [APPLE, TESLA, "netflix adds subscribers"]
+    labels, confidence, fields = analyzer._resolve(lookup, [0, 1, 2], [0.9, 0.8, 0.7], stats)
+    assert labels == [0, 0, 0, 1, 1, 2]
+    assert confidence == pytest.approx([0.9, 0.9, 0.9, 0.8, 0.8, 0.7])
+    cluster_ids = fields["cluster_id"]
+    assert len(set(cluster_ids)) == 3 and cluster_ids[0] == cluster_ids[2]
+
+    # A later copy is labeled from the window without reaching the model
+    lookup = analyzer._lookup(pd.Series([f"RT {TESLA}", f"RT {TESLA}"]), stats)
+    assert lookup.miss_texts == []
+    labels, confidence, fields = analyzer._resolve(lookup, [], [], stats)
+    assert labels == [1, 1]
+    assert fields["cluster_id"] == [cluster_ids[3], cluster_ids[3]]
+    assert stats["near_duplicate_window_hits"] == 1
+
+
+def test_pipelined_lookups_pick_up_clusters_remembered_meanwhile():
+    analyzer = SentimentAnalyzer(load_model=False, connect_es=False)
+    analyzer.near_duplicates = _index()
+    stats = Counter()
+
+    current = analyzer._lookup(pd.Series(CHUNK), stats)
+    upcoming = analyzer._lookup(pd.Series([f"RT {TESLA}", "something new"]), stats)
+    _, _, fields = analyzer._resolve(current, [0, 1, 2], [0.9, 0.8, 0.7], stats)
+
+    encodings = analyzer._recheck(upcoming, [[1], [2]], stats)
+    assert (upcoming.miss_texts, encodings) == (["something new"], [[2]])
+    labels, _, upcoming_fields = analyzer._resolve(upcoming, [2], [0.6], stats)
+    assert labels == [1, 2]
+    assert upcoming_fields["cluster_id"][0] == fields["cluster_id"][3]
+
+
+def test_window_is_off_with_several_workers(monkeypatch):
+    monkeypatch.setattr(Config, "NEAR_DUPLICATES", True)
+    monkeypatch.setattr(Config, "NUM_WORKERS", 2)
+    analyzer = SentimentAnalyzer(load_model=False, connect_es=False)
+    stats = Counter()
+
+    analyzer._resolve(analyzer._lookup(pd.Series(CHUNK), stats), [0, 1, 2], [0.9, 0.8, 0.7], stats)
+    lookup = analyzer._lookup(pd.Series([f"RT {TESLA}"]), stats)
+    assert lookup.miss_texts == [f"RT {TESLA}"]
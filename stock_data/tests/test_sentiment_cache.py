@@ -0,0 +1,66 @@
+"""SentimentCache hits, least-recently-used eviction at max_entries and lookups made ahead of scoring"""
+import itertools
+import types
+from collections import Counter
+import pandas as pd
+import pytest
+import sentiment_cache
+from sentiment_cache import SentimentCache
+from sentiment_pipeline import SentimentAnalyzer
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A clock that ticks once per call, so every write and hit has its own last_used"""
+    ticks = itertools.count(1)
+    monkeypatch.setattr(sentiment_cache, "time", types.SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+def _entries(names):
+    return [(name, i % 3, 0.5 + i / 100) for i, name in enumerate(names)]
+
+
+def test_hits_return_the_stored_scores(tmp_path, clock):
+    cache = SentimentCache(str(tmp_path / "cache.sqlite3"), "finbert", max_entries=100)
+    cache.put_many(_entries(["a", "b", "c"]))
+
+    assert cache.get_many(["a", "c", "missing"]) == {"a": (0, 0.5), "c": (2, 0.52)}
+    # Predictions are per model
+    assert SentimentCache(str(tmp_path / "cache.sqlite3"), "finbert@int8", max_entries=100).get_many(["a"]) == {}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SentimentCache(path, "finbert", max_entries=10)
+    names = [f"text {i}" for i in range(10)]
+    for name in names:
+        cache.put_many(_entries([name]))
+    assert cache.rows == 10
+
+    # Hits make the oldest entries recent again
+    cache.get_many(names[:2])
+    cache.put_many(_entries(["new"]))
+
+    # Trimmed to 90% of max_entries: the two least recently used are gone
+    assert cache.rows == 9
+    assert set(cache.get_many(names + ["new"])) == set(names[:2] + names[4:] + ["new"])
+    # The running count survives reopening
+    assert SentimentCache(path, "finbert", max_entries=10).rows == 9
+
+
+def test_pipelined_lookups_pick_up_predictions_cached_meanwhile(tmp_path, clock):
+    analyzer = SentimentAnalyzer(load_model=False, connect_es=False)
+    analyzer.cache = SentimentCache(str(tmp_path / "cache.sqlite3"), "finbert", max_entries=100)
+    stats = Counter()
+
+    # The next chunk is looked up before the current one is scored, as the prepare stage does
+    current = analyzer._lookup(pd.Series(["a", "b"]), stats)
+    upcoming = analyzer._lookup(pd.Series(["b", "c", "a"]), stats)
+    analyzer._resolve(current, [0, 1], [0.9, 0.8], stats)
+
+    encodings = analyzer._recheck(upcoming, [[1], [2], [3]], stats)
+    assert (upcoming.miss_texts, encodings) == (["c"], [[2]])
+    labels, confidence, _ = analyzer._resolve(upcoming, [2], [0.7], stats)
+    assert labels == [1, 2, 0]
+    assert confidence == pytest.approx([0.8, 0.7, 0.9])
+    assert (stats["cache_hits"], stats["cache_misses"]) == (2, 3)
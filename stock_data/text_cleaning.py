@@ -0,0 +1,78 @@
+"""
+Tweet text cleaning shared by the ingestion scripts.
+
+Patterns are compiled once at import. URLs are removed first, anywhere in the text, so a URL glued
+to a hashtag or mention is removed whole as before; hashtags, mentions and emojis are then removed
+in one combined pass.
+"""
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+_EMOJI_RANGES = (
+    "\U0001F600-\U0001F64F"  # emoticons
+    "\U0001F300-\U0001F5FF"  # symbols & pictographs
+    "\U0001F680-\U0001F6FF"  # transport & map symbols
+    "\U0001F700-\U0001F77F"  # alchemical symbols
+    "\U0001F780-\U0001F7FF"  # Geometric Shapes Extended
+    "\U0001F800-\U0001F8FF"  # Supplemental Arrows-C
+    "\U0001F900-\U0001F9FF"  # Supplemental Symbols and Pictographs
+    "\U0001FA00-\U0001FA6F"  # Chess Symbols
+    "\U0001FA70-\U0001FAFF"  # Symbols and Pictographs Extended-A
+    "\U00002702-\U000027B0"  # Dingbats
+    "\U000024C2-\U0001F251"
+)
+
+URL_PATTERN = re.compile(r"http\S+|www\S+")
+TAG_EMOJI_PATTERN = re.compile(r"#\w+|@\w+|[" + _EMOJI_RANGES + "]+")
+SPECIAL_CHARS_PATTERN = re.compile(r"[^A-Za-z0-9\s]")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# Below this many rows per process the pickling costs more than the cleaning
+MIN_ROWS_PER_PROCESS = 50000
+
+_executors = {}
+
+
+def clean_text(text, strip_special=False):
+    """
+    Clean the text by removing URLs, hashtags, mentions, emojis and extra whitespace.
+    With strip_special, anything that is not a letter, digit or space is removed as well.
+    """
+    text = TAG_EMOJI_PATTERN.sub("", URL_PATTERN.sub("", text))
+    if strip_special:
+        text = SPECIAL_CHARS_PATTERN.sub("", text)
+    return WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+def _clean_values(values, strip_special):
+    return [clean_text(text, strip_special) if isinstance(text, str) else text for text in values]
+
+
+def _executor(processes):
+    """Process pool reused across calls so it is only started once"""
+    if processes not in _executors:
+        _executors[processes] = ProcessPoolExecutor(max_workers=processes)
+    return _executors[processes]
+
+
+def clean_series(texts, strip_special=False, processes=1):
+    """
+    Clean a Series or array of texts, returning a Series with the same index.
+    Missing values pass through unchanged. With processes > 1 large inputs are split
+    across a process pool.
+    """
+    if not isinstance(texts, pd.Series):
+        texts = pd.Series(texts)
+    values = texts.to_numpy(dtype=object)
+
+    if processes > 1 and len(values) >= processes * MIN_ROWS_PER_PROCESS:
+        parts = np.array_split(values, processes)
+        cleaned = [text for part in _executor(processes).map(_clean_values, parts, repeat(strip_special))
+                   for text in part]
+    else:
+        cleaned = _clean_values(values, strip_special)
+    return pd.Series(cleaned, index=texts.index, name=texts.name, dtype=object)